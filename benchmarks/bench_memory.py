@@ -0,0 +1,90 @@
+"""Per-chapter memory footprint of the chapter model for a synthetic library.
+
+Compares the current slotted, interned models against plain dataclasses with a
+per-instance __dict__, unshared strings and one EpisodeInfo per file.
+
+Usage: PYTHONPATH=src python benchmarks/bench_memory.py [--chapters N]
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import tracemalloc
+from dataclasses import dataclass
+
+from chapter_extractor.models import Chapter
+from chapter_extractor.parser import parse_episode
+
+_TITLES = ("Opening", "Part A", "Part B", "Ending", "Preview", "Chapter 06")
+_CHAPTERS_PER_FILE = len(_TITLES)
+
+
+@dataclass
+class PlainEpisodeInfo:
+    season: int
+    episode: int
+
+
+@dataclass
+class PlainChapter:
+    start: float
+    end: float
+    duration: float
+    title: str | None
+    source_file: str
+    episode: PlainEpisodeInfo | None = None
+
+
+def _decoded(text: str) -> str:
+    # A fresh string object, like one decoded from a file or JSON
+    return text.encode().decode()
+
+
+def plain_library(count: int) -> list[PlainChapter]:
+    chapters: list[PlainChapter] = []
+    for file_index in range(count // _CHAPTERS_PER_FILE + 1):
+        path = _decoded(f"/library/Show {file_index // 24}/Show - S01E{file_index % 24 + 1:02d}.mkv")
+        episode = PlainEpisodeInfo(1, file_index % 24 + 1)
+        for i, title in enumerate(_TITLES):
+            start = i * 240.0
+            chapters.append(PlainChapter(start, start + 240.0, 240.0, _decoded(title), path, episode))
+    return chapters[:count]
+
+
+def compact_library(count: int) -> list[Chapter]:
+    chapters: list[Chapter] = []
+    for file_index in range(count // _CHAPTERS_PER_FILE + 1):
+        path = _decoded(f"/library/Show {file_index // 24}/Show - S01E{file_index % 24 + 1:02d}.mkv")
+        episode = parse_episode(path)
+        for i, title in enumerate(_TITLES):
+            start = i * 240.0
+            chapters.append(Chapter(start, start + 240.0, 240.0, _decoded(title), path, episode))
+    return chapters[:count]
+
+
+def bytes_per_chapter(build, count: int) -> float:
+    gc.collect()
+    tracemalloc.start()
+    chapters = build(count)
+    gc.collect()
+    size, _peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del chapters
+    return size / count
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chapters", type=int, default=1_000_000)
+    args = parser.parse_args()
+
+    before = bytes_per_chapter(plain_library, args.chapters)
+    after = bytes_per_chapter(compact_library, args.chapters)
+    print(f"chapters: {args.chapters}")
+    print(f"before:   {before:7.1f} bytes/chapter ({before * args.chapters / 2**20:8.1f} MiB)")
+    print(f"after:    {after:7.1f} bytes/chapter ({after * args.chapters / 2**20:8.1f} MiB)")
+    print(f"saved:    {1 - after / before:7.1%}")
+
+
+if __name__ == "__main__":
+    main()
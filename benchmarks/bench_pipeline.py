@@ -0,0 +1,156 @@
+"""End-to-end stage timings on synthetic libraries with fake mkvtoolnix.
+
+Generates a library per scale (see synthetic.py), puts the fake
+mkvmerge/mkvextract from fake_mkvtoolnix.py first on PATH and times the
+scan, probe, filter, cluster, name and extract stages of the CLI pipeline.
+Results are printed as a table and written as JSON for regression tracking.
+
+Usage: PYTHONPATH=src python benchmarks/bench_pipeline.py [--files 100 1000 10000 100000]
+           [--format stub|matroska] [--latency SECONDS] [--json results.json]
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from dataclasses import asdict
+
+import fake_mkvtoolnix
+from synthetic import generate_library, spec_for_files
+
+from chapter_extractor.cli import (
+    _ExtractionProgress,
+    _ScanCounts,
+    _accept_file,
+    _group_chapters,
+    _probe_files,
+    _read_filter,
+    _scan_directory,
+    _scan_options,
+    parse_args,
+)
+from chapter_extractor.extractor import DeviceScheduler, group_by_source, submit_extraction
+from chapter_extractor.matcher import filter_chapters
+from chapter_extractor.pipeline import build_patterns
+
+STAGES = ("scan", "probe", "filter", "cluster", "name", "extract")
+_RESULTS_VERSION = 1
+
+
+@contextlib.contextmanager
+def _timed(timings: dict[str, float], stage: str) -> Iterator[None]:
+    start = time.perf_counter()
+    yield
+    timings[stage] = time.perf_counter() - start
+
+
+def run_pipeline(library: str, output_dir: str, jobs: int) -> dict:
+    """Run the non-streaming pipeline stage by stage. Returns timings and counts."""
+    args = parse_args([
+        library, output_dir, "-r", "--duration-range", "60-120", "--chapter-names",
+        "--jobs", str(jobs), "--extract-jobs", str(jobs), "--per-device", str(jobs),
+    ])
+    timings: dict[str, float] = {}
+
+    with _timed(timings, "scan"):
+        files = _scan_directory(args.input_dir, args.recursive, **_scan_options(args))
+    keep = _read_filter(args, None)
+    with _timed(timings, "probe"):
+        results = list(_probe_files(files, args.jobs, None, keep))
+    counts = _ScanCounts(prefiltered=keep is not None)
+    with _timed(timings, "filter"):
+        filtered = []
+        for mkv_path, chapters in results:
+            accepted = _accept_file(mkv_path, chapters, args.episode_parsing, counts)
+            filtered.extend(filter_chapters(accepted, args.duration_range, args.chapter_names))
+    with _timed(timings, "cluster"):
+        clusters = _group_chapters(filtered, args, args.vectorized)
+    with _timed(timings, "name"):
+        patterns = build_patterns(clusters, output_dir, args.episode_parsing)
+    with _timed(timings, "extract"):
+        os.makedirs(output_dir, exist_ok=True)
+        progress = _ExtractionProgress(threading.Lock(), total=len(patterns))
+        scheduler = DeviceScheduler(args.extract_jobs, args.per_device, per_output_device=args.per_output_device)
+        for group in group_by_source(patterns):
+            submit_extraction(scheduler, group, progress.report)
+        scheduler.join()
+
+    return {
+        "files": len(files),
+        "chapters": counts.chapters,
+        "filtered": len(filtered),
+        "patterns": len(patterns),
+        "extracted": progress.success,
+        "stages": timings,
+        "total": sum(timings.values()),
+    }
+
+
+def bench_scale(files: int, file_format: str, jobs: int, jitter: float, workdir: str) -> dict:
+    spec = spec_for_files(files, file_format=file_format, jitter=jitter)
+    library = os.path.join(workdir, "library")
+    output_dir = os.path.join(workdir, "out")
+    written = generate_library(library, spec)
+    try:
+        # The pipeline prints progress and warnings; keep the benchmark output readable
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            result = run_pipeline(library, output_dir, jobs)
+    finally:
+        shutil.rmtree(library, ignore_errors=True)
+        shutil.rmtree(output_dir, ignore_errors=True)
+    return {"spec": asdict(spec), "generated": written, **result}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--files", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--format", choices=("stub", "matroska"), default="stub",
+                        help="stub files are probed through the fake mkvtoolnix, matroska natively")
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds each fake tool call sleeps")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Per-file opening/ending duration jitter")
+    parser.add_argument("--jobs", type=int, default=os.cpu_count() or 4)
+    parser.add_argument("--json", metavar="FILE", help="Write results as JSON to FILE ('-' for stdout)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="chapter-extractor-bench-") as workdir:
+        bin_dir = os.path.join(workdir, "bin")
+        fake_mkvtoolnix.install(bin_dir)
+        os.environ["PATH"] = bin_dir + os.pathsep + os.environ.get("PATH", "")
+        os.environ[fake_mkvtoolnix.LATENCY_ENV] = f"{args.latency:g}"
+
+        results = []
+        print(f"{'files':>8} " + " ".join(f"{s:>9}" for s in STAGES) + f" {'total':>9}", file=sys.stderr)
+        for files in args.files:
+            result = bench_scale(files, args.format, args.jobs, args.jitter, workdir)
+            results.append(result)
+            row = " ".join(f"{result['stages'][s]:>9.3f}" for s in STAGES)
+            print(f"{result['files']:>8} {row} {result['total']:>9.3f}", file=sys.stderr)
+
+    report = {
+        "version": _RESULTS_VERSION,
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "params": {"format": args.format, "latency": args.latency, "jobs": args.jobs, "jitter": args.jitter},
+        "results": results,
+    }
+    if args.json == "-":
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    elif args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
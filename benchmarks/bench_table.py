@@ -0,0 +1,71 @@
+"""Compare list-based and NumPy-vectorized filtering and clustering.
+
+Usage: PYTHONPATH=src python benchmarks/bench_table.py [--chapters N] [--repeat N]
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import time
+
+from chapter_extractor.matcher import filter_chapters, group_chapters
+from chapter_extractor.models import Chapter, EpisodeInfo
+from chapter_extractor.table import ChapterTable
+
+
+def synthetic_chapters(count: int, seed: int = 0) -> list[Chapter]:
+    """Chapters of a library with ~6 chapters per episode and recurring OP/ED durations."""
+    rng = random.Random(seed)
+    chapters: list[Chapter] = []
+    episode = 0
+    while len(chapters) < count:
+        episode += 1
+        series = episode // 24
+        source = f"/library/Show {series}/Show {series} - S01E{episode % 24 + 1:02d}.mkv"
+        info = EpisodeInfo(1, episode % 24 + 1)
+        op = 85.0 + series % 10 + rng.uniform(-0.5, 0.5)
+        ed = 88.0 + series % 7 + rng.uniform(-0.5, 0.5)
+        parts = [("Opening", op), ("Part A", rng.uniform(500, 700)), ("Part B", rng.uniform(500, 700)),
+                 ("Ending", ed), ("Preview", 30.0), (None, rng.uniform(1, 20))]
+        start = 0.0
+        for title, duration in parts:
+            chapters.append(Chapter(start, start + duration, duration, title, source, info))
+            start += duration
+    return chapters[:count]
+
+
+def list_pipeline(chapters: list[Chapter]) -> int:
+    return sum(1 for c in group_chapters(filter_chapters(chapters, (60, 120), True)) if len(c) >= 5)
+
+
+def table_pipeline(chapters: list[Chapter]) -> int:
+    table = ChapterTable(chapters)
+    return sum(1 for c in table.group(table.filter((60, 120), True)) if len(c) >= 5)
+
+
+def best_of(fn, chapters: list[Chapter], repeat: int) -> float:
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(chapters)
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--chapters", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'chapters':>10} {'list (s)':>10} {'table (s)':>10} {'speedup':>8}")
+    for count in args.chapters:
+        chapters = synthetic_chapters(count)
+        assert list_pipeline(chapters) == table_pipeline(chapters)
+        list_time = best_of(list_pipeline, chapters, args.repeat)
+        table_time = best_of(table_pipeline, chapters, args.repeat)
+        print(f"{count:>10} {list_time:>10.3f} {table_time:>10.3f} {list_time / table_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Stand-in mkvmerge/mkvextract for benchmarks.
+
+Supports exactly what chapter-extractor runs:
+    mkvmerge -J FILE
+    mkvmerge -o OUTPUT --split parts:START-END[,START-END...] FILE
+    mkvextract FILE chapters --simple OUTPUT
+
+Probing reads the precomputed answers from stub files written by
+synthetic.py with a plain shell script, so a fake call costs about as much
+as a fork/exec rather than a Python start-up. Splitting runs this module.
+Each call first sleeps for FAKE_MKVTOOLNIX_LATENCY seconds (default 0) to
+model the cost of the real tools. install() writes the executables.
+"""
+from __future__ import annotations
+
+import os
+import stat
+import sys
+
+LATENCY_ENV = "FAKE_MKVTOOLNIX_LATENCY"
+
+_MKVMERGE = """#!/bin/sh
+[ "${{{latency}:-0}}" = 0 ] || sleep "${latency}"
+if [ "$1" = "-J" ]; then
+    [ "$(head -n 1 "$2")" = "{magic}" ] || {{ echo "Error: $2 is not a stub file" >&2; exit 2; }}
+    sed -n 2p "$2"
+    exit 0
+fi
+exec "{python}" "{script}" "$@"
+"""
+
+_MKVEXTRACT = """#!/bin/sh
+[ "${{{latency}:-0}}" = 0 ] || sleep "${latency}"
+[ "$(head -n 1 "$1")" = "{magic}" ] || exit 2
+tail -n +3 "$1" > "$4"
+"""
+
+
+def split(argv: list[str]) -> int:
+    """mkvmerge -o OUTPUT --split parts:RANGES SOURCE: write one small file per range."""
+    output = argv[argv.index("-o") + 1]
+    ranges = argv[argv.index("--split") + 1].removeprefix("parts:").split(",")
+    source = argv[-1]
+    for i, part in enumerate(ranges, 1):
+        path = output % i if "%" in output else output
+        with open(path, "wb") as f:
+            f.write(f"segment of {os.path.basename(source)} {part}\n".encode())
+    return 0
+
+
+def install(bin_dir: str) -> None:
+    """Create mkvmerge and mkvextract executables in bin_dir."""
+    from synthetic import STUB_MAGIC
+
+    os.makedirs(bin_dir, exist_ok=True)
+    values = {
+        "latency": LATENCY_ENV,
+        "magic": STUB_MAGIC.decode().strip(),
+        "python": sys.executable,
+        "script": os.path.abspath(__file__),
+    }
+    for tool, template in (("mkvmerge", _MKVMERGE), ("mkvextract", _MKVEXTRACT)):
+        path = os.path.join(bin_dir, tool)
+        with open(path, "w") as f:
+            f.write(template.format(**values))
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+
+
+if __name__ == "__main__":
+    sys.exit(split(sys.argv[1:]))
@@ -0,0 +1,129 @@
+"""Synthetic anime-style libraries for benchmarks.
+
+Files are laid out as SERIES/Season NN/SERIES - SnnEnn.mkv. Each file has an
+opening, middle parts, an ending and a preview; the opening and ending
+durations are fixed per series and season, plus per-file jitter.
+
+Two file formats are supported:
+- "stub": a small text file holding the precomputed `mkvmerge -J` and
+  `mkvextract chapters --simple` output. The native Matroska reader rejects
+  it, so chapter-extractor falls back to the fake mkvmerge/mkvextract from
+  fake_mkvtoolnix.py, which just print those parts.
+- "matroska": a minimal real Matroska file (EBML header, SeekHead, Info,
+  Chapters) read by the native reader without any subprocess.
+"""
+from __future__ import annotations
+
+import json
+import os
+import random
+import struct
+from dataclasses import dataclass
+
+STUB_MAGIC = b"CHAPTER-EXTRACTOR-STUB\n"
+
+
+@dataclass
+class LibrarySpec:
+    series: int = 10
+    seasons: int = 1
+    episodes: int = 12
+    chapters_per_file: int = 5
+    jitter: float = 0.5
+    file_format: str = "stub"
+    seed: int = 0
+
+    @property
+    def files(self) -> int:
+        return self.series * self.seasons * self.episodes
+
+
+def spec_for_files(files: int, **overrides: object) -> LibrarySpec:
+    """A spec of 12-episode single-season series with about `files` files."""
+    spec = LibrarySpec(**overrides)
+    spec.series = max(1, round(files / (spec.seasons * spec.episodes)))
+    return spec
+
+
+def file_chapters(rng: random.Random, spec: LibrarySpec, op: float, ed: float) -> tuple[list[tuple[float, str]], float]:
+    """(start, title) entries and the total duration of one episode."""
+    middle = max(spec.chapters_per_file - 3, 0)
+    durations = [("Opening", op + rng.uniform(-spec.jitter, spec.jitter))]
+    durations += [(f"Part {chr(ord('A') + i)}", 1200.0 / max(middle, 1) + rng.uniform(-30, 30)) for i in range(middle)]
+    durations += [("Ending", ed + rng.uniform(-spec.jitter, spec.jitter)), ("Preview", 30.0)]
+    durations = durations[:spec.chapters_per_file]
+    entries: list[tuple[float, str]] = []
+    start = 0.0
+    for title, duration in durations:
+        entries.append((round(start, 3), title))
+        start += duration
+    return entries, round(start, 3)
+
+
+def _element(element_id: int, payload: bytes) -> bytes:
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return id_bytes + ((1 << 56) | len(payload)).to_bytes(8, "big") + payload
+
+
+def _uint(element_id: int, value: int) -> bytes:
+    return _element(element_id, value.to_bytes(8, "big"))
+
+
+def matroska_bytes(entries: list[tuple[float, str]], duration: float) -> bytes:
+    """A minimal Matroska file with a SeekHead pointing at Info and Chapters."""
+    header = _element(0x1A45DFA3, _element(0x4282, b"matroska"))
+    info = _element(0x1549A966, _uint(0x2AD7B1, 1_000_000) + _element(0x4489, struct.pack(">d", duration * 1000)))
+    atoms = b"".join(
+        _element(0xB6, _uint(0x91, round(start * 1e9)) + _element(0x80, _element(0x85, title.encode())))
+        for start, title in entries
+    )
+    chapters = _element(0x1043A770, _element(0x45B9, atoms))
+
+    def seek(element_id: int, position: int) -> bytes:
+        return _element(0x4DBB, _element(0x53AB, element_id.to_bytes(4, "big")) + _uint(0x53AC, position))
+
+    seek_head_size = len(_element(0x114D9B74, seek(0x1549A966, 0) + seek(0x1043A770, 0)))
+    seek_head = _element(0x114D9B74, seek(0x1549A966, seek_head_size) + seek(0x1043A770, seek_head_size + len(info)))
+    return header + _element(0x18538067, seek_head + info + chapters)
+
+
+def _timestamp(seconds: float) -> str:
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    return f"{int(hours):02d}:{int(minutes):02d}:{secs:06.3f}"
+
+
+def stub_bytes(entries: list[tuple[float, str]], duration: float) -> bytes:
+    """Magic line, one line of `mkvmerge -J` JSON, then the simple chapter format."""
+    info = {
+        "container": {"properties": {"duration": round(duration * 1e9)}},
+        "chapters": [{"num_entries": len(entries)}] if entries else [],
+    }
+    simple = "".join(
+        f"CHAPTER{i:02d}={_timestamp(start)}\nCHAPTER{i:02d}NAME={title}\n"
+        for i, (start, title) in enumerate(entries, 1)
+    )
+    return STUB_MAGIC + json.dumps(info).encode() + b"\n" + simple.encode()
+
+
+def generate_library(root: str, spec: LibrarySpec) -> int:
+    """Write a library below root. Returns the number of files written."""
+    rng = random.Random(spec.seed)
+    encode = matroska_bytes if spec.file_format == "matroska" else stub_bytes
+    written = 0
+    for s in range(1, spec.series + 1):
+        name = f"Series {s:05d}"
+        # Season numbers are unique across series so that, as in per-show
+        # runs, patterns don't span series just because durations match
+        for season in range((s - 1) * spec.seasons + 1, s * spec.seasons + 1):
+            season_dir = os.path.join(root, name, f"Season {season:02d}")
+            os.makedirs(season_dir, exist_ok=True)
+            op = rng.uniform(80, 100)
+            ed = rng.uniform(80, 100)
+            for episode in range(1, spec.episodes + 1):
+                entries, duration = file_chapters(rng, spec, op, ed)
+                path = os.path.join(season_dir, f"{name} - S{season:02d}E{episode:02d}.mkv")
+                with open(path, "wb") as f:
+                    f.write(encode(entries, duration))
+                written += 1
+    return written
@@ -0,0 +1,138 @@
+from __future__ import annotations
+
+import os
+import time
+
+from chapter_extractor.models import Chapter
+
+FileIdentity = tuple[int, int, int]
+
+DEFAULT_MAX_AGE_DAYS = 90.0
+DEFAULT_MAX_ENTRIES = 1_000_000
+_COMMIT_INTERVAL = 500
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS probes (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    inode INTEGER NOT NULL,
+    chapters TEXT NOT NULL,
+    last_used REAL NOT NULL
+)
+"""
+
+
+def default_cache_path() -> str:
+    """Default probe cache location under the user's cache directory."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "chapter-extractor", "probes.sqlite3")
+
+
+def file_identity(path: str) -> FileIdentity | None:
+    """Return (size, mtime_ns, inode) for path, or None if it can't be stat'ed."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def chapters_to_rows(chapters: list[Chapter] | None) -> list[list] | None:
+    """Convert a probe result to JSON-serializable [start, end, title] rows."""
+    if chapters is None:
+        return None
+    return [[c.start, c.end, c.title] for c in chapters]
+
+
+def chapters_from_rows(rows: list[list] | None, source_file: str) -> list[Chapter] | None:
+    """Rebuild a probe result from rows written by chapters_to_rows."""
+    if rows is None:
+        return None
+    return [
+        Chapter(start=start, end=end, duration=end - start, title=title, source_file=source_file)
+        for start, end, title in rows
+    ]
+
+
+class ProbeCache:
+    """On-disk memo of read_chapters results, keyed by path and file identity.
+
+    Both outcomes without chapters are cached: [] ("no chapters") and None
+    ("unreadable"). An entry is only used while the file's size, mtime and
+    inode are unchanged. Entries unused for max_age_days are evicted, then the
+    least recently used ones beyond max_entries.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        max_age_days: float = DEFAULT_MAX_AGE_DAYS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        import sqlite3
+
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.max_age_days = max_age_days
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._pending_writes = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(_SCHEMA)
+
+    def get(self, path: str, identity: FileIdentity) -> tuple[bool, list[Chapter] | None]:
+        """Look up path. Returns (hit, chapters); chapters is only meaningful on a hit."""
+        import json
+
+        row = self._conn.execute(
+            "SELECT size, mtime_ns, inode, chapters FROM probes WHERE path = ?",
+            (path,),
+        ).fetchone()
+        if row is None or tuple(row[:3]) != identity:
+            self.misses += 1
+            return False, None
+        self.hits += 1
+        self._conn.execute("UPDATE probes SET last_used = ? WHERE path = ?", (time.time(), path))
+        self._count_write()
+        return True, chapters_from_rows(json.loads(row[3]), path)
+
+    def put(self, path: str, identity: FileIdentity, chapters: list[Chapter] | None) -> None:
+        """Store the probe result for path, replacing any stale entry."""
+        import json
+
+        size, mtime_ns, inode = identity
+        self._conn.execute(
+            "INSERT OR REPLACE INTO probes (path, size, mtime_ns, inode, chapters, last_used) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (path, size, mtime_ns, inode, json.dumps(chapters_to_rows(chapters)), time.time()),
+        )
+        self._count_write()
+
+    def evict(self) -> int:
+        """Drop expired and excess entries. Returns the number of entries removed."""
+        cutoff = time.time() - self.max_age_days * 86400
+        removed = self._conn.execute("DELETE FROM probes WHERE last_used < ?", (cutoff,)).rowcount
+        removed += self._conn.execute(
+            "DELETE FROM probes WHERE path IN ("
+            "SELECT path FROM probes ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        ).rowcount
+        self._conn.commit()
+        return removed
+
+    def close(self) -> None:
+        """Evict, commit and close the database."""
+        self.evict()
+        self._conn.close()
+
+    def _count_write(self) -> None:
+        # Batch commits; one transaction per file would fsync thousands of times
+        self._pending_writes += 1
+        if self._pending_writes >= _COMMIT_INTERVAL:
+            self._conn.commit()
+            self._pending_writes = 0
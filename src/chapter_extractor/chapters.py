@@ -1,16 +1,55 @@
 from __future__ import annotations
 
-import json
 import os
 import re
-import subprocess
+import struct
 import sys
-import tempfile
+from collections.abc import Iterator
+from functools import cache
+from typing import BinaryIO
 
+from chapter_extractor import timing
+from chapter_extractor.matcher import ChapterFilter
 from chapter_extractor.models import Chapter
 
-_CHAPTER_RE = re.compile(r"CHAPTER(\d+)=(.+)")
-_CHAPTER_NAME_RE = re.compile(r"CHAPTER(\d+)NAME=(.*)")
+# Matroska/EBML element IDs (with their length marker bits, as written on disk)
+_EBML_HEADER_ID = 0x1A45DFA3
+_EBML_DOCTYPE_ID = 0x4282
+_SEGMENT_ID = 0x18538067
+_SEEKHEAD_ID = 0x114D9B74
+_SEEK_ID = 0x4DBB
+_SEEK_ELEMENT_ID = 0x53AB
+_SEEK_POSITION_ID = 0x53AC
+_INFO_ID = 0x1549A966
+_TIMECODE_SCALE_ID = 0x2AD7B1
+_DURATION_ID = 0x4489
+_CHAPTERS_ID = 0x1043A770
+_EDITION_ENTRY_ID = 0x45B9
+_CHAPTER_ATOM_ID = 0xB6
+_CHAPTER_TIME_START_ID = 0x91
+_CHAPTER_DISPLAY_ID = 0x80
+_CHAP_STRING_ID = 0x85
+_CUES_ID = 0x1C53BB6B
+_CLUSTER_ID = 0x1F43B675
+_CUE_POINT_ID = 0xBB
+_CUE_TIME_ID = 0xB3
+
+_MATROSKA_DOCTYPES = {"matroska", "webm"}
+_DEFAULT_TIMECODE_SCALE = 1_000_000
+_MAX_HEADER_SIZE = 12  # 4-byte ID + 8-byte size
+_MAX_METADATA_SIZE = 16 * 1024 * 1024
+
+
+class MatroskaError(Exception):
+    """Raised when a file cannot be parsed as Matroska by the native reader."""
+
+
+class ProbeUnavailable(Exception):
+    """Raised when chapters can't be read for a reason that says nothing about the file.
+
+    mkvtoolnix is missing, or the file couldn't be opened or read (OSError).
+    Unlike a None result, the outcome may differ on the next attempt.
+    """
 
 
 def _parse_timestamp(ts: str) -> float:
@@ -30,17 +69,296 @@ def format_timestamp(s: float) -> str:
     return f"{hours:02d}:{minutes:02d}:{seconds:06.3f}"
 
 
+def _read_vint(buf: bytes, pos: int) -> tuple[int, int]:
+    """Decode an EBML variable-size integer at pos. Returns (raw value, length).
+
+    The raw value keeps the length marker bit, which is how element IDs are
+    compared. Callers decoding sizes strip it themselves.
+    """
+    if pos >= len(buf):
+        raise MatroskaError("Truncated EBML data")
+    first = buf[pos]
+    if first == 0:
+        raise MatroskaError("Invalid EBML variable-size integer")
+    length = 9 - first.bit_length()
+    if pos + length > len(buf):
+        raise MatroskaError("Truncated EBML data")
+    return int.from_bytes(buf[pos:pos + length], "big"), length
+
+
+def _parse_element_header(buf: bytes, pos: int) -> tuple[int, int | None, int]:
+    """Parse element ID and size at pos. Returns (id, size, data offset).
+
+    Size is None for elements of unknown size (all value bits set).
+    """
+    element_id, id_len = _read_vint(buf, pos)
+    raw_size, size_len = _read_vint(buf, pos + id_len)
+    marker = 1 << (7 * size_len)
+    size = raw_size ^ marker
+    if size == marker - 1:
+        return element_id, None, pos + id_len + size_len
+    return element_id, size, pos + id_len + size_len
+
+
+def _iter_children(buf: bytes) -> Iterator[tuple[int, bytes]]:
+    """Iterate (id, payload) of the elements contained in a master element's payload."""
+    pos = 0
+    while pos < len(buf):
+        element_id, size, data_pos = _parse_element_header(buf, pos)
+        if size is None or data_pos + size > len(buf):
+            raise MatroskaError("Invalid element size in metadata")
+        yield element_id, buf[data_pos:data_pos + size]
+        pos = data_pos + size
+
+
+def _read_at(f: BinaryIO, offset: int, size: int) -> bytes:
+    """Positioned read of up to size bytes."""
+    f.seek(offset)
+    data = f.read(size)
+    timing.add_bytes(read=len(data))
+    return data
+
+
+def _read_element_header_at(f: BinaryIO, offset: int) -> tuple[int, int | None, int]:
+    """Read an element header from the file. Returns (id, size, absolute data offset)."""
+    buf = _read_at(f, offset, _MAX_HEADER_SIZE)
+    element_id, size, data_pos = _parse_element_header(buf, 0)
+    return element_id, size, offset + data_pos
+
+
+def _read_element_at(f: BinaryIO, offset: int, expected_id: int) -> bytes:
+    """Read the payload of the element at offset, checking its ID."""
+    element_id, size, data_offset = _read_element_header_at(f, offset)
+    if element_id != expected_id or size is None or size > _MAX_METADATA_SIZE:
+        raise MatroskaError(f"Unexpected element at offset {offset}")
+    payload = _read_at(f, data_offset, size)
+    if len(payload) != size:
+        raise MatroskaError("Truncated element")
+    return payload
+
+
+def _parse_seek_head(payload: bytes, segment_start: int) -> dict[int, int]:
+    """Map element IDs referenced by a SeekHead to absolute file offsets."""
+    positions: dict[int, int] = {}
+    for element_id, seek in _iter_children(payload):
+        if element_id != _SEEK_ID:
+            continue
+        target_id = None
+        target_pos = None
+        for child_id, value in _iter_children(seek):
+            if child_id == _SEEK_ELEMENT_ID:
+                target_id = int.from_bytes(value, "big")
+            elif child_id == _SEEK_POSITION_ID:
+                target_pos = int.from_bytes(value, "big")
+        if target_id is not None and target_pos is not None:
+            positions.setdefault(target_id, segment_start + target_pos)
+    return positions
+
+
+def _locate_segment_elements(
+    f: BinaryIO,
+    segment_start: int,
+    segment_end: int,
+    wanted: set[int],
+) -> dict[int, int]:
+    """Find absolute offsets of top-level segment elements.
+
+    Follows the SeekHead (and a second SeekHead it points to); if there is
+    one, an element it doesn't list is taken to be absent, so a file without
+    chapters costs a few reads rather than one per Cluster. Without a
+    SeekHead, top-level elements are walked one header at a time up to the
+    first Cluster (muxers write Info and Chapters before the media data).
+    The walk fails on elements of unknown size.
+    """
+    element_id, _, _ = _read_element_header_at(f, segment_start)
+    if element_id == _SEEKHEAD_ID:
+        positions = _parse_seek_head(_read_element_at(f, segment_start, _SEEKHEAD_ID), segment_start)
+        nested = positions.get(_SEEKHEAD_ID)
+        if nested is not None and nested != segment_start:
+            for key, value in _parse_seek_head(_read_element_at(f, nested, _SEEKHEAD_ID), segment_start).items():
+                positions.setdefault(key, value)
+        return positions
+
+    positions: dict[int, int] = {}
+    pos = segment_start
+    while pos < segment_end and not wanted <= positions.keys():
+        element_id, size, data_offset = _read_element_header_at(f, pos)
+        if element_id == _CLUSTER_ID:
+            break
+        if size is None:
+            raise MatroskaError("Top-level element of unknown size")
+        positions.setdefault(element_id, pos)
+        pos = data_offset + size
+    return positions
+
+
+def _parse_info(payload: bytes) -> float:
+    """Return the segment duration in seconds, as mkvmerge -J reports it."""
+    return _parse_info_fields(payload)[1]
+
+
+def _parse_info_fields(payload: bytes) -> tuple[int, float]:
+    """Return the timecode scale (ns per tick) and the segment duration in seconds."""
+    timecode_scale = _DEFAULT_TIMECODE_SCALE
+    duration = None
+    for element_id, value in _iter_children(payload):
+        if element_id == _TIMECODE_SCALE_ID:
+            timecode_scale = int.from_bytes(value, "big")
+        elif element_id == _DURATION_ID:
+            if len(value) == 4:
+                duration = struct.unpack(">f", value)[0]
+            elif len(value) == 8:
+                duration = struct.unpack(">d", value)[0]
+            else:
+                raise MatroskaError("Invalid Duration element")
+    if duration is None:
+        raise MatroskaError("Segment has no Duration")
+    return timecode_scale, int(duration * timecode_scale) / 1_000_000_000
+
+
+def _parse_cues(payload: bytes, timecode_scale: int) -> list[float]:
+    """Sorted CueTimes (seconds) of a Cues element; muxers index keyframes only."""
+    times = []
+    for element_id, point in _iter_children(payload):
+        if element_id != _CUE_POINT_ID:
+            continue
+        for child_id, value in _iter_children(point):
+            if child_id == _CUE_TIME_ID:
+                times.append(int.from_bytes(value, "big") * timecode_scale / 1_000_000_000)
+                break
+    return sorted(times)
+
+
+def _ns_to_seconds(ns: int) -> float:
+    """Convert nanoseconds to seconds at the millisecond precision of the simple format."""
+    total_ms = (ns + 500_000) // 1_000_000
+    hours, rest_ms = divmod(total_ms, 3_600_000)
+    minutes, rest_ms = divmod(rest_ms, 60_000)
+    return hours * 3600 + minutes * 60 + rest_ms / 1000
+
+
+def _parse_chapter_atom(payload: bytes, entries: list[tuple[float, str]]) -> None:
+    """Collect (start, title) of a ChapterAtom and its nested atoms in document order."""
+    start_ns = None
+    title = ""
+    nested: list[bytes] = []
+    for element_id, value in _iter_children(payload):
+        if element_id == _CHAPTER_TIME_START_ID:
+            start_ns = int.from_bytes(value, "big")
+        elif element_id == _CHAPTER_DISPLAY_ID and not title:
+            for display_id, display_value in _iter_children(value):
+                if display_id == _CHAP_STRING_ID:
+                    title = display_value.decode("utf-8", errors="replace").rstrip("\x00").strip()
+                    break
+        elif element_id == _CHAPTER_ATOM_ID:
+            nested.append(value)
+    if start_ns is None:
+        raise MatroskaError("ChapterAtom without ChapterTimeStart")
+    entries.append((_ns_to_seconds(start_ns), title))
+    for atom in nested:
+        _parse_chapter_atom(atom, entries)
+
+
+def _parse_chapters_element(payload: bytes) -> list[tuple[float, str]]:
+    """Flatten all editions of a Chapters element into (start, title) entries."""
+    entries: list[tuple[float, str]] = []
+    for element_id, edition in _iter_children(payload):
+        if element_id != _EDITION_ENTRY_ID:
+            continue
+        for atom_id, atom in _iter_children(edition):
+            if atom_id == _CHAPTER_ATOM_ID:
+                _parse_chapter_atom(atom, entries)
+    return entries
+
+
+def _segment_positions(f: BinaryIO, wanted: set[int]) -> dict[int, int]:
+    """Check the EBML header of an open Matroska file and locate top-level segment elements."""
+    file_size = os.fstat(f.fileno()).st_size
+    element_id, size, data_offset = _read_element_header_at(f, 0)
+    if element_id != _EBML_HEADER_ID or size is None:
+        raise MatroskaError("Not an EBML file")
+    doctype = ""
+    for child_id, value in _iter_children(_read_element_at(f, 0, _EBML_HEADER_ID)):
+        if child_id == _EBML_DOCTYPE_ID:
+            doctype = value.decode("ascii", errors="replace").rstrip("\x00")
+    if doctype not in _MATROSKA_DOCTYPES:
+        raise MatroskaError(f"Unsupported DocType: {doctype!r}")
+
+    element_id, size, segment_start = _read_element_header_at(f, data_offset + size)
+    if element_id != _SEGMENT_ID:
+        raise MatroskaError("Missing Segment")
+    segment_end = file_size if size is None else min(segment_start + size, file_size)
+
+    return _locate_segment_elements(f, segment_start, segment_end, wanted)
+
+
+def _read_matroska(f: BinaryIO, mkv_path: str, keep: ChapterFilter | None = None) -> list[Chapter]:
+    """Read chapters from an open Matroska file using positioned reads only."""
+    positions = _segment_positions(f, {_INFO_ID, _CHAPTERS_ID})
+    if _INFO_ID not in positions:
+        raise MatroskaError("Missing Segment Info")
+    duration = _parse_info(_read_element_at(f, positions[_INFO_ID], _INFO_ID))
+    if _CHAPTERS_ID not in positions or (keep is not None and not keep.possible(duration)):
+        return []
+    entries = _parse_chapters_element(_read_element_at(f, positions[_CHAPTERS_ID], _CHAPTERS_ID))
+    return _build_chapters(entries, duration, mkv_path, keep)
+
+
+def _read_native_chapters(mkv_path: str, keep: ChapterFilter | None = None) -> list[Chapter] | None:
+    """Read chapters without spawning mkvtoolnix. Returns None if the file can't be parsed.
+
+    OSError propagates.
+    """
+    try:
+        with open(mkv_path, "rb", buffering=0) as f:
+            return _read_matroska(f, mkv_path, keep)
+    except (MatroskaError, struct.error):
+        return None
+
+
+def read_duration(mkv_path: str) -> float | None:
+    """Segment duration of a Matroska file in seconds, read natively. None if it can't be parsed."""
+    try:
+        with open(mkv_path, "rb", buffering=0) as f:
+            positions = _segment_positions(f, {_INFO_ID})
+            if _INFO_ID not in positions:
+                return None
+            return _parse_info(_read_element_at(f, positions[_INFO_ID], _INFO_ID))
+    except (OSError, MatroskaError, struct.error):
+        return None
+
+
+def read_keyframes(mkv_path: str) -> list[float] | None:
+    """Keyframe timestamps (seconds) from the Cues of a Matroska file. None without readable Cues."""
+    try:
+        with open(mkv_path, "rb", buffering=0) as f:
+            positions = _segment_positions(f, {_INFO_ID, _CUES_ID})
+            if _INFO_ID not in positions or _CUES_ID not in positions:
+                return None
+            timecode_scale, _ = _parse_info_fields(_read_element_at(f, positions[_INFO_ID], _INFO_ID))
+            return _parse_cues(_read_element_at(f, positions[_CUES_ID], _CUES_ID), timecode_scale)
+    except (OSError, MatroskaError, struct.error):
+        return None
+
+
 def _get_file_info(mkv_path: str) -> tuple[int, float] | None:
-    """Get chapter count and duration from mkvmerge -J. Returns None on error."""
+    """Get chapter count and duration from mkvmerge -J. Returns None on error.
+
+    Raises ProbeUnavailable if mkvmerge isn't installed.
+    """
+    import json
+    import subprocess
+
     try:
-        result = subprocess.run(
-            ["mkvmerge", "-J", mkv_path],
-            capture_output=True,
-            text=True,
-        )
+        with timing.tool_call("mkvmerge -J"):
+            result = subprocess.run(
+                ["mkvmerge", "-J", mkv_path],
+                capture_output=True,
+                text=True,
+            )
     except FileNotFoundError:
         print("Error: mkvmerge not found. Install mkvtoolnix.", file=sys.stderr)
-        return None
+        raise ProbeUnavailable("mkvmerge not found") from None
     if result.returncode != 0:
         return None
     data = json.loads(result.stdout)
@@ -52,15 +370,26 @@ def _get_file_info(mkv_path: str) -> tuple[int, float] | None:
 
 
 def _read_simple_chapters(mkv_path: str) -> str | None:
-    """Run mkvextract to get simple chapter format. Returns content or None."""
+    """Run mkvextract to get simple chapter format. Returns content or None.
+
+    Raises ProbeUnavailable if mkvextract isn't installed.
+    """
+    import subprocess
+    import tempfile
+
     tmp_fd, tmp_path = tempfile.mkstemp(suffix=".txt")
     os.close(tmp_fd)
     try:
-        result = subprocess.run(
-            ["mkvextract", mkv_path, "chapters", "--simple", tmp_path],
-            capture_output=True,
-            text=True,
-        )
+        with timing.tool_call("mkvextract"):
+            try:
+                result = subprocess.run(
+                    ["mkvextract", mkv_path, "chapters", "--simple", tmp_path],
+                    capture_output=True,
+                    text=True,
+                )
+            except FileNotFoundError:
+                print("Error: mkvextract not found. Install mkvtoolnix.", file=sys.stderr)
+                raise ProbeUnavailable("mkvextract not found") from None
         if result.returncode != 0:
             return None
         with open(tmp_path) as f:
@@ -69,32 +398,58 @@ def _read_simple_chapters(mkv_path: str) -> str | None:
         os.unlink(tmp_path)
 
 
-def _parse_simple_format(content: str, file_duration: float, source_file: str) -> list[Chapter]:
+@cache
+def _simple_format_patterns() -> tuple[re.Pattern[str], re.Pattern[str]]:
+    """Patterns of the CHAPTERnn= and CHAPTERnnNAME= lines, compiled on first use."""
+    return re.compile(r"CHAPTER(\d+)=(.+)"), re.compile(r"CHAPTER(\d+)NAME=(.*)")
+
+
+def _parse_simple_format(
+    content: str,
+    file_duration: float,
+    source_file: str,
+    keep: ChapterFilter | None = None,
+) -> list[Chapter]:
     """Parse mkvextract --simple output into Chapter objects."""
     timestamps: dict[str, float] = {}
     names: dict[str, str] = {}
+    chapter_re, chapter_name_re = _simple_format_patterns()
 
     for line in content.strip().splitlines():
-        m = _CHAPTER_RE.match(line)
+        m = chapter_re.match(line)
         if m:
             timestamps[m.group(1)] = _parse_timestamp(m.group(2))
             continue
-        m = _CHAPTER_NAME_RE.match(line)
+        m = chapter_name_re.match(line)
         if m:
             name = m.group(2).strip()
             names[m.group(1)] = name if len(name) >= 1 else ""
 
     sorted_ids = sorted(timestamps.keys())
+    entries = [(timestamps[chap_id], names.get(chap_id, "")) for chap_id in sorted_ids]
+    return _build_chapters(entries, file_duration, source_file, keep)
+
+
+def _build_chapters(
+    entries: list[tuple[float, str]],
+    file_duration: float,
+    source_file: str,
+    keep: ChapterFilter | None = None,
+) -> list[Chapter]:
+    """Build Chapter objects from ordered (start, title) entries. Each ends where the next starts.
+
+    Entries keep rejects are skipped without building a Chapter.
+    """
     chapters: list[Chapter] = []
 
-    for i, chap_id in enumerate(sorted_ids):
-        start = timestamps[chap_id]
-        if i + 1 < len(sorted_ids):
-            end = timestamps[sorted_ids[i + 1]]
+    for i, (start, title_raw) in enumerate(entries):
+        if i + 1 < len(entries):
+            end = entries[i + 1][0]
         else:
             end = file_duration
-        title_raw = names.get(chap_id, "")
         title = title_raw if title_raw else None
+        if keep is not None and not keep.accepts(end - start, title):
+            continue
         chapters.append(Chapter(
             start=start,
             end=end,
@@ -106,17 +461,38 @@ def _parse_simple_format(content: str, file_duration: float, source_file: str) -
     return chapters
 
 
-def read_chapters(mkv_path: str) -> list[Chapter] | None:
-    """Read chapters from MKV file. Returns [] if no chapters, None on error."""
+def read_chapters(mkv_path: str, keep: ChapterFilter | None = None) -> list[Chapter] | None:
+    """Read chapters from MKV file. Returns [] if no chapters, None on error.
+
+    Matroska metadata is parsed natively; mkvmerge/mkvextract are only used for
+    files the native reader can't handle. With keep, only the chapters it
+    accepts are returned ([] if none are) and files too short for any chapter
+    to pass are never run through mkvextract.
+
+    Raises ProbeUnavailable instead of returning None when the failure says
+    nothing about the file: mkvtoolnix is missing, or the file couldn't be
+    read (an OSError) and mkvmerge couldn't read it either. Callers that
+    remember results must not remember those.
+    """
+    read_error = None
+    try:
+        chapters = _read_native_chapters(mkv_path, keep)
+    except OSError as e:
+        read_error, chapters = e, None
+    if chapters is not None:
+        return chapters
+
     info = _get_file_info(mkv_path)
     if info is None:
+        if read_error is not None:
+            raise ProbeUnavailable(f"{mkv_path}: {read_error.strerror or read_error}") from read_error
         return None
     num_chapters, duration = info
-    if num_chapters == 0:
+    if num_chapters == 0 or (keep is not None and not keep.possible(duration)):
         return []
 
     content = _read_simple_chapters(mkv_path)
     if content is None:
         return None
 
-    return _parse_simple_format(content, duration, mkv_path)
+    return _parse_simple_format(content, duration, mkv_path, keep)
@@ -1,24 +1,74 @@
 from __future__ import annotations
 
 import argparse
+import contextlib
 import os
 import sys
-from pathlib import Path
+import threading
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING
 
-from chapter_extractor.chapters import read_chapters, format_timestamp
-from chapter_extractor.extractor import extract_segment
+from chapter_extractor import timing
+from chapter_extractor.cache import (
+    DEFAULT_MAX_AGE_DAYS,
+    DEFAULT_MAX_ENTRIES,
+    FileIdentity,
+    ProbeCache,
+    chapters_from_rows,
+    chapters_to_rows,
+    default_cache_path,
+    file_identity,
+)
+from chapter_extractor.chapters import ProbeUnavailable, read_chapters, format_timestamp
+from chapter_extractor.discovery import DurationHistogram, merge_ranges
+from chapter_extractor.extractor import (
+    DeviceScheduler,
+    group_by_source,
+    partial_output_path,
+    remove_partial_outputs,
+    submit_extraction,
+)
+from chapter_extractor.journal import Journal
 from chapter_extractor.matcher import (
-    cluster_by_duration,
+    DEFAULT_MAX_EPISODE_GAP,
+    DEFAULT_START_WINDOW,
+    ChapterFilter,
+    GroupingConfig,
     filter_chapters,
-    split_by_contiguity,
-    split_duplicate_episodes,
 )
+from chapter_extractor.metrics import DEFAULT_METRICS_INTERVAL, MetricsFile
 from chapter_extractor.models import Chapter, ChapterPattern
-from chapter_extractor.naming import (
-    format_episode_range,
-    generate_output_name,
-)
 from chapter_extractor.parser import parse_episode
+from chapter_extractor.pipeline import Query, build_patterns, group_clusters, skip_reason
+from chapter_extractor.report import OUTPUT_FORMATS, NdjsonReporter
+from chapter_extractor.representative import REPRESENTATIVE_POLICIES
+from chapter_extractor.scanner import (
+    DEFAULT_EXCLUDES,
+    DEFAULT_EXTENSIONS,
+    DEFAULT_SCAN_THREADS,
+    is_within,
+    scan_order_key,
+    walk_library,
+)
+from chapter_extractor.shard import (
+    ShardIndex,
+    ShardIndexError,
+    ShardRecord,
+    from_portable,
+    read_shard_index,
+    shard_of,
+    to_portable,
+    write_shard_index,
+)
+from chapter_extractor.state import ExtractionPlan, RunState, SegmentKey, segment_key
+from chapter_extractor.store import SegmentStore, default_store_path, link_file
+from chapter_extractor.watch import DEFAULT_DEBOUNCE_SECONDS, Inotify, LibraryWatcher
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+    from queue import Queue
 
 
 def _parse_duration_range(value: str) -> tuple[float, float]:
@@ -32,20 +82,93 @@ def _parse_duration_range(value: str) -> tuple[float, float]:
         raise argparse.ArgumentTypeError(f"Invalid duration range: {value}. Values must be numbers.")
 
 
-def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
-    """Parse CLI arguments."""
-    parser = argparse.ArgumentParser(
-        prog="chapter-extractor",
-        description="Extract recurring chapter segments from MKV collections.",
-    )
+def _parse_filter_profile(value: str) -> tuple[str, dict]:
+    """Parse 'NAME:KEY=VALUE,...' into the profile name and its option overrides."""
+    name, _, spec = value.partition(":")
+    if not name or name.startswith(".") or "/" in name:
+        raise argparse.ArgumentTypeError(f"Invalid profile name in {value!r}: needs a name usable as a directory")
+    overrides: dict = {}
+    for item in filter(None, spec.split(",")):
+        key, _, setting = item.partition("=")
+        if key == "duration":
+            overrides["duration_range"] = _parse_duration_range(setting)
+        elif key == "names":
+            if setting not in ("", "yes", "no"):
+                raise argparse.ArgumentTypeError(f"Invalid names setting in {value!r}: use names=yes or names=no")
+            overrides["chapter_names"] = setting != "no"
+        elif key == "min-occurrences":
+            try:
+                overrides["min_occurrences"] = int(setting)
+            except ValueError:
+                raise argparse.ArgumentTypeError(f"Invalid min-occurrences in {value!r}")
+        elif key == "tolerance":
+            percent = setting.endswith("%")
+            try:
+                tolerance = float(setting.removesuffix("%"))
+            except ValueError:
+                raise argparse.ArgumentTypeError(f"Invalid tolerance in {value!r}: use SECONDS or PERCENT%")
+            overrides["tolerance_seconds"] = None if percent else tolerance
+            overrides["tolerance_percent"] = tolerance if percent else None
+        else:
+            raise argparse.ArgumentTypeError(
+                f"Unknown profile setting {key!r} in {value!r}: use duration, names, min-occurrences or tolerance"
+            )
+    return name, overrides
+
+
+def _default_jobs() -> int:
+    """Default probe concurrency: one worker per CPU."""
+    return os.cpu_count() or 1
+
+
+def _positive_int(value: str) -> int:
+    """Parse a strictly positive integer argument."""
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid value: {value}. Must be an integer.")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"Invalid value: {value}. Must be at least 1.")
+    return number
+
+
+def _parse_extensions(value: str) -> tuple[str, ...]:
+    """Parse a comma-separated extension list like 'mkv,mka' into ('.mkv', '.mka')."""
+    extensions = tuple(f".{e.strip().lstrip('.').lower()}" for e in value.split(",") if e.strip())
+    if not extensions:
+        raise argparse.ArgumentTypeError(f"Invalid extension list: {value}")
+    return extensions
+
+
+def _parse_shard(value: str) -> tuple[int, int]:
+    """Parse a shard spec like '2/4' into (2, 4)."""
+    try:
+        index, count = (int(p) for p in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid shard: {value}. Use i/N, e.g. 1/4.")
+    if not 1 <= index <= count:
+        raise argparse.ArgumentTypeError(f"Invalid shard: {value}. Need 1 <= i <= N.")
+    return index, count
+
+
+def _build_parser(prog: str, description: str, epilog: str | None = None) -> argparse.ArgumentParser:
+    """Build a parser with the options shared by all modes."""
+    parser = argparse.ArgumentParser(prog=prog, description=description, epilog=epilog)
     parser.add_argument("input_dir", help="Directory to scan for MKV files")
     parser.add_argument("output_dir", help="Directory for extracted segments")
-    parser.add_argument(
+    range_group = parser.add_mutually_exclusive_group()
+    range_group.add_argument(
         "--duration-range",
         type=_parse_duration_range,
         default=None,
         help="Duration range in seconds (e.g., 120-240)",
     )
+    range_group.add_argument(
+        "--auto",
+        action="store_true",
+        help="Find the duration ranges from the library: durations that recur near the start or "
+             "end of files (at least --min-occurrences chapters) are grouped range by range",
+    )
     parser.add_argument(
         "--chapter-names",
         action="store_true",
@@ -71,6 +194,21 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         default=None,
         help="Percentage duration tolerance (mutually exclusive with --tolerance-seconds)",
     )
+    parser.add_argument(
+        "--start-window",
+        type=float,
+        default=DEFAULT_START_WINDOW,
+        metavar="SECONDS",
+        help="Maximum start offset difference for same-titled chapters of one episode to stay "
+             f"in one pattern. Default: {DEFAULT_START_WINDOW:g}",
+    )
+    parser.add_argument(
+        "--max-episode-gap",
+        type=_positive_int,
+        default=DEFAULT_MAX_EPISODE_GAP,
+        metavar="N",
+        help=f"Largest episode number step within one pattern's episode run. Default: {DEFAULT_MAX_EPISODE_GAP}",
+    )
 
     parser.add_argument(
         "--no-episode-parsing",
@@ -83,13 +221,113 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
         help="Preview detected patterns without extracting",
     )
     parser.add_argument(
-        "--recursive", "-r",
+        "--extensions",
+        type=_parse_extensions,
+        default=DEFAULT_EXTENSIONS,
+        metavar="EXT[,EXT...]",
+        help=f"File extensions to scan, case-insensitive. Default: {','.join(e[1:] for e in DEFAULT_EXTENSIONS)}",
+    )
+    parser.add_argument(
+        "--include",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help="Only scan files whose name matches GLOB (repeatable)",
+    )
+    parser.add_argument(
+        "--exclude",
+        action="append",
+        default=[],
+        metavar="GLOB",
+        help=f"Skip files and directories whose name matches GLOB (repeatable). "
+             f"Excluded by default: {', '.join(DEFAULT_EXCLUDES)}",
+    )
+    parser.add_argument(
+        "--no-default-excludes",
         action="store_true",
-        help="Scan subdirectories",
+        help="Don't exclude the built-in directory names listed for --exclude",
+    )
+    parser.add_argument(
+        "--scan-threads",
+        type=_positive_int,
+        default=DEFAULT_SCAN_THREADS,
+        help=f"Number of directories listed concurrently. Default: {DEFAULT_SCAN_THREADS}",
+    )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=_positive_int,
+        default=_default_jobs(),
+        help="Number of files to probe concurrently. Default: CPU count",
+    )
+    parser.add_argument(
+        "--cache",
+        nargs="?",
+        const=default_cache_path(),
+        default=None,
+        metavar="PATH",
+        help=f"Cache probe results in an SQLite database. Default path: {default_cache_path()}",
+    )
+    parser.add_argument(
+        "--cache-max-age",
+        type=float,
+        default=DEFAULT_MAX_AGE_DAYS,
+        metavar="DAYS",
+        help=f"Evict cache entries unused for this many days. Default: {DEFAULT_MAX_AGE_DAYS:g}",
+    )
+    parser.add_argument(
+        "--cache-max-entries",
+        type=_positive_int,
+        default=DEFAULT_MAX_ENTRIES,
+        help=f"Maximum number of cached files. Default: {DEFAULT_MAX_ENTRIES}",
+    )
+    parser.add_argument(
+        "--state",
+        default=None,
+        metavar="FILE",
+        help="Remember probe results and extracted patterns in FILE; later runs only probe "
+             "changed files and only extract patterns that changed",
     )
+    parser.add_argument(
+        "--segment-store",
+        nargs="?",
+        const=default_store_path(),
+        default=None,
+        metavar="PATH",
+        help="Remember extracted segments in an SQLite database and hardlink/reflink identical "
+             f"segments instead of extracting them again. Default path: {default_store_path()}",
+    )
+    parser.add_argument(
+        "--representative",
+        choices=REPRESENTATIVE_POLICIES,
+        default="first",
+        help="Which member of each pattern is extracted: first (earliest episode), best-aligned "
+             "(chapter bounds closest to keyframes in the file's Cues) or cheapest (fewest bytes "
+             "to read, counting keyframe slack and sources already read for other patterns). "
+             "Default: first",
+    )
+    parser.add_argument(
+        "--extract-jobs",
+        type=_positive_int,
+        default=_default_jobs(),
+        help="Maximum number of concurrent extractions. Default: CPU count",
+    )
+    parser.add_argument(
+        "--per-device",
+        type=_positive_int,
+        default=1,
+        help="Maximum concurrent extractions reading from one block device. Default: 1",
+    )
+    parser.add_argument(
+        "--per-output-device",
+        type=_positive_int,
+        default=None,
+        help="Maximum concurrent extractions writing to one block device. Default: --extract-jobs",
+    )
+    return parser
 
-    args = parser.parse_args(argv)
 
+def _finish_args(args: argparse.Namespace) -> argparse.Namespace:
+    """Apply defaults that depend on several options."""
     # Default tolerance
     if args.tolerance_seconds is None and args.tolerance_percent is None:
         args.tolerance_seconds = 2.0
@@ -101,179 +339,1350 @@ def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
     return args
 
 
-def _scan_directory(input_dir: str, recursive: bool) -> list[str]:
-    """Find all .mkv files in directory."""
-    pattern = "**/*.mkv" if recursive else "*.mkv"
-    return sorted(str(p) for p in Path(input_dir).glob(pattern))
+def _add_output_format_option(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--output-format",
+        choices=OUTPUT_FORMATS,
+        default="text",
+        help="ndjson: write one JSON record per probed file, detected pattern and extraction result "
+             "to stdout as soon as it is known, followed by a summary record; the human-readable "
+             "output goes to stderr. Default: text",
+    )
 
 
-def _build_patterns(
-    clusters: list[list[Chapter]],
-    output_dir: str,
-    episode_parsing: bool,
-) -> list[ChapterPattern]:
-    """Build ChapterPattern objects from clusters."""
-    patterns: list[ChapterPattern] = []
-    for cluster in clusters:
-        if episode_parsing:
-            sorted_cluster = sorted(
-                cluster,
-                key=lambda c: (c.episode.season, c.episode.episode) if c.episode else (0, 0),
-            )
-        else:
-            sorted_cluster = cluster
-
-        first = sorted_cluster[0]
-        avg_dur = sum(c.duration for c in cluster) / len(cluster)
-        ep_range = format_episode_range(cluster)
-        output_name = generate_output_name(cluster, output_dir, episode_parsing)
-
-        patterns.append(ChapterPattern(
-            chapters=sorted_cluster,
-            avg_duration=avg_dur,
-            episode_range=ep_range,
-            first_occurrence=first,
-            output_name=output_name,
-        ))
+def _add_filter_profile_option(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--filter-profile",
+        dest="filter_profiles",
+        action="append",
+        type=_parse_filter_profile,
+        default=[],
+        metavar="NAME:SETTINGS",
+        help="Evaluate a named set of filters over the same probed chapters, extracting to "
+             "OUTPUT_DIR/NAME (repeatable). SETTINGS is a comma-separated list of duration=MIN-MAX, "
+             "names[=yes|no], min-occurrences=N and tolerance=SECONDS or tolerance=PERCENT%%; "
+             "anything not set comes from the global options",
+    )
 
-    # Sort by first occurrence episode, then by start time within that episode
-    patterns.sort(key=lambda p: (
-        (p.first_occurrence.episode.season, p.first_occurrence.episode.episode) if p.first_occurrence.episode else (0, 0),
-        p.first_occurrence.start,
-    ))
-    return patterns
 
+def _check_filter_profiles(parser: argparse.ArgumentParser, args: argparse.Namespace) -> None:
+    names = [name for name, _ in args.filter_profiles]
+    if len(set(names)) != len(names):
+        parser.error("--filter-profile names must be unique")
+    if names and args.auto:
+        parser.error("--filter-profile can't be combined with --auto")
 
-def _print_summary(
-    patterns: list[ChapterPattern],
-    total_files: int,
-    skipped_no_chapters: int,
-    skipped_no_episode: int,
-) -> None:
-    """Print detection summary."""
-    print(f"\nScanned {total_files} files", end="")
+
+def _add_resume_option(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Continue an interrupted run: keep the outputs listed in OUTPUT_DIR's journal that still "
+             "have their recorded size and duration, delete partial files and extract the rest",
+    )
+
+
+def _add_instrumentation_options(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--timings",
+        action="store_true",
+        help="Print per-stage wall/CPU time, mkvtoolnix call latencies, bytes read and written "
+             "and the slowest files to stderr when done",
+    )
+    parser.add_argument(
+        "--timings-json",
+        default=None,
+        metavar="FILE",
+        help="Write the --timings report as JSON to FILE",
+    )
+    parser.add_argument(
+        "--profile",
+        default=None,
+        metavar="FILE",
+        help="Write a cProfile dump of the main thread to FILE and the top memory allocations "
+             "to FILE.allocations.txt (slow; for diagnosing performance problems)",
+    )
+    parser.add_argument(
+        "--metrics-file",
+        default=None,
+        metavar="PATH",
+        help="Write Prometheus text-format metrics to PATH (e.g. a node-exporter textfile "
+             "collector directory, with a .prom suffix), periodically and when done",
+    )
+    parser.add_argument(
+        "--metrics-interval",
+        type=float,
+        default=DEFAULT_METRICS_INTERVAL,
+        metavar="SECONDS",
+        help=f"How often --metrics-file is rewritten during a run. Default: {DEFAULT_METRICS_INTERVAL:g}",
+    )
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse CLI arguments."""
+    parser = _build_parser(
+        "chapter-extractor",
+        "Extract recurring chapter segments from MKV collections.",
+        epilog="Run 'chapter-extractor watch --help' for the long-running watch mode, "
+               "'chapter-extractor merge --help' to combine --shard runs and "
+               "'chapter-extractor serve --help' for the Unix socket service.",
+    )
+    parser.add_argument(
+        "--recursive", "-r",
+        action="store_true",
+        help="Scan subdirectories",
+    )
+    parser.add_argument(
+        "--vectorized",
+        action="store_true",
+        help="Filter and cluster with NumPy arrays (requires numpy); faster on very large libraries",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Group and extract each series directory as soon as it is probed",
+    )
+    parser.add_argument(
+        "--shard",
+        type=_parse_shard,
+        default=None,
+        metavar="I/N",
+        help="Only probe the series directories of shard I of N and write them to a shard index "
+             "instead of grouping and extracting; combine the shards with 'chapter-extractor merge'",
+    )
+    parser.add_argument(
+        "--shard-output",
+        default=None,
+        metavar="FILE",
+        help="Where --shard writes its index. Default: OUTPUT_DIR/chapters-shard-I-of-N.json",
+    )
+    _add_filter_profile_option(parser)
+    _add_output_format_option(parser)
+    _add_resume_option(parser)
+    _add_instrumentation_options(parser)
+    args = parser.parse_args(argv)
+    if args.shard is not None and args.stream:
+        parser.error("--shard can't be combined with --stream")
+    if args.auto and args.stream:
+        parser.error("--auto can't be combined with --stream")
+    if args.filter_profiles and args.stream:
+        parser.error("--filter-profile can't be combined with --stream")
+    _check_filter_profiles(parser, args)
+    if args.shard is not None and args.shard_output is None:
+        index, count = args.shard
+        args.shard_output = os.path.join(args.output_dir, f"chapters-shard-{index}-of-{count}.json")
+    return _finish_args(args)
+
+
+def parse_merge_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse CLI arguments of the merge subcommand."""
+    parser = _build_parser(
+        "chapter-extractor merge",
+        "Group and extract the chapters collected by several 'chapter-extractor --shard' runs.",
+    )
+    parser.add_argument(
+        "shard_files",
+        nargs="+",
+        metavar="SHARD_INDEX",
+        help="Index files written by --shard; INPUT_DIR is this machine's path to the library",
+    )
+    parser.add_argument(
+        "--vectorized",
+        action="store_true",
+        help="Filter and cluster with NumPy arrays (requires numpy); faster on very large libraries",
+    )
+    _add_filter_profile_option(parser)
+    _add_output_format_option(parser)
+    _add_resume_option(parser)
+    _add_instrumentation_options(parser)
+    args = parser.parse_args(argv)
+    _check_filter_profiles(parser, args)
+    args = _finish_args(args)
+    args.stream = False
+    return args
+
+
+def parse_watch_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse CLI arguments of the watch subcommand."""
+    parser = _build_parser(
+        "chapter-extractor watch",
+        "Watch a library for new or changed MKV files and process each affected series directory.",
+    )
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=DEFAULT_DEBOUNCE_SECONDS,
+        metavar="SECONDS",
+        help=f"Wait until no file has changed for this long before processing. Default: {DEFAULT_DEBOUNCE_SECONDS:g}",
+    )
+    args = _finish_args(parser.parse_args(argv))
+    args.recursive = True
+    args.stream = False
+    return args
+
+
+def parse_serve_args(argv: list[str] | None = None) -> argparse.Namespace:
+    """Parse CLI arguments of the serve subcommand."""
+    parser = argparse.ArgumentParser(
+        prog="chapter-extractor serve",
+        description="Answer JSON requests on a Unix socket, keeping each library's probe results in memory.",
+    )
+    parser.add_argument("socket", help="Path of the Unix domain socket to listen on")
+    parser.add_argument(
+        "--scan-threads",
+        type=_positive_int,
+        default=DEFAULT_SCAN_THREADS,
+        help=f"Number of directories listed concurrently. Default: {DEFAULT_SCAN_THREADS}",
+    )
+    parser.add_argument(
+        "--jobs", "-j",
+        type=_positive_int,
+        default=_default_jobs(),
+        help="Number of files to probe concurrently. Default: CPU count",
+    )
+    parser.add_argument(
+        "--extract-jobs",
+        type=_positive_int,
+        default=_default_jobs(),
+        help="Maximum number of concurrent extractions. Default: CPU count",
+    )
+    parser.add_argument(
+        "--per-device",
+        type=_positive_int,
+        default=1,
+        help="Maximum concurrent extractions reading from one block device. Default: 1",
+    )
+    parser.add_argument(
+        "--per-output-device",
+        type=_positive_int,
+        default=None,
+        help="Maximum concurrent extractions writing to one block device. Default: --extract-jobs",
+    )
+    return parser.parse_args(argv)
+
+
+def _scan_options(args: argparse.Namespace) -> dict:
+    """Keyword arguments for walk_library taken from the CLI options."""
+    exclude = list(args.exclude) if args.no_default_excludes else [*DEFAULT_EXCLUDES, *args.exclude]
+    return {
+        "extensions": args.extensions,
+        "include": args.include,
+        "exclude": exclude,
+        "threads": args.scan_threads,
+    }
+
+
+def _iter_mkv_files(input_dir: str, recursive: bool, **scan_options: object) -> Iterator[str]:
+    """Yield matching files directory by directory, without waiting for the full walk."""
+    for _directory, files in walk_library(input_dir, recursive, **scan_options):
+        yield from files
+
+
+def _scan_directory(input_dir: str, recursive: bool, **scan_options: object) -> list[str]:
+    """Find all MKV files in directory, in walk order."""
+    return list(_iter_mkv_files(input_dir, recursive, **scan_options))
+
+
+def _completed(value: list[Chapter] | None) -> Future[list[Chapter] | None]:
+    """Wrap an already known probe result in a finished future."""
+    from concurrent.futures import Future
+
+    future: Future[list[Chapter] | None] = Future()
+    future.set_result(value)
+    return future
+
+
+def _read_now(mkv_path: str, keep: ChapterFilter | None = None) -> Future[list[Chapter] | None]:
+    """Read a file on the calling thread into a finished future, like a worker would."""
+    from concurrent.futures import Future
+
+    future: Future[list[Chapter] | None] = Future()
+    try:
+        future.set_result(_read_file(mkv_path, keep))
+    except ProbeUnavailable as e:
+        future.set_exception(e)
+    return future
+
+
+def _read_file(mkv_path: str, keep: ChapterFilter | None = None) -> list[Chapter] | None:
+    with timing.file_probe(mkv_path):
+        return read_chapters(mkv_path, keep)
+
+
+def _read_filter(args: argparse.Namespace, cache: ProbeCache | RunState | None) -> ChapterFilter | None:
+    """The filters to apply while reading chapters, or None to read every chapter.
+
+    Cached and recorded probe results must stay complete so that they can
+    serve runs with other filters, so filters are only pushed down without
+    a cache or state file.
+    """
+    keep = ChapterFilter(args.duration_range, args.chapter_names)
+    # --auto needs every chapter to place the others within their file, and
+    # each --filter-profile has filters of its own
+    return keep if keep.active and cache is None and not args.auto and not args.filter_profiles else None
+
+
+def _probe_files(
+    mkv_files: Iterable[str],
+    jobs: int,
+    cache: ProbeCache | RunState | None = None,
+    keep: ChapterFilter | None = None,
+) -> Iterator[tuple[str, list[Chapter] | None]]:
+    """Read chapters from files using up to `jobs` worker threads.
+
+    Results are yielded in input order regardless of completion order. At most
+    2 * jobs files are in flight, so memory stays bounded on large libraries.
+    Cache lookups and writes happen on the calling thread; only misses are
+    handed to the workers. keep (see _read_filter) must not be combined with
+    a cache. Files that fail with ProbeUnavailable are yielded as unreadable
+    but never cached.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    pool = ThreadPoolExecutor(max_workers=jobs) if jobs > 1 else None
+    pending: deque[tuple[str, FileIdentity | None, Future[list[Chapter] | None]]] = deque()
+
+    def finish() -> tuple[str, list[Chapter] | None]:
+        path, identity, future = pending.popleft()
+        try:
+            chapters = future.result()
+        except ProbeUnavailable:
+            # Missing tool or I/O error: unreadable this time, but nothing to remember about the file
+            return path, None
+        if identity is not None:
+            cache.put(path, identity, chapters)
+        return path, chapters
+
+    try:
+        for mkv_path in mkv_files:
+            identity = file_identity(mkv_path) if cache is not None else None
+            future = None
+            if identity is not None:
+                hit, chapters = cache.get(mkv_path, identity)
+                if hit:
+                    future, identity = _completed(chapters), None
+            if future is None:
+                if pool is None:
+                    future = _read_now(mkv_path, keep)
+                else:
+                    future = pool.submit(_read_file, mkv_path, keep)
+            pending.append((mkv_path, identity, future))
+            if len(pending) >= jobs * 2:
+                yield finish()
+        while pending:
+            yield finish()
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+
+
+def _print_scan_line(counts: _ScanCounts) -> None:
+    """Print the scanned/skipped file counts."""
+    print(f"\nScanned {counts.total_files} files", end="")
     skips = []
-    if skipped_no_chapters > 0:
-        skips.append(f"{skipped_no_chapters} skipped: no chapters")
-    if skipped_no_episode > 0:
-        skips.append(f"{skipped_no_episode} skipped: no episode tag")
+    if counts.skipped_no_chapters > 0:
+        skips.append(f"{counts.skipped_no_chapters} skipped: no chapters")
+    if counts.skipped_no_match > 0:
+        skips.append(f"{counts.skipped_no_match} skipped: no matching chapters")
+    if counts.skipped_no_episode > 0:
+        skips.append(f"{counts.skipped_no_episode} skipped: no episode tag")
     if skips:
         print(f" ({', '.join(skips)})")
     else:
         print()
 
-    if not patterns:
-        print("\nNo matching patterns detected.")
+
+def _describe_occurrence(chapter: Chapter) -> str:
+    """Episode (or file name) and time range of one cluster member."""
+    ep_str = str(chapter.episode) if chapter.episode else os.path.splitext(os.path.basename(chapter.source_file))[0]
+    return f"{ep_str} @ {format_timestamp(chapter.start)} - {format_timestamp(chapter.end)}"
+
+
+def _print_pattern(index: int, pattern: ChapterPattern) -> None:
+    """Print one detected pattern."""
+    title = pattern.first_occurrence.title or f"{int(pattern.avg_duration)}s"
+    print(f"  [{index}] {title} ({int(pattern.avg_duration)}s avg) — {pattern.episode_range} ({len(pattern.chapters)} episodes)")
+    first = pattern.first_occurrence
+    print(f"      First occurrence: {_describe_occurrence(first)}")
+    if pattern.representative is not first:
+        print(f"      Extracted from: {_describe_occurrence(pattern.representative)}")
+    print(f"      Output: {os.path.basename(pattern.output_name)}")
+
+
+def _print_summary(sections: list[tuple[str, list[ChapterPattern]]], counts: _ScanCounts) -> None:
+    """Print detection summary: the patterns of each filter profile (one unnamed without profiles)."""
+    _print_scan_line(counts)
+
+    index = 0
+    for name, patterns in sections:
+        label = f" ({name})" if name else ""
+        if not patterns:
+            print(f"\nNo matching patterns detected{label}.")
+            continue
+        print(f"\nDetected patterns{label}:")
+        for pattern in patterns:
+            index += 1
+            _print_pattern(index, pattern)
+    if index:
+        print()
+
+
+@dataclass
+class _ScanCounts:
+    total_files: int = 0
+    skipped_no_chapters: int = 0
+    skipped_no_episode: int = 0
+    skipped_no_match: int = 0
+    chapters: int = 0
+    # Chapters were read through a ChapterFilter: only matching ones are counted
+    prefiltered: bool = False
+
+
+def _accept_file(
+    mkv_path: str,
+    chapters: list[Chapter] | None,
+    episode_parsing: bool,
+    counts: _ScanCounts,
+) -> list[Chapter]:
+    """Check a probe result, attach the episode and update counters.
+
+    Returns the file's chapters, or [] if the file is skipped.
+    """
+    counts.total_files += 1
+    timing.count("files_scanned")
+    if chapters is None:
+        print(f"Warning: Could not read {mkv_path}, skipping.", file=sys.stderr)
+        counts.skipped_no_chapters += 1
+        timing.count("files_skipped", reason="unreadable")
+        return []
+    if not chapters and counts.prefiltered:
+        counts.skipped_no_match += 1
+        timing.count("files_skipped", reason="no_match")
+        return []
+    if not chapters:
+        print(f"Warning: No chapters in {mkv_path}, skipping.", file=sys.stderr)
+        counts.skipped_no_chapters += 1
+        timing.count("files_skipped", reason="no_chapters")
+        return []
+
+    if episode_parsing:
+        episode = parse_episode(mkv_path)
+        if episode is None:
+            print(f"Warning: No episode tag in {os.path.basename(mkv_path)}, skipping.", file=sys.stderr)
+            counts.skipped_no_episode += 1
+            timing.count("files_skipped", reason="no_episode")
+            return []
+        for ch in chapters:
+            ch.episode = episode
+
+    counts.chapters += len(chapters)
+    timing.count("chapters_read", len(chapters))
+    return chapters
+
+
+_FILTER_BATCH_SIZE = 10_000
+
+
+def _grouping_config(args: argparse.Namespace) -> GroupingConfig:
+    return GroupingConfig(
+        tolerance_seconds=args.tolerance_seconds,
+        tolerance_percent=args.tolerance_percent,
+        start_window=args.start_window,
+        max_episode_gap=args.max_episode_gap if args.episode_parsing else None,
+    )
+
+
+def _profiles(args: argparse.Namespace) -> list[tuple[str, Query]]:
+    """The named --filter-profile queries, or a single unnamed one made of the global options."""
+    grouping = _grouping_config(args)
+    base = Query(
+        duration_range=args.duration_range,
+        chapter_names=args.chapter_names,
+        min_occurrences=args.min_occurrences,
+        grouping=grouping,
+        episode_parsing=args.episode_parsing,
+        vectorized=args.vectorized,
+        representative=args.representative,
+    )
+    if not args.filter_profiles:
+        return [("", base)]
+    profiles = []
+    for name, overrides in args.filter_profiles:
+        overrides = dict(overrides)
+        tolerance = {k: overrides.pop(k) for k in ("tolerance_seconds", "tolerance_percent") if k in overrides}
+        profiles.append((name, replace(base, grouping=replace(grouping, **tolerance), **overrides)))
+    return profiles
+
+
+def _profile_dir(output_dir: str, name: str) -> str:
+    return os.path.join(output_dir, name) if name else output_dir
+
+
+def _vectorized_available() -> bool:
+    """Whether --vectorized can run; prints why not if numpy is missing."""
+    from importlib.util import find_spec
+
+    if find_spec("numpy") is None:
+        print("Error: --vectorized requires numpy (pip install chapter-extractor[fast]).", file=sys.stderr)
+        return False
+    return True
+
+
+def _group_chapters(
+    filtered: list[Chapter],
+    args: argparse.Namespace,
+    vectorized: bool = False,
+) -> list[list[Chapter]]:
+    """Group filtered chapters into clusters that meet the occurrence threshold."""
+    return group_clusters(filtered, _grouping_config(args), args.min_occurrences, vectorized)
+
+
+def _discover_ranges(histogram: DurationHistogram, args: argparse.Namespace) -> list[tuple[float, float]]:
+    """Print the recurring durations of an --auto run and return their merged ranges."""
+    bandwidth = args.tolerance_seconds if args.tolerance_seconds is not None else 2.0
+    peaks = histogram.peaks(max(args.min_occurrences, 2), bandwidth)
+    if peaks:
+        print("Auto-detected duration ranges:")
+        for peak in peaks:
+            print(f"  {peak.low:g}-{peak.high:g}s near the {peak.position} ({peak.chapters} chapters)")
+    return merge_ranges(peaks)
+
+
+def _group_by_range(
+    chapters: list[Chapter],
+    ranges: list[tuple[float, float]],
+    args: argparse.Namespace,
+    vectorized: bool = False,
+) -> list[list[Chapter]]:
+    """Filter and group chapters separately for each duration range."""
+    clusters: list[list[Chapter]] = []
+    for duration_range in ranges:
+        filtered = filter_chapters(chapters, duration_range, args.chapter_names)
+        if filtered:
+            clusters.extend(_group_chapters(filtered, args, vectorized))
+    return clusters
+
+
+def _write_allocations(path: str, stats: list, limit: int = 25) -> None:
+    """Write the largest tracemalloc statistics, one allocation site per line."""
+    with open(path, "w") as f:
+        f.write(f"Top {min(limit, len(stats))} allocation sites still held at exit:\n")
+        for stat in stats[:limit]:
+            f.write(f"{stat}\n")
+
+
+def _write_timings_json(path: str, recorder: timing.Recorder) -> None:
+    import json
+
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(recorder.to_dict(), f, indent=2)
+    os.replace(tmp_path, path)
+
+
+def _instrumented(args: argparse.Namespace, body: Callable[[], int]) -> int:
+    """Run body, collecting timings, metrics and a profile as requested by args, then report them."""
+    if not (args.timings or args.timings_json or args.profile or args.metrics_file):
+        return body()
+    recorder = timing.Recorder()
+    timing.activate(recorder)
+    metrics = None
+    if args.metrics_file:
+        metrics = MetricsFile(args.metrics_file, recorder, os.path.abspath(args.input_dir), args.metrics_interval)
+        metrics.start()
+    profiler = None
+    if args.profile:
+        # Imported lazily: both are only needed when profiling
+        import cProfile
+        import tracemalloc
+
+        tracemalloc.start()
+        profiler = cProfile.Profile()
+        profiler.enable()
+    exit_code = None
+    try:
+        exit_code = body()
+        return exit_code
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            stats = tracemalloc.take_snapshot().statistics("lineno")
+            tracemalloc.stop()
+            try:
+                profiler.dump_stats(args.profile)
+                _write_allocations(f"{args.profile}.allocations.txt", stats)
+            except OSError as e:
+                print(f"Warning: Could not write profile {args.profile}: {e}", file=sys.stderr)
+        timing.activate(None)
+        if metrics is not None:
+            metrics.finish(exit_code)
+        if args.timings:
+            print("\n".join(recorder.summary_lines()), file=sys.stderr)
+        if args.timings_json:
+            try:
+                _write_timings_json(args.timings_json, recorder)
+            except OSError as e:
+                print(f"Warning: Could not write timings to {args.timings_json}: {e}", file=sys.stderr)
+
+
+@contextlib.contextmanager
+def _reporting(args: argparse.Namespace) -> Iterator[NdjsonReporter | None]:
+    """With --output-format ndjson, yield a reporter on stdout and send the human-readable output to stderr."""
+    if args.output_format != "ndjson":
+        yield None
         return
+    reporter = NdjsonReporter(sys.stdout)
+    with contextlib.redirect_stdout(sys.stderr):
+        yield reporter
 
-    print(f"\nDetected patterns:")
-    for i, pattern in enumerate(patterns, 1):
-        title = pattern.first_occurrence.title or f"{int(pattern.avg_duration)}s"
-        print(f"  [{i}] {title} ({int(pattern.avg_duration)}s avg) — {pattern.episode_range} ({len(pattern.chapters)} episodes)")
-        first = pattern.first_occurrence
-        ep_str = str(first.episode) if first.episode else Path(first.source_file).stem
-        print(f"      First occurrence: {ep_str} @ {format_timestamp(first.start)} - {format_timestamp(first.end)}")
-        print(f"      Output: {os.path.basename(pattern.output_name)}")
-    print()
+
+@contextlib.contextmanager
+def _journaling(args: argparse.Namespace) -> Iterator[Journal | None]:
+    """The output directory's journal for runs that extract; --resume first deletes partial outputs."""
+    if args.dry_run:
+        yield None
+        return
+    if args.resume:
+        for name in ["", *(name for name, _ in args.filter_profiles)]:
+            for path in remove_partial_outputs(_profile_dir(args.output_dir, name)):
+                print(f"Removed partial output: {os.path.relpath(path, args.output_dir)}")
+    journal = Journal(args.output_dir, resume=args.resume)
+    try:
+        yield journal
+    finally:
+        journal.close()
 
 
 def run(args: argparse.Namespace) -> int:
     """Main pipeline."""
+    cache = None
+    if args.cache:
+        cache = ProbeCache(args.cache, args.cache_max_age, args.cache_max_entries)
+    state = RunState(args.state, fallback=cache) if args.state else None
+    store = SegmentStore(args.segment_store) if args.segment_store else None
+    try:
+        with _reporting(args) as reporter, _journaling(args) as journal:
+            if args.stream:
+                return _instrumented(args, lambda: _run_streaming(args, cache, state, store, reporter, journal))
+            return _instrumented(args, lambda: _run(args, cache, state, store, reporter, journal))
+    finally:
+        if state is not None:
+            state.save()
+        if cache is not None:
+            cache.close()
+        if store is not None:
+            store.close()
+
+
+def _run(
+    args: argparse.Namespace,
+    cache: ProbeCache | None,
+    state: RunState | None,
+    store: SegmentStore | None = None,
+    reporter: NdjsonReporter | None = None,
+    journal: Journal | None = None,
+) -> int:
     if not os.path.isdir(args.input_dir):
         print(f"Error: Input directory not found: {args.input_dir}", file=sys.stderr)
         return 1
 
     # Step 1: Scan
-    mkv_files = _scan_directory(args.input_dir, args.recursive)
+    with timing.stage("scan"):
+        mkv_files = _scan_directory(args.input_dir, args.recursive, **_scan_options(args))
     if not mkv_files:
         print(f"No .mkv files found in {args.input_dir}", file=sys.stderr)
         return 1
+    if args.shard is not None:
+        return _write_shard(args, mkv_files, cache, state)
 
-    # Step 2: Read chapters and parse episodes
-    all_chapters: list[Chapter] = []
-    skipped_no_chapters = 0
-    skipped_no_episode = 0
+    keep = _read_filter(args, state or cache)
+    results = _probe_files(mkv_files, args.jobs, state or cache, keep)
+    return _process(args, results, state, store, reporter, prefiltered=keep is not None, journal=journal)
 
-    for mkv_path in mkv_files:
-        chapters = read_chapters(mkv_path)
-        if chapters is None:
-            print(f"Warning: Could not read {mkv_path}, skipping.", file=sys.stderr)
-            skipped_no_chapters += 1
-            continue
-        if not chapters:
-            print(f"Warning: No chapters in {mkv_path}, skipping.", file=sys.stderr)
-            skipped_no_chapters += 1
-            continue
 
-        if args.episode_parsing:
-            episode = parse_episode(mkv_path)
-            if episode is None:
-                print(f"Warning: No episode tag in {os.path.basename(mkv_path)}, skipping.", file=sys.stderr)
-                skipped_no_episode += 1
+def _process(
+    args: argparse.Namespace,
+    results: Iterable[tuple[str, list[Chapter] | None]],
+    state: RunState | None,
+    store: SegmentStore | None,
+    reporter: NdjsonReporter | None = None,
+    prefiltered: bool = False,
+    journal: Journal | None = None,
+) -> int:
+    """Filter, group and extract probe results given in scan order.
+
+    prefiltered results were read through the run's ChapterFilter, so files
+    without chapters can't be told apart from files without matching ones.
+    Outputs in the journal keep their names and aren't extracted again. Each
+    filter profile is filtered, grouped and named on its own; a segment
+    that several profiles found is extracted once and linked to the rest.
+    """
+    profiles = _profiles(args)
+
+    # Step 2: Read chapters, parse episodes and filter
+    if args.vectorized:
+        if not _vectorized_available():
+            return 1
+        from chapter_extractor.table import ChapterTable
+
+        def select(chapters: list[Chapter]) -> list[list[Chapter]]:
+            table = ChapterTable(chapters)
+            return [table.to_chapters(table.filter(q.duration_range, q.chapter_names)) for _, q in profiles]
+    else:
+        def select(chapters: list[Chapter]) -> list[list[Chapter]]:
+            return [filter_chapters(chapters, q.duration_range, q.chapter_names) for _, q in profiles]
+
+    # Filter in batches while probing so rejected chapters are dropped early
+    # instead of holding every chapter of the library until all files are read.
+    # --auto only keeps chapters near the ends of files until the ranges are known.
+    filtered: list[list[Chapter]] = [[] for _ in profiles]
+    pending: list[Chapter] = []
+    histogram = DurationHistogram() if args.auto else None
+    counts = _ScanCounts(prefiltered=prefiltered)
+    for mkv_path, chapters in timing.timed_iter("probe", results):
+        with timing.stage("filter"):
+            accepted = _accept_file(mkv_path, chapters, args.episode_parsing, counts)
+            if reporter is not None:
+                reporter.file(mkv_path, chapters, skip_reason(mkv_path, chapters, args.episode_parsing, prefiltered))
+            if histogram is not None:
+                filtered[0].extend(histogram.add_file(accepted))
                 continue
-            for ch in chapters:
-                ch.episode = episode
+            pending.extend(accepted)
+            if len(pending) >= _FILTER_BATCH_SIZE:
+                for kept, selected in zip(filtered, select(pending)):
+                    kept.extend(selected)
+                pending = []
+    with timing.stage("filter"):
+        for kept, selected in zip(filtered, select(pending)):
+            kept.extend(selected)
+        ranges = _discover_ranges(histogram, args) if histogram is not None else None
+
+    if counts.chapters == 0 and not prefiltered:
+        return _stop("No chapters found in any files.", reporter, counts)
+    if ranges is not None and not ranges:
+        return _stop("No recurring chapter durations found.", reporter, counts)
+    if not any(filtered):
+        return _stop("No chapters match the specified filters.", reporter, counts)
+
+    # Step 3: Group
+    with timing.stage("group"):
+        if ranges is not None:
+            clusters = [_group_by_range(filtered[0], ranges, args, args.vectorized)]
+        else:
+            clusters = [
+                group_clusters(kept, query.grouping, query.min_occurrences, args.vectorized) if kept else []
+                for kept, (_, query) in zip(filtered, profiles)
+            ]
+    if not any(clusters):
+        return _stop("No patterns meet the minimum occurrence threshold.", reporter, counts)
+
+    # Step 4: Build patterns and print summary
+    sections: list[tuple[str, list[ChapterPattern]]] = []
+    with timing.stage("build"):
+        for (name, _), found in zip(profiles, clusters):
+            output_dir = _profile_dir(args.output_dir, name)
+            os.makedirs(output_dir, exist_ok=True)
+            sections.append((name, build_patterns(
+                found, output_dir, args.episode_parsing, _journaled(journal), args.representative,
+            )))
+        patterns = [pattern for _, found in sections for pattern in found]
+        plan = state.plan(patterns) if state is not None else None
+    _print_summary(sections, counts)
+    if reporter is not None:
+        for i, pattern in enumerate(patterns, 1):
+            reporter.pattern(i, pattern)
+
+    # Step 5: Extract (unless dry run)
+    if args.dry_run:
+        _report_summary(reporter, counts, len(patterns))
+        return 0
+
+    to_extract = patterns if plan is None else _apply_plan(plan, state, reporter)
+    to_extract, duplicates = _split_duplicates(to_extract)
+    progress = _ExtractionProgress(
+        threading.Lock(), total=len(to_extract) + len(duplicates),
+        store=store, reporter=reporter, journal=journal,
+    )
+    with timing.stage("extract"):
+        scheduler = DeviceScheduler(args.extract_jobs, args.per_device, per_output_device=args.per_output_device)
+        for group in group_by_source(to_extract):
+            submit_extraction(scheduler, group, progress.report, progress.store, progress.journal)
+        scheduler.join()
+        _place_duplicates(duplicates, progress)
+    if state is not None:
+        state.record(progress.extracted)
+        _print_stale(state)
+
+    print(f"\nDone. {progress.success} extracted, {progress.fail} failed.")
+    _print_store_savings(store)
+    _report_summary(reporter, counts, len(patterns), progress)
+    return 0 if progress.fail == 0 else 1
+
+
+def _stop(message: str, reporter: NdjsonReporter | None, counts: _ScanCounts) -> int:
+    """End a run that found nothing to extract: explain why and emit the summary record."""
+    print(message, file=sys.stderr)
+    _report_summary(reporter, counts, 0)
+    return 1
+
+
+def _report_summary(
+    reporter: NdjsonReporter | None,
+    counts: _ScanCounts,
+    patterns: int,
+    progress: _ExtractionProgress | None = None,
+) -> None:
+    """Emit the final NDJSON summary record (extraction counts are null if nothing was extracted)."""
+    if reporter is None:
+        return
+    reporter.summary(
+        files=counts.total_files,
+        skipped_no_chapters=counts.skipped_no_chapters,
+        skipped_no_episode=counts.skipped_no_episode,
+        skipped_no_match=counts.skipped_no_match,
+        chapters=counts.chapters,
+        patterns=patterns,
+        extracted=progress.success if progress is not None else None,
+        failed=progress.fail if progress is not None else None,
+    )
+
+
+def _write_shard(
+    args: argparse.Namespace,
+    mkv_files: list[str],
+    cache: ProbeCache | None,
+    state: RunState | None,
+) -> int:
+    """Probe this shard's series directories and write their chapters to a shard index."""
+    index, count = args.shard
+    mine = [p for p in mkv_files if shard_of(_series_key(p, args.input_dir), count) == index]
+    records: list[ShardRecord] = []
+    for mkv_path, chapters in _probe_files(mine, args.jobs, state or cache):
+        records.append(ShardRecord(
+            path=to_portable(mkv_path, args.input_dir),
+            chapters=chapters_to_rows(chapters),
+            skipped=skip_reason(mkv_path, chapters, args.episode_parsing),
+        ))
+    write_shard_index(args.shard_output, ShardIndex(shard=index, count=count, files=records))
+    skipped = sum(1 for r in records if r.skipped)
+    print(
+        f"Shard {index}/{count}: probed {len(records)} of {len(mkv_files)} files "
+        f"({skipped} skipped), wrote {args.shard_output}"
+    )
+    return 0
+
+
+def _load_shards(paths: list[str], input_dir: str) -> list[tuple[str, list[Chapter] | None]]:
+    """Combine shard indexes into probe results in single-node scan order."""
+    indexes = [read_shard_index(p) for p in paths]
+    counts = {i.count for i in indexes}
+    if len(counts) > 1:
+        raise ShardIndexError(f"Shard indexes come from different splits: {sorted(counts)} shards")
+    seen: dict[int, str] = {}
+    for path, index in zip(paths, indexes):
+        if index.shard in seen:
+            raise ShardIndexError(f"Shard {index.shard}/{index.count} given twice: {seen[index.shard]}, {path}")
+        seen[index.shard] = path
+    count = counts.pop()
+    missing = [str(i) for i in range(1, count + 1) if i not in seen]
+    if missing:
+        print(f"Warning: Missing shard(s) {', '.join(missing)} of {count}; results will be incomplete.", file=sys.stderr)
+
+    records = sorted((r for index in indexes for r in index.files), key=lambda r: scan_order_key(r.path))
+    results: list[tuple[str, list[Chapter] | None]] = []
+    for record in records:
+        mkv_path = from_portable(record.path, input_dir)
+        results.append((mkv_path, chapters_from_rows(record.chapters, mkv_path)))
+    return results
 
-        all_chapters.extend(chapters)
 
-    if not all_chapters:
-        print("No chapters found in any files.", file=sys.stderr)
+def run_merge(args: argparse.Namespace) -> int:
+    """Group and extract the union of several shard indexes as if probed by a single run."""
+    with _reporting(args) as reporter:
+        return _instrumented(args, lambda: _run_merge(args, reporter))
+
+
+def _run_merge(args: argparse.Namespace, reporter: NdjsonReporter | None = None) -> int:
+    try:
+        with timing.stage("load"):
+            results = _load_shards(args.shard_files, args.input_dir)
+    except ShardIndexError as e:
+        print(f"Error: {e}", file=sys.stderr)
         return 1
+    if not results:
+        print("No .mkv files found in the shard indexes", file=sys.stderr)
+        return 1
+
+    state = RunState(args.state) if args.state else None
+    store = SegmentStore(args.segment_store) if args.segment_store else None
+    try:
+        with _journaling(args) as journal:
+            return _process(args, results, state, store, reporter, journal=journal)
+    finally:
+        if state is not None:
+            state.save()
+        if store is not None:
+            store.close()
+
+
+def _apply_plan(
+    plan: ExtractionPlan,
+    state: RunState,
+    reporter: NdjsonReporter | None = None,
+) -> list[ChapterPattern]:
+    """Reuse outputs of the previous run. Returns the patterns that still need extracting."""
+    reused: list[ChapterPattern] = []
+    to_extract = list(plan.extract)
+    for pattern in plan.keep:
+        print(f"Up to date: {os.path.basename(pattern.output_name)}")
+        if reporter is not None:
+            reporter.extraction(pattern, "up_to_date")
+        reused.append(pattern)
+    for old_name, pattern in plan.rename:
+        try:
+            os.replace(old_name, pattern.output_name)
+        except OSError as e:
+            print(f"Warning: Could not rename {old_name}: {e}", file=sys.stderr)
+            to_extract.append(pattern)
+            continue
+        print(f"Renamed: {os.path.basename(old_name)} -> {os.path.basename(pattern.output_name)}")
+        if reporter is not None:
+            reporter.extraction(pattern, "renamed")
+        reused.append(pattern)
+    state.record(reused)
+    return to_extract
+
+
+def _print_stale(state: RunState) -> None:
+    """Point out outputs of earlier runs that no longer correspond to a pattern."""
+    for output_name in state.stale_outputs():
+        print(f"Stale: {os.path.basename(output_name)} no longer matches any pattern")
+
+
+def _journaled(journal: Journal | None) -> set[str]:
+    """Outputs a resumed run may overwrite under their old names instead of picking new ones."""
+    return journal.outputs() if journal is not None else set()
+
+
+# Console status, metrics result and NDJSON status of each way an output can be produced
+_OUTCOMES = {
+    "extracted": ("OK", "success"),
+    "linked": ("OK (linked)", "linked"),
+    "resumed": ("OK (resumed)", "resumed"),
+    "failed": ("FAILED", "failure"),
+}
+
+
+class _ExtractionProgress:
+    """Thread-safe OK/FAILED reporting for concurrently running extractions."""
+
+    def __init__(
+        self,
+        lock: threading.Lock,
+        total: int | None = None,
+        store: SegmentStore | None = None,
+        reporter: NdjsonReporter | None = None,
+        journal: Journal | None = None,
+    ) -> None:
+        self.lock = lock
+        self.total = total
+        self.store = store
+        self.reporter = reporter
+        self.journal = journal
+        self.success = 0
+        self.fail = 0
+        self.extracted: list[ChapterPattern] = []
+
+    def report(self, pattern: ChapterPattern, ok: bool, how: str = "extracted") -> None:
+        """how is extracted, linked (from the segment store) or resumed (from the journal)."""
+        outcome = how if ok else "failed"
+        status, result = _OUTCOMES[outcome]
+        with self.lock:
+            if ok:
+                self.success += 1
+                self.extracted.append(pattern)
+            else:
+                self.fail += 1
+            prefix = f"[{self.success + self.fail}/{self.total}] " if self.total is not None else ""
+            timing.count("extractions", result=result)
+            print(f"{prefix}Extracting: {os.path.basename(pattern.output_name)}... {status}", flush=True)
+            if self.reporter is not None:
+                self.reporter.extraction(pattern, outcome)
+
+
+def _split_duplicates(
+    patterns: list[ChapterPattern],
+) -> tuple[list[ChapterPattern], list[tuple[ChapterPattern, ChapterPattern]]]:
+    """Separate patterns whose segment another pattern (of another profile) already extracts.
+
+    Returns the patterns to extract and (duplicate, pattern extracting its segment) pairs.
+    """
+    unique: list[ChapterPattern] = []
+    duplicates: list[tuple[ChapterPattern, ChapterPattern]] = []
+    by_segment: dict[SegmentKey, ChapterPattern] = {}
+    for pattern in patterns:
+        primary = by_segment.setdefault(segment_key(pattern.representative), pattern)
+        if primary is pattern:
+            unique.append(pattern)
+        else:
+            duplicates.append((pattern, primary))
+    return unique, duplicates
+
+
+def _place_duplicates(
+    duplicates: list[tuple[ChapterPattern, ChapterPattern]],
+    progress: _ExtractionProgress,
+) -> None:
+    """Link (or copy) each extracted segment to the outputs of its duplicate patterns."""
+    import shutil
+
+    extracted = {id(pattern) for pattern in progress.extracted}
+    journal = progress.journal
+    for pattern, primary in duplicates:
+        if journal is not None and journal.completed(pattern.representative, pattern.output_name):
+            progress.report(pattern, True, how="resumed")
+            continue
+        ok = id(primary) in extracted
+        if ok and not link_file(primary.output_name, pattern.output_name):
+            part_path = partial_output_path(pattern.output_name)
+            try:
+                shutil.copyfile(primary.output_name, part_path)
+                os.replace(part_path, pattern.output_name)
+            except OSError as e:
+                print(f"Warning: Could not copy {primary.output_name}: {e}", file=sys.stderr)
+                ok = False
+        if ok and journal is not None:
+            journal.add(pattern.representative, pattern.output_name)
+        progress.report(pattern, ok, how="linked")
+
+
+def _print_store_savings(store: SegmentStore | None) -> None:
+    """Summarize what the segment store saved in this run."""
+    if store is None or not (store.reused or store.deduplicated):
+        return
+    print(
+        f"Segment store: {store.reused} linked instead of extracted, "
+        f"{store.deduplicated} deduplicated after extraction, "
+        f"{store.bytes_saved / 2**20:.1f} MiB saved"
+    )
+
+
+_STREAM_QUEUE_SIZE = 64
+_DONE = object()
+
+
+def _series_key(mkv_path: str, input_dir: str) -> str:
+    """Top-level directory below input_dir that contains mkv_path ("" for files directly in it)."""
+    parts = os.path.relpath(mkv_path, input_dir).split(os.sep)
+    return parts[0] if len(parts) > 1 else ""
+
+
+def _feed(queue: Queue, items: Iterable[object]) -> None:
+    """Thread target: put items onto a bounded queue, then the end marker."""
+    try:
+        for item in items:
+            queue.put(item)
+    except BaseException as e:
+        queue.put(e)
+    finally:
+        queue.put(_DONE)
+
+
+def _drain(queue: Queue) -> Iterator:
+    """Yield items from a queue filled by _feed until the end marker."""
+    while (item := queue.get()) is not _DONE:
+        if isinstance(item, BaseException):
+            raise item
+        yield item
+
 
-    # Step 3: Filter
-    filtered = filter_chapters(all_chapters, args.duration_range, args.chapter_names)
-    if not filtered:
-        print("No chapters match the specified filters.", file=sys.stderr)
+def _run_streaming(
+    args: argparse.Namespace,
+    cache: ProbeCache | None,
+    state: RunState | None,
+    store: SegmentStore | None = None,
+    reporter: NdjsonReporter | None = None,
+    journal: Journal | None = None,
+) -> int:
+    """Overlap scanning, probing, grouping and extraction.
+
+    The directory walk feeds the probe workers through a bounded queue. Each
+    top-level series directory is filtered, grouped and printed as soon as its
+    last file is probed, and its patterns go to the extraction scheduler
+    (whose bounded wait list throttles probing) while the next series is
+    being probed. Files directly inside input_dir form one group that is
+    processed last.
+    """
+    if not os.path.isdir(args.input_dir):
+        print(f"Error: Input directory not found: {args.input_dir}", file=sys.stderr)
         return 1
+    if args.vectorized and not _vectorized_available():
+        return 1
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    print_lock = threading.Lock()
+    progress = _ExtractionProgress(print_lock, store=store, reporter=reporter, journal=journal)
+    scheduler = None
+    if not args.dry_run:
+        scheduler = DeviceScheduler(
+            args.extract_jobs, args.per_device, max_waiting=_STREAM_QUEUE_SIZE, per_output_device=args.per_output_device,
+        )
+
+    from queue import Queue
+
+    scan_queue: Queue = Queue(maxsize=_STREAM_QUEUE_SIZE)
+    threading.Thread(
+        target=_feed,
+        args=(scan_queue, _iter_mkv_files(args.input_dir, args.recursive, **_scan_options(args))),
+        daemon=True,
+    ).start()
+
+    keep = _read_filter(args, state or cache)
+    counts = _ScanCounts(prefiltered=keep is not None)
+    filtered_total = 0
+    pattern_total = 0
+    # Output paths given to earlier series, which may not be written yet
+    claimed: set[str] = set()
+
+    def flush(filtered: list[Chapter]) -> None:
+        nonlocal pattern_total
+        clusters = _group_chapters(filtered, args, args.vectorized) if filtered else []
+        if not clusters:
+            return
+        patterns = build_patterns(
+            clusters, args.output_dir, args.episode_parsing, _journaled(journal), args.representative, claimed,
+        )
+        plan = state.plan(patterns) if state is not None else None
+        with print_lock:
+            if pattern_total == 0:
+                print("\nDetected patterns:")
+            for pattern in patterns:
+                pattern_total += 1
+                _print_pattern(pattern_total, pattern)
+                if reporter is not None:
+                    reporter.pattern(pattern_total, pattern)
+            to_extract = patterns
+            if plan is not None and scheduler is not None:
+                to_extract = _apply_plan(plan, state, reporter)
+        if scheduler is not None:
+            for group in group_by_source(to_extract):
+                submit_extraction(scheduler, group, progress.report, progress.store, progress.journal)
+
+    try:
+        current_key = None
+        current: list[Chapter] = []
+        root: list[Chapter] = []
+        for mkv_path, chapters in _probe_files(_drain(scan_queue), args.jobs, state or cache, keep):
+            kept = filter_chapters(
+                _accept_file(mkv_path, chapters, args.episode_parsing, counts),
+                args.duration_range,
+                args.chapter_names,
+            )
+            if reporter is not None:
+                reporter.file(mkv_path, chapters, skip_reason(mkv_path, chapters, args.episode_parsing, keep is not None))
+            filtered_total += len(kept)
+            key = _series_key(mkv_path, args.input_dir)
+            if key == "":
+                root.extend(kept)
+                continue
+            if key != current_key:
+                flush(current)
+                current_key = key
+                current = []
+            current.extend(kept)
+        flush(current)
+        flush(root)
+    finally:
+        if scheduler is not None:
+            scheduler.join()
+    if state is not None and scheduler is not None:
+        state.record(progress.extracted)
+        _print_stale(state)
+
+    with print_lock:
+        _print_scan_line(counts)
+
+    if counts.total_files == 0:
+        return _stop(f"No .mkv files found in {args.input_dir}", reporter, counts)
+    if counts.chapters == 0 and keep is None:
+        return _stop("No chapters found in any files.", reporter, counts)
+    if filtered_total == 0:
+        return _stop("No chapters match the specified filters.", reporter, counts)
+    if pattern_total == 0:
+        return _stop("No patterns meet the minimum occurrence threshold.", reporter, counts)
+    if args.dry_run:
+        _report_summary(reporter, counts, pattern_total)
+        return 0
+
+    print(f"\nDone. {progress.success} extracted, {progress.fail} failed.")
+    _print_store_savings(store)
+    _report_summary(reporter, counts, pattern_total, progress)
+    return 0 if progress.fail == 0 else 1
+
+
+def _series_files(input_dir: str, series: str, **scan_options: object) -> list[str]:
+    """Current MKV files of one series directory ("" = files directly in input_dir)."""
+    if series == "":
+        return _scan_directory(input_dir, False, **scan_options)
+    return _scan_directory(os.path.join(input_dir, series), True, **scan_options)
+
 
-    # Step 4: Group
-    if args.min_occurrences > 0:
-        clusters = cluster_by_duration(filtered, args.tolerance_seconds, args.tolerance_percent)
+def _library_files(files: Iterable[str], ignore: list[str]) -> list[str]:
+    """files without those inside the ignored directories."""
+    return [f for f in files if not any(is_within(f, d) for d in ignore)]
 
-        # Split clusters where the same episode appears multiple times
-        deduped: list[list[Chapter]] = []
-        for cluster in clusters:
-            deduped.extend(split_duplicate_episodes(cluster))
-        clusters = deduped
 
-        if args.episode_parsing:
-            split_clusters: list[list[Chapter]] = []
-            for cluster in clusters:
-                split_clusters.extend(split_by_contiguity(cluster))
-            clusters = split_clusters
+def _watch_error(e: OSError, input_dir: str) -> str:
+    """What to tell the user when the library can't be watched."""
+    import errno
 
-        clusters = [c for c in clusters if len(c) >= args.min_occurrences]
+    if e.errno == errno.ENOSPC:
+        return (
+            "Ran out of inotify watches (one is needed per directory). Raise the limit, e.g. "
+            "`sudo sysctl fs.inotify.max_user_watches=524288`, and add it to /etc/sysctl.conf to keep it."
+        )
+    if e.errno == errno.EMFILE:
+        return (
+            "Too many inotify instances. Raise the limit, e.g. "
+            "`sudo sysctl fs.inotify.max_user_instances=512`, or stop other watchers."
+        )
+    if e.errno == errno.ENOSYS:
+        return "Watch mode needs Linux inotify, which is not available on this platform."
+    return f"Cannot watch {input_dir}: {e}"
+
+
+def _run_series(
+    args: argparse.Namespace,
+    series: str,
+    mkv_files: list[str],
+    state: RunState,
+    store: SegmentStore | None = None,
+) -> None:
+    """Probe, group and extract one series directory in watch mode."""
+    present = set(mkv_files)
+    for path in state.probed_files():
+        if path not in present and _series_key(path, args.input_dir) == series:
+            state.forget(path)
+
+    counts = _ScanCounts()
+    chapters: list[Chapter] = []
+    histogram = DurationHistogram() if args.auto else None
+    for mkv_path, result in _probe_files(mkv_files, args.jobs, state):
+        accepted = _accept_file(mkv_path, result, args.episode_parsing, counts)
+        chapters.extend(histogram.add_file(accepted) if histogram is not None else accepted)
+
+    if histogram is not None:
+        clusters = _group_by_range(chapters, _discover_ranges(histogram, args), args)
     else:
-        clusters = [[ch] for ch in filtered]
+        filtered = filter_chapters(chapters, args.duration_range, args.chapter_names)
+        clusters = _group_chapters(filtered, args) if filtered else []
+    patterns = build_patterns(
+        clusters, args.output_dir, args.episode_parsing, representative=args.representative,
+    ) if clusters else []
+    plan = state.plan(patterns)
+
+    label = series or os.path.basename(os.path.normpath(args.input_dir))
+    print(f"\n[{label}] {counts.total_files} files, {len(patterns)} patterns")
+    for i, pattern in enumerate(patterns, 1):
+        _print_pattern(i, pattern)
+
+    if not args.dry_run:
+        to_extract = _apply_plan(plan, state)
+        progress = _ExtractionProgress(threading.Lock(), total=len(to_extract), store=store)
+        scheduler = DeviceScheduler(args.extract_jobs, args.per_device, per_output_device=args.per_output_device)
+        for group in group_by_source(to_extract):
+            submit_extraction(scheduler, group, progress.report, progress.store, progress.journal)
+        scheduler.join()
+        state.record(progress.extracted)
+    state.advance()
 
-    if not clusters:
-        print("No patterns meet the minimum occurrence threshold.", file=sys.stderr)
-        return 1
 
-    # Step 5: Build patterns and print summary
+def run_watch(args: argparse.Namespace) -> int:
+    """Process the whole library once, then re-process series directories as files change.
+
+    Probe results and extracted patterns of all series stay in memory (and in
+    --state, if given), so a change only costs probing the new files of its
+    own series directory.
+    """
+    if not os.path.isdir(args.input_dir):
+        print(f"Error: Input directory not found: {args.input_dir}", file=sys.stderr)
+        return 1
     os.makedirs(args.output_dir, exist_ok=True)
-    patterns = _build_patterns(clusters, args.output_dir, args.episode_parsing)
-    _print_summary(patterns, len(mkv_files), skipped_no_chapters, skipped_no_episode)
 
-    # Step 6: Extract (unless dry run)
-    if args.dry_run:
+    cache = None
+    if args.cache:
+        cache = ProbeCache(args.cache, args.cache_max_age, args.cache_max_entries)
+    state = RunState(args.state, fallback=cache)
+    store = SegmentStore(args.segment_store) if args.segment_store else None
+    # Outputs written inside the library are not episodes
+    ignore = []
+    if is_within(args.output_dir, args.input_dir) and not is_within(args.input_dir, args.output_dir):
+        ignore.append(args.output_dir)
+    try:
+        with Inotify() as inotify:
+            # Start watching before the initial pass so no new file slips through
+            scan_options = _scan_options(args)
+            watcher = LibraryWatcher(
+                inotify, args.input_dir, scan_options["extensions"], scan_options["exclude"], ignore,
+            )
+            by_series: dict[str, list[str]] = {}
+            for mkv_path in _library_files(_iter_mkv_files(args.input_dir, True, **scan_options), ignore):
+                by_series.setdefault(_series_key(mkv_path, args.input_dir), []).append(mkv_path)
+            for series, mkv_files in by_series.items():
+                _run_series(args, series, mkv_files, state, store)
+            state.save()
+
+            print(f"\nWatching {args.input_dir} for changes...", flush=True)
+            for changed in watcher.batches(args.debounce):
+                if changed is None:
+                    print("Warning: Missed file events, re-checking all series.", file=sys.stderr)
+                    changed = {
+                        _series_key(p, args.input_dir)
+                        for p in _library_files(_iter_mkv_files(args.input_dir, True, **scan_options), ignore)
+                    }
+                    changed.update(_series_key(p, args.input_dir) for p in state.probed_files())
+                for series in sorted(changed):
+                    mkv_files = _library_files(_series_files(args.input_dir, series, **scan_options), ignore)
+                    _run_series(args, series, mkv_files, state, store)
+                state.save()
+                sys.stdout.flush()
+    except KeyboardInterrupt:
         return 0
+    except OSError as e:
+        print(f"Error: {_watch_error(e, args.input_dir)}", file=sys.stderr)
+        return 1
+    finally:
+        state.save()
+        if cache is not None:
+            cache.close()
+        if store is not None:
+            store.close()
 
-    success = 0
-    fail = 0
-    for pattern in patterns:
-        print(f"Extracting: {os.path.basename(pattern.output_name)}...", end=" ", flush=True)
-        if extract_segment(pattern.first_occurrence, pattern.output_name):
-            print("OK")
-            success += 1
-        else:
-            print("FAILED")
-            fail += 1
 
-    print(f"\nDone. {success} extracted, {fail} failed.")
-    return 0 if fail == 0 else 1
+def run_serve(args: argparse.Namespace) -> int:
+    """Serve Pipeline requests on a Unix socket (see server.py for the protocol)."""
+    from chapter_extractor.server import PipelineService, serve
+
+    service = PipelineService(
+        jobs=args.jobs,
+        extract_jobs=args.extract_jobs,
+        per_device=args.per_device,
+        per_output_device=args.per_output_device,
+        scan_options={"threads": args.scan_threads},
+    )
+    return serve(args.socket, service)
 
 
-def main() -> None:
-    args = parse_args()
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv and argv[0] == "watch":
+        sys.exit(run_watch(parse_watch_args(argv[1:])))
+    if argv and argv[0] == "merge":
+        sys.exit(run_merge(parse_merge_args(argv[1:])))
+    if argv and argv[0] == "serve":
+        sys.exit(run_serve(parse_serve_args(argv[1:])))
+    args = parse_args(argv)
     sys.exit(run(args))
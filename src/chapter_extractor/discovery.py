@@ -0,0 +1,117 @@
+from __future__ import annotations
+
+import math
+from collections import Counter
+from dataclasses import dataclass
+
+from chapter_extractor.models import Chapter
+
+POSITIONS = ("start", "end")
+
+# A chapter is near the start (end) of its file if its midpoint lies in the first (last) quarter
+_EDGE_FRACTION = 0.25
+
+
+@dataclass(frozen=True, slots=True)
+class DurationPeak:
+    """A recurring chapter duration: chapters of low <= duration <= high seconds near one end of their files."""
+
+    low: float
+    high: float
+    position: str
+    chapters: int
+
+
+def chapter_position(chapter: Chapter, file_duration: float) -> str | None:
+    """start or end if the chapter sits near that end of its file, None for the middle."""
+    if file_duration <= 0:
+        return None
+    middle = (chapter.start + chapter.end) / 2 / file_duration
+    if middle <= _EDGE_FRACTION:
+        return "start"
+    if middle >= 1 - _EDGE_FRACTION:
+        return "end"
+    return None
+
+
+class DurationHistogram:
+    """Binned chapter durations near the start and near the end of files, built in one pass.
+
+    Intros, recaps, outros and previews sit near a file's ends and repeat
+    with nearly the same duration, so they show up as peaks; episode bodies
+    (in the middle) are never counted. peaks() smooths each histogram with a
+    triangular kernel of the given bandwidth, takes local maxima backed by
+    at least min_count chapters and widens each to where the density drops
+    below half its height.
+    """
+
+    def __init__(self, bin_seconds: float = 1.0) -> None:
+        self.bin_seconds = bin_seconds
+        self._bins: dict[str, Counter[int]] = {position: Counter() for position in POSITIONS}
+
+    def add_file(self, chapters: list[Chapter]) -> list[Chapter]:
+        """Count one file's chapters. Returns those near either end, the only ones a peak can select."""
+        if not chapters:
+            return []
+        file_duration = max(c.end for c in chapters)
+        edges = []
+        for chapter in chapters:
+            position = chapter_position(chapter, file_duration)
+            if position is not None:
+                self._bins[position][int(chapter.duration // self.bin_seconds)] += 1
+                edges.append(chapter)
+        return edges
+
+    def peaks(self, min_count: int, bandwidth: float = 2.0) -> list[DurationPeak]:
+        """Recurring durations, strongest first within each position."""
+        width = max(1, math.ceil(bandwidth / self.bin_seconds))
+        found: list[DurationPeak] = []
+        for position in POSITIONS:
+            found.extend(self._peaks(self._bins[position], min_count, width, position))
+        return found
+
+    def _peaks(self, counts: Counter[int], min_count: int, width: int, position: str) -> list[DurationPeak]:
+        if not counts:
+            return []
+        support = range(min(counts) - width, max(counts) + width + 1)
+        density = {
+            b: sum(counts.get(b + k, 0) * (width + 1 - abs(k)) for k in range(-width, width + 1)) / (width + 1)
+            for b in support
+        }
+        # Plateaus count once, at their first bin
+        maxima = [
+            b for b in support
+            if density[b] > 0 and density[b] > density.get(b - 1, 0) and density[b] >= density.get(b + 1, 0)
+        ]
+        peaks: list[DurationPeak] = []
+        taken: list[tuple[int, int]] = []
+        for b in sorted(maxima, key=lambda b: (-density[b], b)):
+            low, high = b, b
+            while density.get(low - 1, 0) > density[b] / 2:
+                low -= 1
+            while density.get(high + 1, 0) > density[b] / 2:
+                high += 1
+            if any(low <= t_high and t_low <= high for t_low, t_high in taken):
+                continue
+            chapters = sum(counts.get(i, 0) for i in range(low, high + 1))
+            if chapters < min_count:
+                continue
+            taken.append((low, high))
+            peaks.append(DurationPeak(
+                low=low * self.bin_seconds,
+                high=(high + 1) * self.bin_seconds,
+                position=position,
+                chapters=chapters,
+            ))
+        return peaks
+
+
+def merge_ranges(peaks: list[DurationPeak]) -> list[tuple[float, float]]:
+    """Duration ranges of the peaks in ascending order, overlapping ones merged."""
+    merged: list[tuple[float, float]] = []
+    for low, high in sorted((p.low, p.high) for p in peaks):
+        if merged and low <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], high))
+        else:
+            merged.append((low, high))
+    return merged
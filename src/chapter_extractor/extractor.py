@@ -1,32 +1,90 @@
 from __future__ import annotations
 
+import fnmatch
+import itertools
 import os
-import subprocess
 import sys
+import threading
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, TypeVar
 
+from chapter_extractor import timing
 from chapter_extractor.chapters import format_timestamp
-from chapter_extractor.models import Chapter
+from chapter_extractor.models import Chapter, ChapterPattern
+
+if TYPE_CHECKING:
+    from chapter_extractor.journal import Journal
+    from chapter_extractor.store import SegmentStore
+
+T = TypeVar("T")
+
+# Hidden files outputs are written to before being renamed into place (and
+# the segment store's link temporaries); any found later are left by a crash
+PARTIAL_OUTPUT_GLOBS = (
+    ".*.part.mkv",
+    ".batch-*-[0-9][0-9][0-9].mkv",
+    ".*.batch-[0-9][0-9][0-9].mkv",
+    ".*.link-tmp",
+)
+
+# Numbers the batch templates of this process (see _extract_batch)
+_batch_ids = itertools.count(1)
+
+
+def partial_output_path(output_path: str) -> str:
+    """Where output_path is written until it is complete."""
+    stem = os.path.splitext(os.path.basename(output_path))[0]
+    return os.path.join(os.path.dirname(output_path), f".{stem}.part.mkv")
+
+
+def remove_partial_outputs(output_dir: str) -> list[str]:
+    """Delete unfinished outputs of an interrupted run from output_dir. Returns their paths."""
+    removed = []
+    try:
+        names = sorted(os.listdir(output_dir))
+    except OSError:
+        return []
+    for name in names:
+        if any(fnmatch.fnmatchcase(name, glob) for glob in PARTIAL_OUTPUT_GLOBS):
+            path = os.path.join(output_dir, name)
+            try:
+                os.unlink(path)
+            except OSError as e:
+                print(f"Warning: Could not remove {path}: {e.strerror}", file=sys.stderr)
+                continue
+            removed.append(path)
+    return removed
 
 
 def extract_segment(chapter: Chapter, output_path: str) -> bool:
-    """Extract a chapter segment from MKV file. Returns True on success."""
+    """Extract a chapter segment from MKV file. Returns True on success.
+
+    mkvmerge writes to a hidden partial file that is renamed to output_path
+    once complete, so output_path never holds a truncated segment.
+    """
+    import subprocess
+
     output_dir = os.path.dirname(output_path)
     os.makedirs(output_dir, exist_ok=True)
 
     start_ts = format_timestamp(chapter.start)
     end_ts = format_timestamp(chapter.end)
+    part_path = partial_output_path(output_path)
 
     try:
-        result = subprocess.run(
-            [
-                "mkvmerge",
-                "-o", output_path,
-                "--split", f"parts:{start_ts}-{end_ts}",
-                chapter.source_file,
-            ],
-            capture_output=True,
-            text=True,
-        )
+        with timing.tool_call("mkvmerge --split"):
+            result = subprocess.run(
+                [
+                    "mkvmerge",
+                    "-o", part_path,
+                    "--split", f"parts:{start_ts}-{end_ts}",
+                    chapter.source_file,
+                ],
+                capture_output=True,
+                text=True,
+            )
     except FileNotFoundError:
         print("Error: mkvmerge not found. Install mkvtoolnix.", file=sys.stderr)
         return False
@@ -34,6 +92,285 @@ def extract_segment(chapter: Chapter, output_path: str) -> bool:
     if result.returncode not in (0, 1):
         # mkvmerge returns 1 for warnings, 2 for errors
         print(f"Error extracting {output_path}: {result.stderr}", file=sys.stderr)
+        if os.path.exists(part_path):
+            os.unlink(part_path)
+        return False
+    if not os.path.exists(part_path):
+        print(f"Error extracting {output_path}: mkvmerge wrote no output", file=sys.stderr)
         return False
 
+    os.replace(part_path, output_path)
+    timing.add_output(output_path)
     return True
+
+
+def _non_overlapping_batches(segments: list[tuple[Chapter, str]]) -> list[list[tuple[Chapter, str]]]:
+    """Split segments into start-ordered batches whose ranges don't overlap.
+
+    mkvmerge only accepts ascending, non-overlapping ranges in one --split parts: list.
+    """
+    batches: list[list[tuple[Chapter, str]]] = []
+    for segment in sorted(segments, key=lambda s: (s[0].start, s[0].end)):
+        for batch in batches:
+            if batch[-1][0].end <= segment[0].start:
+                batch.append(segment)
+                break
+        else:
+            batches.append([segment])
+    return batches
+
+
+def _extract_batch(segments: list[tuple[Chapter, str]]) -> list[bool]:
+    """Extract several ranges of one source with a single mkvmerge run.
+
+    mkvmerge writes one numbered file per range, which are renamed to the
+    requested outputs afterwards. All outputs must share a directory.
+    """
+    import subprocess
+
+    output_dir = os.path.dirname(segments[0][1])
+    os.makedirs(output_dir, exist_ok=True)
+    # mkvmerge expands %03d in -o, so the name must not contain a user-supplied % (as in "100% Intro")
+    stem = f".batch-{os.getpid()}-{next(_batch_ids)}"
+    template = os.path.join(output_dir, f"{stem}-%03d.mkv")
+    parts = [os.path.join(output_dir, f"{stem}-{i + 1:03d}.mkv") for i in range(len(segments))]
+    ranges = ",".join(
+        f"{format_timestamp(chapter.start)}-{format_timestamp(chapter.end)}" for chapter, _ in segments
+    )
+
+    try:
+        with timing.tool_call("mkvmerge --split"):
+            result = subprocess.run(
+                [
+                    "mkvmerge",
+                    "-o", template,
+                    "--split", f"parts:{ranges}",
+                    segments[0][0].source_file,
+                ],
+                capture_output=True,
+                text=True,
+            )
+    except FileNotFoundError:
+        print("Error: mkvmerge not found. Install mkvtoolnix.", file=sys.stderr)
+        return [False] * len(segments)
+
+    if result.returncode not in (0, 1):
+        print(f"Error extracting {', '.join(out for _, out in segments)}: {result.stderr}", file=sys.stderr)
+        for part in parts:
+            if os.path.exists(part):
+                os.unlink(part)
+        return [False] * len(segments)
+
+    ok: list[bool] = []
+    for part, (_, output_path) in zip(parts, segments):
+        if os.path.exists(part):
+            os.replace(part, output_path)
+            timing.add_output(output_path)
+            ok.append(True)
+        else:
+            print(f"Error extracting {output_path}: mkvmerge wrote no output", file=sys.stderr)
+            ok.append(False)
+    return ok
+
+
+def extract_segments(segments: list[tuple[Chapter, str]]) -> list[bool]:
+    """Extract several chapters of the same source file, reading it as few times as possible.
+
+    Non-overlapping ranges that go to the same directory share one mkvmerge
+    pass. Returns success flags in the order of segments.
+    """
+    results: dict[int, bool] = {}
+    by_dir: dict[str, list[tuple[Chapter, str]]] = {}
+    for segment in segments:
+        by_dir.setdefault(os.path.dirname(segment[1]), []).append(segment)
+
+    for group in by_dir.values():
+        for batch in _non_overlapping_batches(group):
+            if len(batch) == 1:
+                flags = [extract_segment(*batch[0])]
+            else:
+                flags = _extract_batch(batch)
+            for segment, flag in zip(batch, flags):
+                results[id(segment)] = flag
+    return [results[id(segment)] for segment in segments]
+
+
+def device_of(path: str) -> int | str:
+    """Block device (st_dev) holding path, or its nearest existing parent directory."""
+    current = os.path.abspath(path)
+    while True:
+        try:
+            return os.stat(current).st_dev
+        except OSError:
+            parent = os.path.dirname(current)
+            if parent == current:
+                return current
+            current = parent
+
+
+@dataclass(frozen=True, slots=True)
+class OutputDevice:
+    """A device written to, limited by DeviceScheduler's per_output_device instead of per_device."""
+
+    device: int | str
+
+
+Device = int | str | OutputDevice
+
+
+def extraction_devices(chapter: Chapter, output_path: str) -> set[Device]:
+    """Devices an extraction reads from and writes to."""
+    return {device_of(chapter.source_file), OutputDevice(device_of(os.path.dirname(output_path)))}
+
+
+class DeviceScheduler:
+    """Run I/O-bound jobs concurrently with a concurrency limit per block device.
+
+    A job holds one slot on each device it touches until it finishes. Jobs
+    whose devices are busy wait without occupying a worker, so an idle disk
+    never waits behind a busy one. Waiting jobs are started in submission
+    order as far as their devices allow. Devices read from allow per_device
+    jobs each; devices written to (OutputDevice) allow per_output_device,
+    by default as many as there are workers, so jobs reading from different
+    disks aren't serialized by their shared output directory. submit()
+    blocks while max_waiting jobs are queued, which gives producers
+    backpressure.
+    """
+
+    def __init__(
+        self,
+        workers: int,
+        per_device: int,
+        max_waiting: int | None = None,
+        per_output_device: int | None = None,
+    ) -> None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.workers = workers
+        self.per_device = per_device
+        self.per_output_device = per_output_device or workers
+        self.max_waiting = max_waiting
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._cond = threading.Condition()
+        self._waiting: list[tuple[Callable[[], T], set[Device], Callable[[T], None]]] = []
+        self._active: Counter[Device] = Counter()
+        self._running = 0
+        self._error: BaseException | None = None
+
+    def submit(self, fn: Callable[[], T], devices: set[Device], callback: Callable[[T], None]) -> None:
+        """Queue fn to run once a worker and all its devices are free; callback gets its result."""
+        with self._cond:
+            while self.max_waiting is not None and len(self._waiting) >= self.max_waiting:
+                self._cond.wait()
+            self._waiting.append((fn, devices, callback))
+            self._dispatch()
+
+    def join(self) -> None:
+        """Wait for all submitted jobs, then shut down the workers."""
+        with self._cond:
+            while self._waiting or self._running:
+                self._cond.wait()
+        self._pool.shutdown()
+        if self._error is not None:
+            raise self._error
+
+    def _dispatch(self) -> None:
+        # Called with the lock held
+        i = 0
+        while i < len(self._waiting) and self._running < self.workers:
+            fn, devices, callback = self._waiting[i]
+            if any(self._active[d] >= self._limit(d) for d in devices):
+                i += 1
+                continue
+            del self._waiting[i]
+            for d in devices:
+                self._active[d] += 1
+            self._running += 1
+            self._pool.submit(self._run, fn, devices, callback)
+        self._cond.notify_all()
+
+    def _limit(self, device: Device) -> int:
+        return self.per_output_device if isinstance(device, OutputDevice) else self.per_device
+
+    def _run(self, fn: Callable[[], T], devices: set[Device], callback: Callable[[T], None]) -> None:
+        try:
+            callback(fn())
+        except BaseException as e:
+            with self._cond:
+                self._error = self._error or e
+        finally:
+            with self._cond:
+                for d in devices:
+                    self._active[d] -= 1
+                self._running -= 1
+                self._dispatch()
+
+
+def group_by_source(patterns: list[ChapterPattern]) -> list[list[ChapterPattern]]:
+    """Group patterns whose representative comes from the same file, in first-seen order."""
+    groups: dict[str, list[ChapterPattern]] = {}
+    for pattern in patterns:
+        groups.setdefault(pattern.representative.source_file, []).append(pattern)
+    return list(groups.values())
+
+
+def submit_extraction(
+    scheduler: DeviceScheduler,
+    patterns: list[ChapterPattern],
+    report: Callable[[ChapterPattern, bool, str], None],
+    store: SegmentStore | None = None,
+    journal: Journal | None = None,
+) -> None:
+    """Schedule one job extracting all patterns that share a source file.
+
+    report(pattern, ok, how) is called once per pattern, how being extracted,
+    linked or resumed. Patterns the journal lists as done are skipped. With
+    a segment store, patterns whose segment was extracted before are linked
+    into place right away. Only the rest are scheduled; finished outputs go
+    to the store and the journal.
+    """
+    remaining = []
+    for pattern in patterns:
+        if journal is not None and journal.completed(pattern.representative, pattern.output_name):
+            report(pattern, True, "resumed")
+        elif store is not None and store.reuse(pattern.representative, pattern.output_name):
+            if journal is not None:
+                journal.add(pattern.representative, pattern.output_name)
+            report(pattern, True, "linked")
+        else:
+            remaining.append(pattern)
+    patterns = remaining
+    if not patterns:
+        return
+
+    segments = [(p.representative, p.output_name) for p in patterns]
+    devices: set[Device] = set()
+    for chapter, output_name in segments:
+        devices |= extraction_devices(chapter, output_name)
+
+    def done(flags: list[bool]) -> None:
+        for pattern, ok in zip(patterns, flags):
+            report(pattern, ok, "extracted")
+
+    def extract() -> list[bool]:
+        try:
+            if store is not None:
+                for _, output_name in segments:
+                    store.detach(output_name)
+            if len(segments) == 1:
+                flags = [extract_segment(*segments[0])]
+            else:
+                flags = extract_segments(segments)
+        except Exception as e:
+            # E.g. the output directory can't be created or the disk is full: these
+            # patterns fail, the rest of the run goes on
+            print(f"Error extracting {', '.join(out for _, out in segments)}: {e}", file=sys.stderr)
+            return [False] * len(segments)
+        for (chapter, output_name), ok in zip(segments, flags):
+            if ok and store is not None:
+                store.add(chapter, output_name)
+            if ok and journal is not None:
+                journal.add(chapter, output_name)
+        return flags
+
+    scheduler.submit(extract, devices, done)
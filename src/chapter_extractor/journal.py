@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from dataclasses import asdict, dataclass
+from typing import TextIO
+
+from chapter_extractor.chapters import read_duration
+from chapter_extractor.models import Chapter
+
+JOURNAL_NAME = ".chapter-extractor.journal"
+
+# Largest difference (seconds) between the recorded and current duration of a verified output
+_DURATION_TOLERANCE = 0.001
+
+
+@dataclass(frozen=True, slots=True)
+class JournalEntry:
+    source: str
+    start: float
+    end: float
+    # Relative to the journal's directory
+    output: str
+    size: int
+    # None if the output couldn't be parsed natively
+    duration: float | None
+
+
+class Journal:
+    """Append-only log of the extractions finished in one output directory.
+
+    Each line is a JSON object written, flushed and fsynced right after its
+    output was renamed into place, so every listed output was complete when
+    it was logged. A fresh run starts an empty journal. A resumed run keeps
+    the entries whose outputs still have their recorded size and duration
+    (anything else is re-extracted) and appends to them. A torn last line
+    from a crash mid-append is ignored. Nothing is written before the first
+    add(), so runs that extract nothing leave the directory alone.
+    """
+
+    def __init__(self, directory: str, resume: bool = False) -> None:
+        self.directory = directory
+        self.path = os.path.join(directory, JOURNAL_NAME)
+        self._entries: dict[str, JournalEntry] = {}
+        self._lock = threading.Lock()
+        self._file: TextIO | None = None
+        if resume and os.path.exists(self.path):
+            self._entries = {e.output: e for e in self._load() if self._verify(e)}
+
+    def _load(self) -> list[JournalEntry]:
+        import json
+
+        entries = []
+        with open(self.path) as f:
+            for line in f:
+                try:
+                    entries.append(JournalEntry(**json.loads(line)))
+                except (TypeError, ValueError):
+                    continue
+        return entries
+
+    def _verify(self, entry: JournalEntry) -> bool:
+        path = os.path.join(self.directory, entry.output)
+        try:
+            if os.path.getsize(path) != entry.size:
+                return False
+        except OSError:
+            return False
+        if entry.duration is None:
+            return True
+        duration = read_duration(path)
+        return duration is not None and abs(duration - entry.duration) <= _DURATION_TOLERANCE
+
+    def _rewrite(self) -> None:
+        import json
+
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            for entry in self._entries.values():
+                f.write(json.dumps(asdict(entry)) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def outputs(self) -> set[str]:
+        """Absolute paths of the outputs in the journal."""
+        with self._lock:
+            return {os.path.abspath(os.path.join(self.directory, output)) for output in self._entries}
+
+    def completed(self, chapter: Chapter, output_path: str) -> bool:
+        """Whether output_path was already extracted from this chapter."""
+        with self._lock:
+            entry = self._entries.get(os.path.relpath(output_path, self.directory))
+        return entry is not None and (entry.source, entry.start, entry.end) == (
+            chapter.source_file, chapter.start, chapter.end,
+        )
+
+    def add(self, chapter: Chapter, output_path: str) -> None:
+        """Log a finished output; failures to write the journal are warnings."""
+        import json
+
+        try:
+            entry = JournalEntry(
+                source=chapter.source_file,
+                start=chapter.start,
+                end=chapter.end,
+                output=os.path.relpath(output_path, self.directory),
+                size=os.path.getsize(output_path),
+                duration=read_duration(output_path),
+            )
+            with self._lock:
+                if self._file is None:
+                    self._rewrite()
+                    self._file = open(self.path, "a")
+                self._entries[entry.output] = entry
+                self._file.write(json.dumps(asdict(entry)) + "\n")
+                self._file.flush()
+                os.fsync(self._file.fileno())
+        except OSError as e:
+            print(f"Warning: Could not journal {output_path}: {e}", file=sys.stderr)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
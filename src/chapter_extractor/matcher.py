@@ -1,7 +1,8 @@
 from __future__ import annotations
 
 import re
-from collections import Counter
+from dataclasses import dataclass
+from functools import cache
 
 from chapter_extractor.models import Chapter, EpisodeInfo
 
@@ -12,15 +13,19 @@ CHAPTER_NAME_KEYWORDS: list[str] = [
     "prologue", "epilogue",
 ]
 
-_KEYWORD_PATTERN: re.Pattern[str] = re.compile(
-    r"\b(?:" + "|".join(re.escape(k) for k in CHAPTER_NAME_KEYWORDS) + r")",
-    re.IGNORECASE,
-)
+
+@cache
+def _keyword_pattern() -> re.Pattern[str]:
+    """Alternation of CHAPTER_NAME_KEYWORDS, compiled on first use."""
+    return re.compile(
+        r"\b(?:" + "|".join(re.escape(k) for k in CHAPTER_NAME_KEYWORDS) + r")",
+        re.IGNORECASE,
+    )
 
 
 def _matches_chapter_name(title: str) -> bool:
     """Check if title matches any predefined chapter name keyword."""
-    return _KEYWORD_PATTERN.search(title) is not None
+    return _keyword_pattern().search(title) is not None
 
 
 def filter_chapters(
@@ -41,6 +46,28 @@ def filter_chapters(
     return result
 
 
+@dataclass(frozen=True, slots=True)
+class ChapterFilter:
+    """The predicates of filter_chapters, for applying them while chapters are read."""
+
+    duration_range: tuple[float, float] | None = None
+    chapter_names: bool = False
+
+    @property
+    def active(self) -> bool:
+        return self.duration_range is not None or self.chapter_names
+
+    def accepts(self, duration: float, title: str | None) -> bool:
+        """Whether filter_chapters would keep a chapter with this duration and title."""
+        if self.duration_range is not None and not self.duration_range[0] <= duration <= self.duration_range[1]:
+            return False
+        return not self.chapter_names or bool(title and _matches_chapter_name(title))
+
+    def possible(self, file_duration: float) -> bool:
+        """False if no chapter of a file this long can pass (it is shorter than the minimum duration)."""
+        return self.duration_range is None or file_duration >= self.duration_range[0]
+
+
 def cluster_by_duration(
     chapters: list[Chapter],
     tolerance_seconds: float | None,
@@ -67,58 +94,146 @@ def cluster_by_duration(
     return clusters
 
 
-def split_duplicate_episodes(cluster: list[Chapter]) -> list[list[Chapter]]:
-    """Split a duration cluster so each episode/file appears at most once per sub-cluster.
+DEFAULT_START_WINDOW = 120.0
+DEFAULT_MAX_EPISODE_GAP = 3
 
-    When multiple chapters from the same episode have similar durations, they end up
-    in the same cluster. This splits them by title first, then by start time proximity.
+
+@dataclass(frozen=True, slots=True)
+class GroupingConfig:
+    """Tolerances for group_chapters.
+
+    tolerance_seconds/tolerance_percent bound the duration gap between
+    neighbouring chapters (seconds wins if both are set). start_window bounds
+    the start offset gap used to tell apart same-titled chapters of one
+    episode. max_episode_gap is the largest episode step within a run; None
+    disables splitting by episode adjacency.
     """
-    if not cluster:
-        return []
 
-    def _source_key(c: Chapter) -> tuple[int, int] | str:
-        if c.episode:
-            return (c.episode.season, c.episode.episode)
-        return c.source_file
+    tolerance_seconds: float | None = 2.0
+    tolerance_percent: float | None = None
+    start_window: float = DEFAULT_START_WINDOW
+    max_episode_gap: int | None = DEFAULT_MAX_EPISODE_GAP
+
+
+@dataclass(slots=True)
+class GroupingStats:
+    """Number of clusters after each step of group_chapters (accumulated over calls)."""
+
+    duration: int = 0
+    title_split: int = 0
+    episode_split: int = 0
 
-    counts = Counter(_source_key(c) for c in cluster)
-    if max(counts.values()) <= 1:
-        return [cluster]
 
-    # Split by title
-    by_title: dict[str, list[Chapter]] = {}
-    for ch in cluster:
-        key = ch.title or ""
-        by_title.setdefault(key, []).append(ch)
+def _source_key(chapter: Chapter) -> tuple[int, int] | str:
+    if chapter.episode:
+        return (chapter.episode.season, chapter.episode.episode)
+    return chapter.source_file
 
-    if len(by_title) > 1:
-        return list(by_title.values())
 
-    # Fallback: split by start time proximity (120s tolerance)
-    sorted_by_start = sorted(cluster, key=lambda c: c.start)
-    sub_clusters: list[list[Chapter]] = [[sorted_by_start[0]]]
+def _title_key(title: str | None) -> str:
+    """Normalized title used to tell chapters of one episode apart."""
+    return (title or "").strip().casefold()
 
-    for ch in sorted_by_start[1:]:
-        prev = sub_clusters[-1][-1]
-        if abs(ch.start - prev.start) <= 120:
-            sub_clusters[-1].append(ch)
+
+def _subcluster_labels(cluster: list[Chapter], start_window: float) -> tuple[list[Chapter], list[int]]:
+    """Label each chapter of a duration cluster with its duplicate-free sub-cluster.
+
+    Without duplicate episodes/files everything gets label 0. Otherwise
+    chapters are labelled by normalized title in order of first appearance,
+    or, if they all share one title, by runs of start offsets no more than
+    start_window apart (in which case the chapters are returned start-sorted).
+    """
+    keys = [_source_key(c) for c in cluster]
+    if len(set(keys)) == len(keys):
+        return cluster, [0] * len(cluster)
+
+    ranks: dict[str, int] = {}
+    labels = [ranks.setdefault(_title_key(c.title), len(ranks)) for c in cluster]
+    if len(ranks) > 1:
+        return cluster, labels
+
+    members = sorted(cluster, key=lambda c: c.start)
+    labels = [0]
+    for prev, ch in zip(members, members[1:]):
+        labels.append(labels[-1] + (abs(ch.start - prev.start) > start_window))
+    return members, labels
+
+
+def _split_cluster(
+    cluster: list[Chapter],
+    config: GroupingConfig,
+    stats: GroupingStats | None = None,
+) -> list[list[Chapter]]:
+    """Split one duration cluster by title/start offset and episode adjacency with a single sort."""
+    members, labels = _subcluster_labels(cluster, config.start_window)
+    gap = config.max_episode_gap
+    # Sub-clusters with a chapter lacking episode info keep their order and aren't split
+    unordered = {label for label, c in zip(labels, members) if c.episode is None} if gap is not None else set()
+
+    def sort_key(i: int) -> tuple[int, int, int]:
+        label = labels[i]
+        if gap is None or label in unordered:
+            return label, 0, 0
+        episode = members[i].episode
+        return label, episode.season, episode.episode
+
+    order = sorted(range(len(members)), key=sort_key)
+    groups: list[list[Chapter]] = [[members[order[0]]]]
+    for prev, i in zip(order, order[1:]):
+        label = labels[i]
+        if label != labels[prev] or (
+            gap is not None and label not in unordered
+            and not _are_adjacent(members[prev].episode, members[i].episode, gap)
+        ):
+            groups.append([members[i]])
         else:
-            sub_clusters.append([ch])
+            groups[-1].append(members[i])
+    if stats is not None:
+        stats.title_split += max(labels) + 1
+        stats.episode_split += len(groups)
+    return groups
+
+
+def group_chapters(
+    chapters: list[Chapter],
+    config: GroupingConfig = GroupingConfig(),
+    stats: GroupingStats | None = None,
+) -> list[list[Chapter]]:
+    """Group chapters on duration, normalized title, start offset and episode adjacency.
+
+    Gives the same groups, in the same order, as cluster_by_duration followed
+    by split_duplicate_episodes and split_by_contiguity, but each duration
+    cluster is labelled in one pass and sorted once for all remaining keys.
+    Cluster counts after each step are added to stats if given.
+    """
+    groups: list[list[Chapter]] = []
+    clusters = cluster_by_duration(chapters, config.tolerance_seconds, config.tolerance_percent)
+    if stats is not None:
+        stats.duration += len(clusters)
+    for cluster in clusters:
+        groups.extend(_split_cluster(cluster, config, stats))
+    return groups
 
-    return sub_clusters
 
+def split_duplicate_episodes(cluster: list[Chapter], start_window: float = DEFAULT_START_WINDOW) -> list[list[Chapter]]:
+    """Split a duration cluster so each episode/file appears at most once per sub-cluster.
 
-_MAX_EPISODE_GAP = 3
+    When multiple chapters from the same episode have similar durations, they end up
+    in the same cluster. This splits them by title first, then by start time proximity.
+    """
+    if not cluster:
+        return []
+    return _split_cluster(cluster, GroupingConfig(start_window=start_window, max_episode_gap=None))
 
 
-def _are_adjacent(a: EpisodeInfo, b: EpisodeInfo) -> bool:
+def _are_adjacent(a: EpisodeInfo, b: EpisodeInfo, max_gap: int = DEFAULT_MAX_EPISODE_GAP) -> bool:
     """Check if two episodes are adjacent (allowing small gaps within a season)."""
     if a.season != b.season:
         return False
-    return abs(b.episode - a.episode) <= _MAX_EPISODE_GAP
+    return abs(b.episode - a.episode) <= max_gap
 
 
-def split_by_contiguity(chapters: list[Chapter]) -> list[list[Chapter]]:
+def split_by_contiguity(chapters: list[Chapter], max_gap: int = DEFAULT_MAX_EPISODE_GAP) -> list[list[Chapter]]:
     """Split a cluster into sub-clusters of contiguous episode runs."""
     if not chapters:
         return []
@@ -131,7 +246,7 @@ def split_by_contiguity(chapters: list[Chapter]) -> list[list[Chapter]]:
 
     for chapter in sorted_chapters[1:]:
         prev = runs[-1][-1]
-        if _are_adjacent(prev.episode, chapter.episode):
+        if _are_adjacent(prev.episode, chapter.episode, max_gap):
             runs[-1].append(chapter)
         else:
             runs.append([chapter])
@@ -0,0 +1,133 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+
+from chapter_extractor.timing import STAGE_BUCKETS, Recorder
+
+DEFAULT_METRICS_INTERVAL = 15.0
+
+_PREFIX = "chapter_extractor_"
+
+# HELP text of the run counters recorded with timing.count
+_COUNTER_HELP = {
+    "files_scanned": "Files whose chapters were read (or taken from the cache) in the last run.",
+    "files_skipped": "Files skipped in the last run, by reason.",
+    "chapters_read": "Chapters read from files that weren't skipped in the last run.",
+    "clusters": "Clusters after each grouping step of the last run.",
+    "patterns": "Patterns built in the last run.",
+    "extractions": "Extraction results of the last run.",
+}
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(labels: dict[str, str]) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels.items()) + "}"
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render(recorder: Recorder, library: str, running: bool, exit_code: int | None = None) -> str:
+    """Prometheus text exposition of a run's recorder.
+
+    Every sample carries a library label so that files written by runs over
+    different libraries can sit side by side in one textfile directory.
+    """
+    data = recorder.to_dict()
+    base = {"library": library}
+    lines: list[str] = []
+
+    def metric(name: str, kind: str, help_text: str, samples: list[tuple[str, dict[str, str], float]]) -> None:
+        lines.append(f"# HELP {_PREFIX}{name} {help_text}")
+        lines.append(f"# TYPE {_PREFIX}{name} {kind}")
+        for suffix, labels, value in samples:
+            lines.append(f"{_PREFIX}{name}{suffix}{_labels({**base, **labels})} {_number(value)}")
+
+    metric("run_in_progress", "gauge", "1 while the run is going on, 0 once it has finished.",
+           [("", {}, int(running))])
+    if exit_code is not None:
+        metric("run_exit_code", "gauge", "Exit status of the last finished run.", [("", {}, exit_code)])
+    metric("run_timestamp_seconds", "gauge", "Unix time these metrics were written.", [("", {}, time.time())])
+    metric("run_duration_seconds", "gauge", "Wall time of the run so far.", [("", {}, data["wall"])])
+    metric("run_cpu_seconds", "gauge", "CPU time of the run so far.", [("", {}, data["cpu"])])
+
+    by_name: dict[str, list[tuple[str, dict[str, str], float]]] = {}
+    for counter in data["counters"]:
+        by_name.setdefault(counter["name"], []).append(("", counter["labels"], counter["value"]))
+    for name, samples in sorted(by_name.items()):
+        metric(name, "gauge", _COUNTER_HELP.get(name, f"{name} in the last run."), samples)
+
+    if data["stages"]:
+        samples = []
+        for stage, s in data["stages"].items():
+            cumulative = 0
+            for bound, n in zip((*map(repr, STAGE_BUCKETS), "+Inf"), s["buckets"]):
+                cumulative += n
+                samples.append(("_bucket", {"stage": stage, "le": bound}, cumulative))
+            samples.append(("_sum", {"stage": stage}, s["wall"]))
+            samples.append(("_count", {"stage": stage}, s["calls"]))
+        metric("stage_duration_seconds", "histogram",
+               "Wall time of each timed section of a stage (one per file for probe, per batch for filter).",
+               samples)
+
+    if data["subprocesses"]:
+        metric("subprocess_calls", "gauge", "mkvtoolnix invocations in the last run, by tool.",
+               [("", {"tool": tool}, t["count"]) for tool, t in data["subprocesses"].items()])
+        metric("subprocess_seconds", "gauge", "Total wall time of mkvtoolnix invocations, by tool.",
+               [("", {"tool": tool}, t["total"]) for tool, t in data["subprocesses"].items()])
+    metric("bytes", "gauge", "Bytes read by the native chapter reader and written by extraction.",
+           [("", {"direction": "read"}, data["bytes_read"]), ("", {"direction": "written"}, data["bytes_written"])])
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics(path: str, text: str) -> None:
+    """Replace path atomically, so a collector never reads a half-written file."""
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    # The textfile collector only reads *.prom, so the temporary file is ignored
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(text)
+    os.replace(tmp_path, path)
+
+
+class MetricsFile:
+    """Rewrite a Prometheus textfile from a recorder every `interval` seconds until finished."""
+
+    def __init__(self, path: str, recorder: Recorder, library: str, interval: float = DEFAULT_METRICS_INTERVAL) -> None:
+        self.path = path
+        self.recorder = recorder
+        self.library = library
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="metrics-writer", daemon=True)
+
+    def start(self) -> None:
+        self._write(running=True)
+        self._thread.start()
+
+    def finish(self, exit_code: int | None) -> None:
+        """Stop the periodic writes and write the final metrics."""
+        self._stop.set()
+        self._thread.join()
+        self._write(running=False, exit_code=exit_code)
+
+    def _loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._write(running=True)
+
+    def _write(self, running: bool, exit_code: int | None = None) -> None:
+        try:
+            write_metrics(self.path, render(self.recorder, self.library, running, exit_code))
+        except OSError as e:
+            print(f"Warning: Could not write metrics to {self.path}: {e}", file=sys.stderr)
@@ -1,9 +1,10 @@
 from __future__ import annotations
 
+import sys
 from dataclasses import dataclass, field
 
 
-@dataclass
+@dataclass(frozen=True, slots=True)
 class EpisodeInfo:
     season: int
     episode: int
@@ -15,7 +16,7 @@ class EpisodeInfo:
         return f"S{self.season:02d}E{self.episode:02d}"
 
 
-@dataclass
+@dataclass(slots=True)
 class Chapter:
     start: float
     end: float
@@ -24,11 +25,24 @@ class Chapter:
     source_file: str
     episode: EpisodeInfo | None = None
 
+    def __post_init__(self) -> None:
+        # A library repeats the same few titles and each path once per chapter;
+        # interning keeps one copy of each string instead of one per chapter
+        self.source_file = sys.intern(self.source_file)
+        if self.title is not None:
+            self.title = sys.intern(self.title)
 
-@dataclass
+
+@dataclass(slots=True)
 class ChapterPattern:
     chapters: list[Chapter]
     avg_duration: float
     episode_range: str
     first_occurrence: Chapter
     output_name: str = ""
+    # The member that is extracted; first_occurrence unless a policy picked another
+    representative: Chapter | None = None
+
+    def __post_init__(self) -> None:
+        if self.representative is None:
+            self.representative = self.first_occurrence
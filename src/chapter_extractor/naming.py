@@ -3,7 +3,7 @@ from __future__ import annotations
 import os
 import re
 from collections import Counter
-from pathlib import Path
+from collections.abc import Collection
 
 from chapter_extractor.models import Chapter
 
@@ -12,7 +12,7 @@ def format_episode_range(chapters: list[Chapter]) -> str:
     """Format episode range from chapters. Falls back to source filename."""
     episodes = [c.episode for c in chapters if c.episode is not None]
     if not episodes:
-        return Path(chapters[0].source_file).stem
+        return os.path.splitext(os.path.basename(chapters[0].source_file))[0]
 
     sorted_eps = sorted(episodes)
     first = sorted_eps[0]
@@ -41,12 +41,20 @@ def generate_output_name(
     chapters: list[Chapter],
     output_dir: str,
     episode_parsing: bool,
+    reusable: Collection[str] = (),
+    claimed: set[str] | None = None,
 ) -> str:
-    """Generate unique output filename for a chapter pattern."""
+    """Generate unique output filename for a chapter pattern.
+
+    Existing files count as taken unless their absolute path is in reusable
+    (outputs a resumed run may overwrite or keep). claimed holds the absolute
+    paths already given to other patterns of this run, which are taken even
+    before they are written; the chosen path is added to it.
+    """
     if episode_parsing:
         range_part = format_episode_range(chapters)
     else:
-        range_part = Path(chapters[0].source_file).stem
+        range_part = os.path.splitext(os.path.basename(chapters[0].source_file))[0]
 
     identifier = _get_chapter_identifier(chapters)
     base_name = f"{range_part}_{identifier}"
@@ -54,8 +62,15 @@ def generate_output_name(
 
     # Deduplicate
     counter = 1
-    while os.path.exists(output_path):
+    claimed = set() if claimed is None else claimed
+    while _taken(output_path, reusable, claimed):
         output_path = os.path.join(output_dir, f"{base_name}_{counter}.mkv")
         counter += 1
 
+    claimed.add(os.path.abspath(output_path))
     return output_path
+
+
+def _taken(output_path: str, reusable: Collection[str], claimed: set[str]) -> bool:
+    path = os.path.abspath(output_path)
+    return path in claimed or (os.path.exists(output_path) and path not in reusable)
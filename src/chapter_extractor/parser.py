@@ -1,17 +1,28 @@
 from __future__ import annotations
 
+import os
 import re
-from pathlib import Path
+from functools import cache
 
 from chapter_extractor.models import EpisodeInfo
 
-_EPISODE_RE = re.compile(r"S(\d{2,})E(\d{2,})", re.IGNORECASE)
+
+@cache
+def _episode_re() -> re.Pattern[str]:
+    """The episode tag pattern, compiled on first use to keep imports cheap."""
+    return re.compile(r"S(\d{2,})E(\d{2,})", re.IGNORECASE)
+
+
+@cache
+def _episode_info(season: int, episode: int) -> EpisodeInfo:
+    """Shared EpisodeInfo per (season, episode); safe because EpisodeInfo is frozen."""
+    return EpisodeInfo(season=season, episode=episode)
 
 
 def parse_episode(filename: str) -> EpisodeInfo | None:
     """Parse episode identifier from filename. Returns None if no match."""
-    name = Path(filename).name
-    match = _EPISODE_RE.search(name)
+    name = os.path.basename(filename)
+    match = _episode_re().search(name)
     if match is None:
         return None
-    return EpisodeInfo(season=int(match.group(1)), episode=int(match.group(2)))
+    return _episode_info(int(match.group(1)), int(match.group(2)))
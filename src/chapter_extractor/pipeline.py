@@ -0,0 +1,348 @@
+from __future__ import annotations
+
+import os
+import threading
+from collections.abc import Callable, Collection, Iterable
+from dataclasses import dataclass, field, replace
+from typing import TYPE_CHECKING
+
+from chapter_extractor import timing
+from chapter_extractor.cache import FileIdentity, file_identity
+from chapter_extractor.chapters import ProbeUnavailable, read_chapters
+from chapter_extractor.extractor import DeviceScheduler, group_by_source, submit_extraction
+from chapter_extractor.matcher import GroupingConfig, GroupingStats, filter_chapters, group_chapters
+from chapter_extractor.models import Chapter, ChapterPattern
+from chapter_extractor.naming import format_episode_range, generate_output_name
+from chapter_extractor.parser import parse_episode
+from chapter_extractor.representative import RepresentativePicker
+from chapter_extractor.scanner import is_within, walk_library
+
+if TYPE_CHECKING:
+    from chapter_extractor.journal import Journal
+    from chapter_extractor.store import SegmentStore
+
+STAGES = ("scan", "probe", "filter", "group", "build", "extract")
+
+
+def skip_reason(
+    mkv_path: str,
+    chapters: list[Chapter] | None,
+    episode_parsing: bool,
+    prefiltered: bool = False,
+) -> str | None:
+    """Why a probed file is left out of grouping, or None if it isn't.
+
+    prefiltered means chapters were read through a ChapterFilter, so an
+    empty list only says that none of them matched.
+    """
+    if chapters is None:
+        return "unreadable"
+    if not chapters:
+        return "no matching chapters" if prefiltered else "no chapters"
+    if episode_parsing and parse_episode(mkv_path) is None:
+        return "no episode tag"
+    return None
+
+
+def group_clusters(
+    filtered: list[Chapter],
+    config: GroupingConfig,
+    min_occurrences: int,
+    vectorized: bool = False,
+) -> list[list[Chapter]]:
+    """Group filtered chapters into clusters that meet the occurrence threshold.
+
+    min_occurrences <= 0 skips grouping: every chapter is its own cluster.
+    vectorized needs numpy and raises ImportError without it.
+    """
+    if min_occurrences <= 0:
+        return [[ch] for ch in filtered]
+
+    stats = GroupingStats()
+    if vectorized:
+        from chapter_extractor.table import ChapterTable
+
+        table = ChapterTable(filtered)
+        clusters = table.group(table.all(), config, stats)
+    else:
+        clusters = group_chapters(filtered, config, stats)
+    clusters = [c for c in clusters if len(c) >= min_occurrences]
+    for step, n in (("duration", stats.duration), ("title_split", stats.title_split),
+                    ("episode_split", stats.episode_split), ("min_occurrences", len(clusters))):
+        timing.count("clusters", n, step=step)
+    return clusters
+
+
+def build_patterns(
+    clusters: list[list[Chapter]],
+    output_dir: str,
+    episode_parsing: bool,
+    reusable: Collection[str] = (),
+    representative: str = "first",
+    claimed: set[str] | None = None,
+) -> list[ChapterPattern]:
+    """Build ChapterPattern objects from clusters (see generate_output_name for reusable and claimed).
+
+    representative is the RepresentativePicker policy choosing which member
+    of each cluster is extracted. Patterns never share an output name; pass
+    the same claimed set to calls whose outputs go to one directory.
+    """
+    picker = RepresentativePicker(representative)
+    claimed = set() if claimed is None else claimed
+    patterns: list[ChapterPattern] = []
+    for cluster in clusters:
+        if episode_parsing:
+            sorted_cluster = sorted(
+                cluster,
+                key=lambda c: (c.episode.season, c.episode.episode) if c.episode else (0, 0),
+            )
+        else:
+            sorted_cluster = cluster
+
+        first = sorted_cluster[0]
+        avg_dur = sum(c.duration for c in cluster) / len(cluster)
+        ep_range = format_episode_range(cluster)
+        output_name = generate_output_name(cluster, output_dir, episode_parsing, reusable, claimed)
+
+        patterns.append(ChapterPattern(
+            chapters=sorted_cluster,
+            avg_duration=avg_dur,
+            episode_range=ep_range,
+            first_occurrence=first,
+            output_name=output_name,
+            representative=picker.pick(sorted_cluster),
+        ))
+
+    # Sort by first occurrence episode, then by start time within that episode
+    patterns.sort(key=lambda p: (
+        (p.first_occurrence.episode.season, p.first_occurrence.episode.episode) if p.first_occurrence.episode else (0, 0),
+        p.first_occurrence.start,
+    ))
+    timing.count("patterns", len(patterns))
+    return patterns
+
+
+def _probe(path: str) -> tuple[list[Chapter] | None, bool]:
+    """read_chapters, and whether the result may be remembered (not so after ProbeUnavailable)."""
+    try:
+        return read_chapters(path), True
+    except ProbeUnavailable:
+        return None, False
+
+
+@dataclass(slots=True)
+class Query:
+    """Filter and grouping settings of one Pipeline call; the CLI options of the same names."""
+
+    duration_range: tuple[float, float] | None = None
+    chapter_names: bool = False
+    min_occurrences: int = 5
+    grouping: GroupingConfig = GroupingConfig()
+    episode_parsing: bool = True
+    vectorized: bool = False
+    representative: str = "first"
+
+
+@dataclass(slots=True)
+class FileResult:
+    path: str
+    chapters: list[Chapter] | None
+
+
+@dataclass(slots=True)
+class FilterResult:
+    """Chapters that passed the filters, and what happened to the files they came from."""
+
+    chapters: list[Chapter]
+    files: int = 0
+    chapters_read: int = 0
+    skipped: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass(slots=True)
+class ExtractionResult:
+    """ok, and how the output was made: extracted, linked (segment store) or resumed (journal)."""
+
+    pattern: ChapterPattern
+    ok: bool
+    how: str = "extracted"
+
+
+@dataclass(slots=True)
+class RunResult:
+    files: list[FileResult]
+    filtered: FilterResult
+    patterns: list[ChapterPattern]
+    extractions: list[ExtractionResult] | None = None
+
+
+@dataclass(frozen=True, slots=True)
+class Progress:
+    """Passed to the progress callback: done of total items of a stage (total None if unknown)."""
+
+    stage: str
+    done: int
+    total: int | None = None
+
+
+class Pipeline:
+    """The scan → probe → filter → group → build → extract pipeline of one library, as an API.
+
+    Probe results stay in memory between calls and are reused for files
+    whose size, mtime and inode haven't changed, so repeated queries only
+    read new or modified files. Each stage is a method that can be called on
+    its own; run() chains them. Not safe for concurrent calls: filter()
+    attaches episodes to the shared Chapter objects.
+    """
+
+    def __init__(
+        self,
+        input_dir: str,
+        output_dir: str,
+        *,
+        recursive: bool = False,
+        scan_options: dict | None = None,
+        jobs: int = 1,
+        extract_jobs: int = 1,
+        per_device: int = 1,
+        per_output_device: int | None = None,
+        on_progress: Callable[[Progress], None] | None = None,
+    ) -> None:
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.recursive = recursive
+        self.scan_options = scan_options or {}
+        self.jobs = jobs
+        self.extract_jobs = extract_jobs
+        self.per_device = per_device
+        self.per_output_device = per_output_device
+        self.on_progress = on_progress
+        self.probed = 0
+        self.reused = 0
+        self._results: dict[str, tuple[FileIdentity | None, list[Chapter] | None]] = {}
+
+    def _progress(self, stage: str, done: int, total: int | None = None) -> None:
+        if self.on_progress is not None:
+            self.on_progress(Progress(stage, done, total))
+
+    @property
+    def cached_files(self) -> int:
+        return len(self._results)
+
+    def invalidate(self, paths: Iterable[str] | None = None) -> None:
+        """Forget the probe results of paths (all files if None)."""
+        if paths is None:
+            self._results.clear()
+            return
+        for path in paths:
+            self._results.pop(path, None)
+
+    def scan(self) -> list[str]:
+        """Matching files of the library, in walk order, without those in an output_dir inside it."""
+        outputs = is_within(self.output_dir, self.input_dir) and not is_within(self.input_dir, self.output_dir)
+        with timing.stage("scan"):
+            files = [
+                f for _, names in walk_library(self.input_dir, self.recursive, **self.scan_options) for f in names
+                if not (outputs and is_within(f, self.output_dir))
+            ]
+        self._progress("scan", len(files), len(files))
+        return files
+
+    def probe(self, files: list[str]) -> list[FileResult]:
+        """Chapters of each file, read with up to `jobs` threads unless unchanged since the last call."""
+        from concurrent.futures import ThreadPoolExecutor
+
+        results: dict[str, list[Chapter] | None] = {}
+        missing: list[tuple[str, FileIdentity | None]] = []
+        for path in files:
+            identity = file_identity(path)
+            known = self._results.get(path)
+            if known is not None and identity is not None and known[0] == identity:
+                results[path] = known[1]
+            else:
+                missing.append((path, identity))
+        self.reused += len(files) - len(missing)
+        self.probed += len(missing)
+
+        done = len(files) - len(missing)
+        self._progress("probe", done, len(files))
+        with timing.stage("probe"), ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            for (path, identity), (chapters, known) in zip(missing, pool.map(_probe, [p for p, _ in missing])):
+                if known:
+                    self._results[path] = (identity, chapters)
+                results[path] = chapters
+                done += 1
+                self._progress("probe", done, len(files))
+        return [FileResult(path, results[path]) for path in files]
+
+    def filter(self, results: list[FileResult], query: Query = Query()) -> FilterResult:
+        """Attach episodes (or clear them without episode parsing) and apply the query's filters."""
+        with timing.stage("filter"):
+            outcome = FilterResult(chapters=[])
+            for result in results:
+                outcome.files += 1
+                reason = skip_reason(result.path, result.chapters, query.episode_parsing)
+                if reason is not None:
+                    outcome.skipped[reason] = outcome.skipped.get(reason, 0) + 1
+                    continue
+                episode = parse_episode(result.path) if query.episode_parsing else None
+                for ch in result.chapters:
+                    ch.episode = episode
+                outcome.chapters_read += len(result.chapters)
+                outcome.chapters.extend(filter_chapters(result.chapters, query.duration_range, query.chapter_names))
+        self._progress("filter", len(results), len(results))
+        return outcome
+
+    def group(self, chapters: list[Chapter], query: Query = Query()) -> list[list[Chapter]]:
+        grouping = query.grouping
+        if not query.episode_parsing:
+            grouping = replace(grouping, max_episode_gap=None)
+        with timing.stage("group"):
+            clusters = group_clusters(chapters, grouping, query.min_occurrences, query.vectorized)
+        self._progress("group", len(clusters), len(clusters))
+        return clusters
+
+    def build(self, clusters: list[list[Chapter]], query: Query = Query()) -> list[ChapterPattern]:
+        with timing.stage("build"):
+            patterns = build_patterns(clusters, self.output_dir, query.episode_parsing,
+                                      representative=query.representative)
+        self._progress("build", len(patterns), len(patterns))
+        return patterns
+
+    def extract(
+        self,
+        patterns: list[ChapterPattern],
+        store: SegmentStore | None = None,
+        journal: Journal | None = None,
+    ) -> list[ExtractionResult]:
+        """Extract patterns, one mkvmerge run per source file, limited per block device.
+
+        Outputs the journal lists as done are kept and, with a segment store,
+        segments extracted before are linked into place (see submit_extraction).
+        """
+        os.makedirs(self.output_dir, exist_ok=True)
+        outcome: dict[int, tuple[bool, str]] = {}
+        lock = threading.Lock()
+
+        def report(pattern: ChapterPattern, ok: bool, how: str) -> None:
+            with lock:
+                outcome[id(pattern)] = (ok, how)
+                self._progress("extract", len(outcome), len(patterns))
+
+        with timing.stage("extract"):
+            scheduler = DeviceScheduler(self.extract_jobs, self.per_device, per_output_device=self.per_output_device)
+            for group in group_by_source(patterns):
+                submit_extraction(scheduler, group, report, store, journal)
+            scheduler.join()
+        return [ExtractionResult(p, *outcome.get(id(p), (False, "extracted"))) for p in patterns]
+
+    def run(self, query: Query = Query(), extract: bool = False) -> RunResult:
+        """Run every stage; files that disappeared from the library are forgotten."""
+        files = self.scan()
+        current = set(files)
+        self.invalidate([p for p in self._results if p not in current])
+        results = self.probe(files)
+        filtered = self.filter(results, query)
+        patterns = self.build(self.group(filtered.chapters, query), query)
+        extractions = self.extract(patterns) if extract else None
+        return RunResult(files=results, filtered=filtered, patterns=patterns, extractions=extractions)
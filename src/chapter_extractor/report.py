@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import threading
+from typing import TextIO
+
+from chapter_extractor.models import Chapter, ChapterPattern
+
+OUTPUT_FORMATS = ("text", "ndjson")
+
+
+def chapter_record(chapter: Chapter, with_source: bool = True) -> dict:
+    """JSON-ready fields of a chapter."""
+    record = {
+        "start": chapter.start,
+        "end": chapter.end,
+        "duration": chapter.duration,
+        "title": chapter.title,
+    }
+    if with_source:
+        record["source_file"] = chapter.source_file
+        record["episode"] = str(chapter.episode) if chapter.episode else None
+    return record
+
+
+def file_record(path: str, chapters: list[Chapter] | None, skipped: str | None) -> dict:
+    """JSON-ready description of one probed file."""
+    return {
+        "path": path,
+        "episode": str(chapters[0].episode) if chapters and chapters[0].episode else None,
+        "skipped": skipped,
+        "chapters": [chapter_record(c, with_source=False) for c in chapters or []],
+    }
+
+
+def pattern_record(index: int, pattern: ChapterPattern) -> dict:
+    """JSON-ready description of one detected pattern."""
+    first = pattern.first_occurrence
+    return {
+        "index": index,
+        "title": first.title,
+        "avg_duration": pattern.avg_duration,
+        "episode_range": pattern.episode_range,
+        "output": pattern.output_name,
+        "first_occurrence": chapter_record(first),
+        "representative": chapter_record(pattern.representative),
+        "chapters": [chapter_record(c) for c in pattern.chapters],
+    }
+
+
+class NdjsonReporter:
+    """Write one JSON object per line as results become available.
+
+    Record types, in the order they appear: "file" for every probed file,
+    "pattern" for every detected pattern, "extraction" for every output and
+    a final "summary". Each line is flushed immediately so consumers can act
+    on it while the run goes on. Safe to use from several threads.
+    """
+
+    def __init__(self, stream: TextIO) -> None:
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def _emit(self, record: dict) -> None:
+        import json
+
+        line = json.dumps(record, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def file(self, path: str, chapters: list[Chapter] | None, skipped: str | None) -> None:
+        self._emit({"type": "file", **file_record(path, chapters, skipped)})
+
+    def pattern(self, index: int, pattern: ChapterPattern) -> None:
+        self._emit({"type": "pattern", **pattern_record(index, pattern)})
+
+    def extraction(self, pattern: ChapterPattern, status: str) -> None:
+        """status is one of extracted, linked, resumed, failed, up_to_date or renamed."""
+        self._emit({"type": "extraction", "output": pattern.output_name, "status": status})
+
+    def summary(self, **fields: object) -> None:
+        self._emit({"type": "summary", **fields})
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import math
+import os
+from bisect import bisect_left
+from dataclasses import dataclass
+
+from chapter_extractor.chapters import read_duration, read_keyframes
+from chapter_extractor.models import Chapter
+
+REPRESENTATIVE_POLICIES = ("first", "cheapest", "best-aligned")
+
+
+@dataclass(frozen=True, slots=True)
+class SourceInfo:
+    """What the cost of extracting from a source file is estimated from."""
+
+    size: int
+    duration: float | None
+    keyframes: list[float] | None
+
+    @property
+    def bytes_per_second(self) -> float | None:
+        if not self.duration:
+            return None
+        return self.size / self.duration
+
+
+def source_info(path: str) -> SourceInfo | None:
+    """Size, duration and Cues keyframes of a source file (read natively). None if it can't be stat'ed."""
+    try:
+        size = os.path.getsize(path)
+    except OSError:
+        return None
+    return SourceInfo(size=size, duration=read_duration(path), keyframes=read_keyframes(path))
+
+
+def keyframe_distance(chapter: Chapter, keyframes: list[float]) -> float:
+    """Seconds between the chapter's start and end and their nearest keyframes, added up."""
+    total = 0.0
+    for t in (chapter.start, chapter.end):
+        i = bisect_left(keyframes, t)
+        total += min(abs(keyframes[j] - t) for j in (i - 1, i) if 0 <= j < len(keyframes))
+    return total
+
+
+class RepresentativePicker:
+    """Choose the member of each cluster that is extracted.
+
+    first takes the earliest member (the cluster is passed in episode order)
+    and reads nothing. best-aligned takes the member whose chapter bounds lie
+    closest to keyframes listed in its file's Cues, so mkvmerge copies the
+    fewest extra frames. cheapest estimates the bytes mkvmerge reads: the
+    source up to the chapter's end at the file's average bitrate, plus the
+    keyframe slack. A source that an earlier pick of the same picker already
+    reads costs only the part beyond what is read anyway, because segments
+    of one source are extracted in a single pass. Members whose cost can't be
+    estimated are only taken if none can; ties go to the earliest member.
+    """
+
+    def __init__(self, policy: str = "first") -> None:
+        if policy not in REPRESENTATIVE_POLICIES:
+            raise ValueError(f"Unknown representative policy: {policy!r}")
+        self.policy = policy
+        self._sources: dict[str, SourceInfo | None] = {}
+        # Source file -> end (seconds) of the furthest segment picked from it
+        self._read_until: dict[str, float] = {}
+
+    def _source(self, path: str) -> SourceInfo | None:
+        if path not in self._sources:
+            self._sources[path] = source_info(path)
+        return self._sources[path]
+
+    def _misalignment(self, chapter: Chapter) -> float:
+        info = self._source(chapter.source_file)
+        if info is None or not info.keyframes:
+            return math.inf
+        return keyframe_distance(chapter, info.keyframes)
+
+    def _bytes_read(self, chapter: Chapter) -> float:
+        info = self._source(chapter.source_file)
+        rate = info.bytes_per_second if info is not None else None
+        if rate is None:
+            return math.inf
+        already = self._read_until.get(chapter.source_file, 0.0)
+        slack = keyframe_distance(chapter, info.keyframes) if info.keyframes else 0.0
+        return rate * (max(chapter.end - already, 0.0) + slack)
+
+    def cost(self, chapter: Chapter) -> float:
+        """The policy's cost of extracting chapter (lower is better)."""
+        if self.policy == "best-aligned":
+            return self._misalignment(chapter)
+        if self.policy == "cheapest":
+            return self._bytes_read(chapter)
+        return 0.0
+
+    def pick(self, members: list[Chapter]) -> Chapter:
+        if self.policy == "first" or len(members) == 1:
+            chosen = members[0]
+        else:
+            chosen = min(enumerate(members), key=lambda item: (self.cost(item[1]), item[0]))[1]
+        source = chosen.source_file
+        self._read_until[source] = max(self._read_until.get(source, 0.0), chosen.end)
+        return chosen
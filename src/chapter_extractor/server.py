@@ -0,0 +1,244 @@
+from __future__ import annotations
+
+import json
+import os
+import socket
+import socketserver
+import stat
+import sys
+import threading
+
+from chapter_extractor.matcher import GroupingConfig
+from chapter_extractor.pipeline import Pipeline, Query, skip_reason
+from chapter_extractor.report import file_record, pattern_record
+
+
+class RequestError(Exception):
+    """A request is malformed or names something that doesn't exist."""
+
+
+def query_from_request(request: dict) -> Query:
+    """Build a Query from the CLI-named fields of a request; missing fields keep their defaults."""
+    defaults = Query()
+    grouping = defaults.grouping
+    duration_range = request.get("duration_range")
+    if duration_range is not None:
+        if not (isinstance(duration_range, list) and len(duration_range) == 2):
+            raise RequestError("duration_range must be [min, max]")
+        duration_range = (float(duration_range[0]), float(duration_range[1]))
+    tolerance_seconds = request.get("tolerance_seconds")
+    tolerance_percent = request.get("tolerance_percent")
+    if tolerance_seconds is None and tolerance_percent is None:
+        tolerance_seconds = grouping.tolerance_seconds
+    max_episode_gap = request.get("max_episode_gap", grouping.max_episode_gap)
+    return Query(
+        duration_range=duration_range,
+        chapter_names=bool(request.get("chapter_names", defaults.chapter_names)),
+        min_occurrences=int(request.get("min_occurrences", defaults.min_occurrences)),
+        grouping=GroupingConfig(
+            tolerance_seconds=None if tolerance_seconds is None else float(tolerance_seconds),
+            tolerance_percent=None if tolerance_percent is None else float(tolerance_percent),
+            start_window=float(request.get("start_window", grouping.start_window)),
+            max_episode_gap=None if max_episode_gap is None else int(max_episode_gap),
+        ),
+        episode_parsing=bool(request.get("episode_parsing", defaults.episode_parsing)),
+        vectorized=bool(request.get("vectorized", defaults.vectorized)),
+        representative=str(request.get("representative", defaults.representative)),
+    )
+
+
+class PipelineService:
+    """Answer JSON requests from one warm Pipeline per (library, output_dir, recursive).
+
+    Requests for the same library are serialized; different libraries are
+    served concurrently.
+    """
+
+    def __init__(
+        self,
+        jobs: int = 1,
+        extract_jobs: int = 1,
+        per_device: int = 1,
+        per_output_device: int | None = None,
+        scan_options: dict | None = None,
+    ) -> None:
+        self.jobs = jobs
+        self.extract_jobs = extract_jobs
+        self.per_device = per_device
+        self.per_output_device = per_output_device
+        self.scan_options = scan_options or {}
+        self._pipelines: dict[tuple[str, str, bool], tuple[Pipeline, threading.Lock]] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, request: dict) -> tuple[str, str, bool]:
+        library = request.get("library")
+        if not isinstance(library, str):
+            raise RequestError("Missing library")
+        library = os.path.abspath(library)
+        if not os.path.isdir(library):
+            raise RequestError(f"Input directory not found: {library}")
+        output_dir = os.path.abspath(request.get("output_dir") or library)
+        return library, output_dir, bool(request.get("recursive", False))
+
+    def _pipeline(self, request: dict) -> tuple[Pipeline, threading.Lock]:
+        key = self._key(request)
+        with self._lock:
+            if key not in self._pipelines:
+                library, output_dir, recursive = key
+                pipeline = Pipeline(
+                    library, output_dir, recursive=recursive, scan_options=self.scan_options,
+                    jobs=self.jobs, extract_jobs=self.extract_jobs, per_device=self.per_device,
+                    per_output_device=self.per_output_device,
+                )
+                self._pipelines[key] = (pipeline, threading.Lock())
+            return self._pipelines[key]
+
+    def handle(self, request: object) -> dict:
+        """Response to one request: {"ok": true, ...} or {"ok": false, "error": message}."""
+        try:
+            if not isinstance(request, dict):
+                raise RequestError("A request must be a JSON object")
+            op = request.get("op")
+            handler = getattr(self, f"_op_{op}", None) if isinstance(op, str) else None
+            if handler is None:
+                raise RequestError(f"Unknown op: {op!r}")
+            return {"ok": True, **handler(request)}
+        except Exception as e:
+            # A failed request must not take the connection (or the server) down
+            return {"ok": False, "error": str(e) or type(e).__name__}
+
+    def _op_patterns(self, request: dict) -> dict:
+        query = query_from_request(request)
+        extract = bool(request.get("extract", False))
+        if extract:
+            library, output_dir, _ = self._key(request)
+            if output_dir == library:
+                # Outputs are named like episodes and would be probed as such by the next request
+                raise RequestError("Extracting needs an output_dir other than the library")
+        pipeline, lock = self._pipeline(request)
+        with lock:
+            probed, reused = pipeline.probed, pipeline.reused
+            result = pipeline.run(query, extract=extract)
+            probed, reused = pipeline.probed - probed, pipeline.reused - reused
+        extractions = None
+        if result.extractions is not None:
+            extractions = [
+                {"output": e.pattern.output_name, "status": e.how if e.ok else "failed"}
+                for e in result.extractions
+            ]
+        return {
+            "files": result.filtered.files,
+            "skipped": result.filtered.skipped,
+            "chapters": result.filtered.chapters_read,
+            "probed": probed,
+            "reused": reused,
+            "patterns": [pattern_record(i, p) for i, p in enumerate(result.patterns, 1)],
+            "extractions": extractions,
+        }
+
+    def _op_files(self, request: dict) -> dict:
+        episode_parsing = bool(request.get("episode_parsing", True))
+        pipeline, lock = self._pipeline(request)
+        with lock:
+            results = pipeline.probe(pipeline.scan())
+        return {"files": [file_record(r.path, r.chapters, skip_reason(r.path, r.chapters, episode_parsing))
+                          for r in results]}
+
+    def _op_invalidate(self, request: dict) -> dict:
+        pipeline, lock = self._pipeline(request)
+        paths = request.get("paths")
+        with lock:
+            pipeline.invalidate(None if paths is None else [os.path.abspath(p) for p in paths])
+        return {}
+
+    def _op_status(self, request: dict) -> dict:
+        with self._lock:
+            pipelines = [(key, pipeline) for key, (pipeline, _) in self._pipelines.items()]
+        return {"libraries": [
+            {"library": library, "output_dir": output_dir, "recursive": recursive,
+             "files": pipeline.cached_files, "probed": pipeline.probed, "reused": pipeline.reused}
+            for (library, output_dir, recursive), pipeline in pipelines
+        ]}
+
+    def _op_shutdown(self, request: dict) -> dict:
+        return {}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """One JSON request per line, one JSON response per line."""
+
+    server: PipelineServer
+
+    def handle(self) -> None:
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"ok": False, "error": f"Invalid JSON: {e}"}
+            else:
+                response = self.server.service.handle(request)
+            self.wfile.write(json.dumps(response, ensure_ascii=False).encode() + b"\n")
+            self.wfile.flush()
+            if response["ok"] and request["op"] == "shutdown":
+                threading.Thread(target=self.server.shutdown, daemon=True).start()
+                return
+
+
+class PipelineServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    """Unix domain socket server for a PipelineService; the socket is only accessible to its owner."""
+
+    daemon_threads = True
+
+    def __init__(self, path: str, service: PipelineService) -> None:
+        _remove_stale_socket(path)
+        self.service = service
+        old_umask = os.umask(0o177)
+        try:
+            super().__init__(path, _Handler)
+        finally:
+            os.umask(old_umask)
+
+    def server_close(self) -> None:
+        super().server_close()
+        try:
+            os.unlink(self.server_address)
+        except OSError:
+            pass
+
+
+def _remove_stale_socket(path: str) -> None:
+    """Delete a socket left behind by a crashed server; refuse to take over a live one or a non-socket."""
+    try:
+        mode = os.lstat(path).st_mode
+    except FileNotFoundError:
+        return
+    if not stat.S_ISSOCK(mode):
+        raise RequestError(f"{path} exists and is not a socket")
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(path)
+    except OSError:
+        os.unlink(path)
+    else:
+        raise RequestError(f"Another server is already listening on {path}")
+    finally:
+        probe.close()
+
+
+def serve(path: str, service: PipelineService) -> int:
+    """Serve requests on a Unix socket until a shutdown request or Ctrl+C."""
+    try:
+        server = PipelineServer(path, service)
+    except (OSError, RequestError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 1
+    print(f"Listening on {path}", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import os
+import zlib
+from dataclasses import dataclass
+
+_INDEX_VERSION = 1
+
+
+class ShardIndexError(Exception):
+    """A shard index file is missing, malformed or doesn't fit the other shards."""
+
+
+def shard_of(series: str, count: int) -> int:
+    """Shard (1-based) that handles a series directory.
+
+    Uses CRC-32 of the directory name rather than hash(), which is salted
+    per process, so every machine agrees on the assignment.
+    """
+    return zlib.crc32(series.encode("utf-8", "surrogateescape")) % count + 1
+
+
+@dataclass(slots=True)
+class ShardRecord:
+    path: str
+    chapters: list[list] | None
+    skipped: str | None = None
+
+
+@dataclass(slots=True)
+class ShardIndex:
+    """Probe results of one shard: [start, end, title] rows per file, paths relative to the library root."""
+
+    shard: int
+    count: int
+    files: list[ShardRecord]
+
+
+def write_shard_index(path: str, index: ShardIndex) -> None:
+    """Write a shard index atomically."""
+    import json
+
+    data = {
+        "version": _INDEX_VERSION,
+        "shard": [index.shard, index.count],
+        "files": [
+            {"path": r.path, "chapters": r.chapters, "skipped": r.skipped}
+            for r in index.files
+        ],
+    }
+    parent = os.path.dirname(path)
+    if parent:
+        os.makedirs(parent, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
+
+
+def read_shard_index(path: str) -> ShardIndex:
+    """Load a shard index written by write_shard_index."""
+    import json
+
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ShardIndexError(f"Could not read shard index {path}: {e}") from e
+    if not isinstance(data, dict) or data.get("version") != _INDEX_VERSION:
+        raise ShardIndexError(f"Unsupported shard index format: {path}")
+    shard, count = data["shard"]
+    files = [ShardRecord(r["path"], r["chapters"], r.get("skipped")) for r in data["files"]]
+    return ShardIndex(shard=shard, count=count, files=files)
+
+
+def to_portable(path: str, root: str) -> str:
+    """Path relative to root with '/' separators, valid on any machine mounting the library."""
+    return os.path.relpath(path, root).replace(os.sep, "/")
+
+
+def from_portable(path: str, root: str) -> str:
+    """Inverse of to_portable for this machine's mount point of the library."""
+    return os.path.join(root, *path.split("/"))
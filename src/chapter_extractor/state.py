@@ -0,0 +1,189 @@
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass, field
+
+from chapter_extractor.cache import FileIdentity, ProbeCache, chapters_from_rows, chapters_to_rows
+from chapter_extractor.models import Chapter, ChapterPattern
+
+SegmentKey = tuple[str, float, float]
+
+_STATE_VERSION = 1
+
+
+def segment_key(chapter: Chapter) -> SegmentKey:
+    """Identify a chapter by its source file and time range."""
+    return chapter.source_file, chapter.start, chapter.end
+
+
+@dataclass
+class PatternRecord:
+    output_name: str
+    first: SegmentKey
+    members: frozenset[SegmentKey]
+
+    @classmethod
+    def from_pattern(cls, pattern: ChapterPattern) -> PatternRecord:
+        return cls(
+            output_name=pattern.output_name,
+            first=segment_key(pattern.first_occurrence),
+            members=frozenset(segment_key(c) for c in pattern.chapters),
+        )
+
+
+@dataclass
+class ExtractionPlan:
+    """What to do with each pattern of an incremental run."""
+
+    extract: list[ChapterPattern] = field(default_factory=list)
+    keep: list[ChapterPattern] = field(default_factory=list)
+    rename: list[tuple[str, ChapterPattern]] = field(default_factory=list)
+
+
+class RunState:
+    """Per-file probe results and extracted patterns persisted between runs.
+
+    Acts as a probe memo for _probe_files (same get/put interface as
+    ProbeCache, optionally backed by one). Files not probed in the current
+    run are dropped on save, and patterns are replaced by the ones recorded
+    in the current run. Without any recorded patterns (e.g. a dry run) the
+    previous ones are kept. With path None nothing is loaded or saved.
+    """
+
+    def __init__(self, path: str | None, fallback: ProbeCache | None = None) -> None:
+        self.path = path
+        self.fallback = fallback
+        self._files: dict[str, tuple[FileIdentity, list | None]] = {}
+        self._seen: dict[str, tuple[FileIdentity, list | None]] = {}
+        self.patterns: list[PatternRecord] = []
+        self._recorded: list[PatternRecord] | None = None
+        if path is not None and os.path.exists(path):
+            self._load()
+        self._unclaimed = [r for r in self.patterns if os.path.exists(r.output_name)]
+
+    def _load(self) -> None:
+        import json
+
+        with open(self.path) as f:
+            data = json.load(f)
+        if data.get("version") != _STATE_VERSION:
+            return
+        for path, entry in data["files"].items():
+            self._files[path] = (tuple(entry["identity"]), entry["chapters"])
+        for entry in data["patterns"]:
+            self.patterns.append(PatternRecord(
+                output_name=entry["output"],
+                first=tuple(entry["first"]),
+                members=frozenset(tuple(m) for m in entry["members"]),
+            ))
+
+    def get(self, path: str, identity: FileIdentity) -> tuple[bool, list[Chapter] | None]:
+        """Return the previous run's result for path if the file is unchanged."""
+        entry = self._files.get(path)
+        if entry is not None and entry[0] == identity:
+            self._seen[path] = entry
+            return True, chapters_from_rows(entry[1], path)
+        if self.fallback is not None:
+            hit, chapters = self.fallback.get(path, identity)
+            if hit:
+                self.put(path, identity, chapters, cache=False)
+                return True, chapters
+        return False, None
+
+    def put(self, path: str, identity: FileIdentity, chapters: list[Chapter] | None, cache: bool = True) -> None:
+        """Record a fresh probe result for path."""
+        self._seen[path] = (identity, chapters_to_rows(chapters))
+        if cache and self.fallback is not None:
+            self.fallback.put(path, identity, chapters)
+
+    def forget(self, path: str) -> None:
+        """Drop the probe result of a file that no longer exists."""
+        self._files.pop(path, None)
+        self._seen.pop(path, None)
+
+    def probed_files(self) -> list[str]:
+        """Files with a probe result from the current run."""
+        return list(self._seen)
+
+    def plan(self, patterns: list[ChapterPattern]) -> ExtractionPlan:
+        """Match patterns against the previous run's outputs.
+
+        A pattern with the same members as a previous one keeps its output.
+        One whose members changed but whose first occurrence didn't (e.g. the
+        episode range grew) reuses the previous output under its new name.
+        Everything else is extracted. Reused patterns get their final
+        output_name set here; renames are left to the caller. Each previous
+        output is claimed at most once across calls.
+        """
+        plan = ExtractionPlan()
+        available = self._unclaimed
+
+        remaining: list[ChapterPattern] = []
+        for pattern in patterns:
+            record = PatternRecord.from_pattern(pattern)
+            match = next((r for r in available if r.members == record.members), None)
+            if match is None:
+                remaining.append(pattern)
+                continue
+            available.remove(match)
+            pattern.output_name = match.output_name
+            plan.keep.append(pattern)
+
+        for pattern in remaining:
+            first = segment_key(pattern.first_occurrence)
+            match = next((r for r in available if r.first == first), None)
+            if match is None:
+                plan.extract.append(pattern)
+                continue
+            available.remove(match)
+            plan.rename.append((match.output_name, pattern))
+
+        return plan
+
+    def stale_outputs(self) -> list[str]:
+        """Previous outputs that no current pattern claimed."""
+        return [r.output_name for r in self._unclaimed]
+
+    def record(self, patterns: list[ChapterPattern]) -> None:
+        """Remember patterns whose outputs are now up to date."""
+        if self._recorded is None:
+            self._recorded = []
+        self._recorded.extend(PatternRecord.from_pattern(p) for p in patterns)
+
+    def advance(self) -> None:
+        """Start a new round on the same state (used by watch mode).
+
+        Outputs recorded so far and previous outputs nobody claimed become
+        the "previous run" for the next plan().
+        """
+        if self._recorded is not None:
+            self.patterns = [r for r in self._unclaimed if os.path.exists(r.output_name)] + self._recorded
+            self._recorded = None
+        self._unclaimed = [r for r in self.patterns if os.path.exists(r.output_name)]
+        self._files.update(self._seen)
+
+    def save(self) -> None:
+        """Write the state atomically."""
+        import json
+
+        if self.path is None:
+            return
+        patterns = self._recorded if self._recorded is not None else self.patterns
+        data = {
+            "version": _STATE_VERSION,
+            "files": {
+                path: {"identity": list(identity), "chapters": chapters}
+                for path, (identity, chapters) in self._seen.items()
+            },
+            "patterns": [
+                {"output": r.output_name, "first": list(r.first), "members": sorted(r.members)}
+                for r in patterns
+            ],
+        }
+        parent = os.path.dirname(self.path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import os
+import threading
+
+from chapter_extractor.models import Chapter
+
+# ioctl from <linux/fs.h>: share the source file's extents with the destination
+FICLONE = 0x40049409
+_HASH_CHUNK = 1024 * 1024
+# All tracks of the source; the CLI has no track selection yet
+ALL_TRACKS = ""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS segments (
+    source_dev INTEGER NOT NULL,
+    source_inode INTEGER NOT NULL,
+    start REAL NOT NULL,
+    end REAL NOT NULL,
+    tracks TEXT NOT NULL,
+    source_size INTEGER NOT NULL,
+    source_mtime_ns INTEGER NOT NULL,
+    path TEXT NOT NULL,
+    sha256 TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    PRIMARY KEY (source_dev, source_inode, start, end, tracks)
+);
+CREATE INDEX IF NOT EXISTS segments_by_hash ON segments (sha256, size);
+"""
+
+
+def default_store_path() -> str:
+    """Default segment store location under the user's cache directory."""
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "chapter-extractor", "segments.sqlite3")
+
+
+def file_sha256(path: str) -> str:
+    """Hex SHA-256 of a file's contents."""
+    import hashlib
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def link_file(src: str, dst: str) -> bool:
+    """Place a copy of src at dst without copying data: reflink if possible, else hardlink.
+
+    dst is replaced atomically. Returns False if neither works (e.g. src and
+    dst are on different filesystems).
+    """
+    import fcntl
+
+    tmp_path = os.path.join(os.path.dirname(dst) or ".", f".{os.path.basename(dst)}.link-tmp")
+    try:
+        with open(src, "rb") as inp, open(tmp_path, "wb") as out:
+            fcntl.ioctl(out.fileno(), FICLONE, inp.fileno())
+        os.replace(tmp_path, dst)
+        return True
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+    try:
+        os.link(src, tmp_path)
+        os.replace(tmp_path, dst)
+        return True
+    except OSError:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        return False
+
+
+class SegmentStore:
+    """Index of extracted segments, so identical segments are linked instead of remuxed.
+
+    Segments are keyed by the source file's device and inode, the chapter's
+    time range and the track selection; an entry is only used while the
+    source's size and mtime and the stored output's size and mtime are
+    unchanged. Each output's SHA-256 is recorded as well, so a freshly
+    extracted segment identical to an earlier one (e.g. the same intro cut
+    from a re-release) is replaced by a link to it. Safe to use from several
+    threads.
+    """
+
+    def __init__(self, path: str) -> None:
+        import sqlite3
+
+        parent = os.path.dirname(path)
+        if parent:
+            os.makedirs(parent, exist_ok=True)
+        self.reused = 0
+        self.deduplicated = 0
+        self.bytes_saved = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript(_SCHEMA)
+
+    def reuse(self, chapter: Chapter, output_path: str, tracks: str = ALL_TRACKS) -> bool:
+        """Link a previously extracted copy of chapter to output_path. Returns True on success."""
+        try:
+            source = os.stat(chapter.source_file)
+        except OSError:
+            return False
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT path, size, mtime_ns FROM segments WHERE source_dev = ? AND source_inode = ? "
+                "AND start = ? AND end = ? AND tracks = ? AND source_size = ? AND source_mtime_ns = ?",
+                (source.st_dev, source.st_ino, chapter.start, chapter.end, tracks,
+                 source.st_size, source.st_mtime_ns),
+            ).fetchone()
+        if row is None or not _unchanged(row[0], row[1], row[2]):
+            return False
+        stored_path, size, _mtime_ns = row
+        if not _same_file(stored_path, output_path) and not link_file(stored_path, output_path):
+            return False
+        with self._lock:
+            self.reused += 1
+            self.bytes_saved += size
+        return True
+
+    def detach(self, output_path: str) -> None:
+        """Unlink output_path if it is hardlinked elsewhere, so remuxing into it can't alter the other copies."""
+        try:
+            if os.stat(output_path).st_nlink > 1:
+                os.unlink(output_path)
+        except OSError:
+            pass
+
+    def add(self, chapter: Chapter, output_path: str, tracks: str = ALL_TRACKS) -> None:
+        """Record a freshly extracted segment, replacing it by a link if identical content is stored."""
+        try:
+            source = os.stat(chapter.source_file)
+            sha256 = file_sha256(output_path)
+        except OSError:
+            return
+        size = os.path.getsize(output_path)
+        with self._lock:
+            candidates = self._conn.execute(
+                "SELECT path, size, mtime_ns FROM segments WHERE sha256 = ? AND size = ?",
+                (sha256, size),
+            ).fetchall()
+        for path, cand_size, cand_mtime_ns in candidates:
+            if _same_file(path, output_path) or not _unchanged(path, cand_size, cand_mtime_ns):
+                continue
+            if link_file(path, output_path):
+                with self._lock:
+                    self.deduplicated += 1
+                    self.bytes_saved += size
+                break
+
+        st = os.stat(output_path)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO segments (source_dev, source_inode, start, end, tracks, "
+                "source_size, source_mtime_ns, path, sha256, size, mtime_ns) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (source.st_dev, source.st_ino, chapter.start, chapter.end, tracks,
+                 source.st_size, source.st_mtime_ns, os.path.abspath(output_path), sha256,
+                 st.st_size, st.st_mtime_ns),
+            )
+            self._conn.commit()
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def _unchanged(path: str, size: int, mtime_ns: int) -> bool:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return False
+    return st.st_size == size and st.st_mtime_ns == mtime_ns
+
+
+def _same_file(a: str, b: str) -> bool:
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return False
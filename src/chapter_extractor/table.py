@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+from operator import attrgetter
+
+import numpy as np
+
+from chapter_extractor.matcher import (
+    DEFAULT_MAX_EPISODE_GAP,
+    DEFAULT_START_WINDOW,
+    GroupingConfig,
+    GroupingStats,
+    _matches_chapter_name,
+    _title_key,
+)
+from chapter_extractor.models import Chapter
+
+
+class ChapterTable:
+    """Struct-of-arrays view of a list of chapters (requires the optional numpy dependency).
+
+    Every operation returns exactly what the list-based functions in
+    matcher.py return for the same input, in the same order. Durations live
+    in float arrays, titles and source files are stored once and referenced
+    by integer ids, and seasons/episodes are int arrays (-1 when a chapter
+    has no episode). Operations take and return index arrays
+    into the table; to_chapters() maps them back to the original objects.
+    """
+
+    def __init__(self, chapters: list[Chapter]) -> None:
+        self.chapters = chapters
+        count = len(chapters)
+        self.start = np.fromiter(map(attrgetter("start"), chapters), dtype=np.float64, count=count)
+        self.end = np.fromiter(map(attrgetter("end"), chapters), dtype=np.float64, count=count)
+        self.duration = np.fromiter(map(attrgetter("duration"), chapters), dtype=np.float64, count=count)
+
+        titles = list(map(attrgetter("title"), chapters))
+        files = list(map(attrgetter("source_file"), chapters))
+        self.titles: list[str | None] = list(dict.fromkeys(titles))
+        self.files: list[str] = list(dict.fromkeys(files))
+        title_ids = {t: i for i, t in enumerate(self.titles)}
+        file_ids = {f: i for i, f in enumerate(self.files)}
+        self.title_id = np.fromiter(map(title_ids.__getitem__, titles), dtype=np.int64, count=count)
+        self.file_id = np.fromiter(map(file_ids.__getitem__, files), dtype=np.int64, count=count)
+        # Normalized title ids, as compared by split_duplicate_episodes
+        merged: dict[str, int] = {}
+        self.title_key = np.fromiter(
+            (merged.setdefault(_title_key(t), len(merged)) for t in self.titles), dtype=np.int64, count=len(self.titles),
+        )[self.title_id]
+
+        episodes = list(map(attrgetter("episode"), chapters))
+        self.season = np.fromiter((e.season if e else -1 for e in episodes), dtype=np.int64, count=count)
+        self.episode = np.fromiter((e.episode if e else -1 for e in episodes), dtype=np.int64, count=count)
+
+    def __len__(self) -> int:
+        return len(self.chapters)
+
+    def all(self) -> np.ndarray:
+        """Indices of every chapter, in input order."""
+        return np.arange(len(self), dtype=np.int64)
+
+    def to_chapters(self, indices: np.ndarray) -> list[Chapter]:
+        """The original Chapter objects at indices."""
+        return [self.chapters[i] for i in indices.tolist()]
+
+    def filter(self, duration_range: tuple[float, float] | None, chapter_names: bool) -> np.ndarray:
+        """Vectorized filter_chapters. Returns indices of matching chapters in input order."""
+        mask = np.ones(len(self), dtype=bool)
+        if duration_range is not None:
+            min_dur, max_dur = duration_range
+            mask &= (self.duration >= min_dur) & (self.duration <= max_dur)
+        if chapter_names:
+            # The regex runs once per distinct title, not once per chapter
+            title_matches = np.fromiter(
+                (bool(t) and _matches_chapter_name(t) for t in self.titles), dtype=bool, count=len(self.titles),
+            )
+            mask &= title_matches[self.title_id]
+        return np.flatnonzero(mask)
+
+    def cluster_by_duration(
+        self,
+        indices: np.ndarray,
+        tolerance_seconds: float | None,
+        tolerance_percent: float | None,
+    ) -> list[np.ndarray]:
+        """Vectorized cluster_by_duration: stable argsort by duration, split where the gap exceeds tolerance."""
+        if len(indices) == 0:
+            return []
+        order = indices[np.argsort(self.duration[indices], kind="stable")]
+        durations = self.duration[order]
+        gaps = np.abs(durations[1:] - durations[:-1])
+        if tolerance_seconds is not None:
+            similar = gaps <= tolerance_seconds
+        else:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                similar = gaps / durations[:-1] * 100 <= tolerance_percent
+        return np.split(order, np.flatnonzero(~similar) + 1)
+
+    def split_by_contiguity(self, indices: np.ndarray, max_gap: int = DEFAULT_MAX_EPISODE_GAP) -> list[np.ndarray]:
+        """Vectorized split_by_contiguity using a stable lexsort on (season, episode)."""
+        if len(indices) == 0:
+            return []
+        if (self.season[indices] < 0).any():
+            return [indices]
+        order = indices[np.lexsort((self.episode[indices], self.season[indices]))]
+        seasons = self.season[order]
+        episodes = self.episode[order]
+        breaks = (seasons[1:] != seasons[:-1]) | (np.abs(episodes[1:] - episodes[:-1]) > max_gap)
+        return np.split(order, np.flatnonzero(breaks) + 1)
+
+    def _has_duplicate_sources(self, indices: np.ndarray) -> bool:
+        # Same key as split_duplicate_episodes: the episode if known, else the source file
+        keys = np.where(
+            self.season[indices] >= 0,
+            (self.season[indices] << 32) | self.episode[indices],
+            -1 - self.file_id[indices],
+        )
+        return len(np.unique(keys)) < len(keys)
+
+    def split_duplicate_episodes(
+        self,
+        indices: np.ndarray,
+        start_window: float = DEFAULT_START_WINDOW,
+    ) -> list[np.ndarray]:
+        """Vectorized split_duplicate_episodes: by title in order of first appearance, else by start time."""
+        if len(indices) == 0:
+            return []
+        if not self._has_duplicate_sources(indices):
+            return [indices]
+
+        keys = self.title_key[indices]
+        unique_keys, first_seen, inverse, counts = np.unique(
+            keys, return_index=True, return_inverse=True, return_counts=True,
+        )
+        if len(unique_keys) > 1:
+            appearance = np.argsort(first_seen, kind="stable")
+            rank = np.empty_like(appearance)
+            rank[appearance] = np.arange(len(appearance))
+            order = indices[np.argsort(rank[inverse.ravel()], kind="stable")]
+            return np.split(order, np.cumsum(counts[appearance])[:-1])
+
+        order = indices[np.argsort(self.start[indices], kind="stable")]
+        starts = self.start[order]
+        return np.split(order, np.flatnonzero(np.abs(starts[1:] - starts[:-1]) > start_window) + 1)
+
+    def group(
+        self,
+        indices: np.ndarray,
+        config: GroupingConfig = GroupingConfig(),
+        stats: GroupingStats | None = None,
+    ) -> list[list[Chapter]]:
+        """Vectorized group_chapters on indices."""
+        clusters = self.cluster_by_duration(indices, config.tolerance_seconds, config.tolerance_percent)
+        duration = len(clusters)
+        clusters = [sub for cluster in clusters for sub in self.split_duplicate_episodes(cluster, config.start_window)]
+        title_split = len(clusters)
+        if config.max_episode_gap is not None:
+            clusters = [sub for cluster in clusters for sub in self.split_by_contiguity(cluster, config.max_episode_gap)]
+        if stats is not None:
+            stats.duration += duration
+            stats.title_split += title_split
+            stats.episode_split += len(clusters)
+        return [self.to_chapters(c) for c in clusters]
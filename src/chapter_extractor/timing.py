@@ -0,0 +1,226 @@
+from __future__ import annotations
+
+import bisect
+import heapq
+import os
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+DEFAULT_SLOWEST = 10
+# Upper bounds (seconds) of the per-stage duration histogram buckets
+STAGE_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0, 300.0)
+
+# The recorder of the current run; None when instrumentation is off, in
+# which case every helper below is a cheap no-op.
+_active: Recorder | None = None
+
+
+@dataclass(slots=True)
+class StageTime:
+    wall: float = 0.0
+    cpu: float = 0.0
+    calls: int = 0
+    # Calls per STAGE_BUCKETS bucket (non-cumulative); the last one is +Inf
+    buckets: list[int] = field(default_factory=lambda: [0] * (len(STAGE_BUCKETS) + 1))
+
+
+@dataclass(slots=True)
+class ToolCalls:
+    latencies: list[float] = field(default_factory=list)
+
+    def percentile(self, p: float) -> float:
+        """Nearest-rank percentile of the call latencies (0 if there are none)."""
+        if not self.latencies:
+            return 0.0
+        ordered = sorted(self.latencies)
+        return ordered[min(len(ordered) - 1, max(0, round(p / 100 * len(ordered)) - 1))]
+
+
+class Recorder:
+    """Timings of one run: per-stage wall/CPU time, subprocess latencies, bytes and slowest files.
+
+    CPU time is process-wide (time.process_time), so it includes worker
+    threads active during a stage. Safe to use from several threads.
+    """
+
+    def __init__(self, slowest: int = DEFAULT_SLOWEST) -> None:
+        self.stages: dict[str, StageTime] = {}
+        self.tools: dict[str, ToolCalls] = {}
+        self.counters: dict[tuple[str, tuple[tuple[str, str], ...]], int] = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.slowest = slowest
+        self._files: list[tuple[float, str]] = []
+        self._lock = threading.Lock()
+        self._started = time.perf_counter()
+        self._started_cpu = time.process_time()
+
+    def add_stage(self, name: str, wall: float, cpu: float) -> None:
+        with self._lock:
+            stage = self.stages.setdefault(name, StageTime())
+            stage.wall += wall
+            stage.cpu += cpu
+            stage.calls += 1
+            stage.buckets[bisect.bisect_left(STAGE_BUCKETS, wall)] += 1
+
+    def count(self, name: str, n: int = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + n
+
+    def add_tool_call(self, tool: str, seconds: float) -> None:
+        with self._lock:
+            self.tools.setdefault(tool, ToolCalls()).latencies.append(seconds)
+
+    def add_file(self, path: str, seconds: float) -> None:
+        with self._lock:
+            if len(self._files) < self.slowest:
+                heapq.heappush(self._files, (seconds, path))
+            elif self.slowest:
+                heapq.heappushpop(self._files, (seconds, path))
+
+    def add_bytes(self, read: int = 0, written: int = 0) -> None:
+        with self._lock:
+            self.bytes_read += read
+            self.bytes_written += written
+
+    def slowest_files(self) -> list[tuple[str, float]]:
+        """The slowest probed files as (path, seconds), slowest first."""
+        return [(path, seconds) for seconds, path in sorted(self._files, reverse=True)]
+
+    def to_dict(self) -> dict:
+        """Snapshot of everything recorded so far; safe to call while the run goes on."""
+        with self._lock:
+            return self._snapshot()
+
+    def _snapshot(self) -> dict:
+        return {
+            "wall": time.perf_counter() - self._started,
+            "cpu": time.process_time() - self._started_cpu,
+            "stages": {
+                name: {"wall": s.wall, "cpu": s.cpu, "calls": s.calls, "buckets": list(s.buckets)}
+                for name, s in self.stages.items()
+            },
+            "subprocesses": {
+                tool: {
+                    "count": len(calls.latencies),
+                    "total": sum(calls.latencies),
+                    "p50": calls.percentile(50),
+                    "p90": calls.percentile(90),
+                    "p99": calls.percentile(99),
+                    "max": max(calls.latencies, default=0.0),
+                }
+                for tool, calls in self.tools.items()
+            },
+            "counters": [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self.counters.items()
+            ],
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "slowest_files": [{"path": p, "seconds": s} for p, s in self.slowest_files()],
+        }
+
+    def summary_lines(self) -> list[str]:
+        """Human-readable report for --timings."""
+        data = self.to_dict()
+        lines = [f"Timings (wall {data['wall']:.2f}s, CPU {data['cpu']:.2f}s):"]
+        for name, s in data["stages"].items():
+            lines.append(f"  {name:<16} {s['wall']:9.3f}s wall {s['cpu']:9.3f}s CPU")
+        for tool, t in data["subprocesses"].items():
+            lines.append(
+                f"  {tool:<16} {t['count']:6d} calls, p50 {t['p50'] * 1000:.1f}ms, "
+                f"p90 {t['p90'] * 1000:.1f}ms, p99 {t['p99'] * 1000:.1f}ms, max {t['max'] * 1000:.1f}ms"
+            )
+        lines.append(f"  I/O              {data['bytes_read'] / 2**20:.1f} MiB read natively, "
+                     f"{data['bytes_written'] / 2**20:.1f} MiB written")
+        if data["slowest_files"]:
+            lines.append("  Slowest files:")
+            lines.extend(f"    {f['seconds']:8.3f}s  {f['path']}" for f in data["slowest_files"])
+        return lines
+
+
+def activate(recorder: Recorder | None) -> None:
+    """Make recorder the target of the module-level helpers (None turns them off)."""
+    global _active
+    _active = recorder
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time a block as (part of) a pipeline stage."""
+    recorder = _active
+    if recorder is None:
+        yield
+        return
+    wall, cpu = time.perf_counter(), time.process_time()
+    try:
+        yield
+    finally:
+        recorder.add_stage(name, time.perf_counter() - wall, time.process_time() - cpu)
+
+
+def timed_iter(name: str, items: Iterable) -> Iterator:
+    """Yield from items, counting only the time spent producing them towards stage name."""
+    if _active is None:
+        yield from items
+        return
+    it = iter(items)
+    while True:
+        with stage(name):
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+        yield item
+
+
+@contextmanager
+def tool_call(tool: str) -> Iterator[None]:
+    """Time one run of an external tool."""
+    recorder = _active
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_tool_call(tool, time.perf_counter() - start)
+
+
+@contextmanager
+def file_probe(path: str) -> Iterator[None]:
+    """Time reading one file's chapters, for the slowest-files list."""
+    recorder = _active
+    if recorder is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        recorder.add_file(path, time.perf_counter() - start)
+
+
+def count(name: str, n: int = 1, **labels: str) -> None:
+    """Add n to a run counter such as files scanned or patterns built."""
+    if _active is not None:
+        _active.count(name, n, **labels)
+
+
+def add_bytes(read: int = 0, written: int = 0) -> None:
+    if _active is not None:
+        _active.add_bytes(read, written)
+
+
+def add_output(path: str) -> None:
+    """Count a written output file's size (skipped when instrumentation is off)."""
+    if _active is not None:
+        try:
+            _active.add_bytes(written=os.path.getsize(path))
+        except OSError:
+            pass
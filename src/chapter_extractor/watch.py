@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import errno
+import os
+import select
+import struct
+import time
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+
+from chapter_extractor.scanner import DEFAULT_EXCLUDES, DEFAULT_EXTENSIONS, is_within, matches_any
+
+# Event masks from <sys/inotify.h>
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_CLOEXEC = 0o2000000
+IN_NONBLOCK = 0o4000
+
+_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_ONLYDIR
+_EVENT_HEADER = struct.Struct("iIII")
+_READ_SIZE = 64 * 1024
+
+DEFAULT_DEBOUNCE_SECONDS = 5.0
+
+
+@dataclass
+class InotifyEvent:
+    path: str
+    mask: int
+
+
+class Inotify:
+    """Minimal inotify(7) binding on top of libc via ctypes (Linux only).
+
+    Raises OSError (ENOSYS) where libc has no inotify.
+    """
+
+    def __init__(self) -> None:
+        import ctypes
+        import ctypes.util
+
+        libc_name = ctypes.util.find_library("c")
+        try:
+            self._libc = ctypes.CDLL(libc_name, use_errno=True)
+            self._libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        except (AttributeError, OSError, TypeError):
+            raise OSError(errno.ENOSYS, "inotify is not available on this platform") from None
+        self.fd = self._libc.inotify_init1(IN_CLOEXEC | IN_NONBLOCK)
+        if self.fd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err))
+        self._paths: dict[int, str] = {}
+
+    def add_watch(self, path: str, mask: int = _WATCH_MASK) -> int:
+        """Watch a directory. Returns the watch descriptor."""
+        import ctypes
+
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), mask)
+        if wd < 0:
+            err = ctypes.get_errno()
+            raise OSError(err, os.strerror(err), path)
+        self._paths[wd] = path
+        return wd
+
+    def read(self, timeout: float | None) -> list[InotifyEvent]:
+        """Wait up to timeout seconds for events. Returns [] on timeout."""
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        try:
+            buf = os.read(self.fd, _READ_SIZE)
+        except BlockingIOError:
+            return []
+
+        events: list[InotifyEvent] = []
+        offset = 0
+        while offset < len(buf):
+            wd, mask, _cookie, length = _EVENT_HEADER.unpack_from(buf, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(buf[offset:offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_IGNORED:
+                self._paths.pop(wd, None)
+                continue
+            directory = self._paths.get(wd)
+            if directory is None and not mask & IN_Q_OVERFLOW:
+                continue
+            path = os.path.join(directory, name) if directory and name else (directory or "")
+            events.append(InotifyEvent(path=path, mask=mask))
+        return events
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+    def __enter__(self) -> Inotify:
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        self.close()
+
+
+class LibraryWatcher:
+    """Report which series directories of a library changed, in debounced batches.
+
+    Every directory below root is watched except excluded ones and those
+    under ignore (e.g. an output directory inside the library). Files count
+    as changed once they are closed after writing or moved into place, so
+    half-copied episodes are ignored. New directories are watched as they
+    appear. Running out of inotify watches raises OSError (ENOSPC), here or
+    from batches().
+    """
+
+    def __init__(
+        self,
+        inotify: Inotify,
+        root: str,
+        extensions: Iterable[str] = DEFAULT_EXTENSIONS,
+        exclude: Iterable[str] = DEFAULT_EXCLUDES,
+        ignore: Iterable[str] = (),
+    ) -> None:
+        self.inotify = inotify
+        self.root = root
+        self.extensions = tuple(e.lower() for e in extensions)
+        self.exclude = tuple(exclude)
+        self.ignore = tuple(ignore)
+        self.overflowed = False
+        self._watch_tree(root)
+
+    def _excluded(self, path: str) -> bool:
+        if any(is_within(path, d) for d in self.ignore):
+            return True
+        return any(matches_any(part, self.exclude) for part in os.path.relpath(path, self.root).split(os.sep))
+
+    def _watch_tree(self, top: str) -> None:
+        for dirpath, dirnames, _filenames in os.walk(top):
+            dirnames[:] = [
+                d for d in dirnames
+                if not matches_any(d, self.exclude) and not any(is_within(os.path.join(dirpath, d), i) for i in self.ignore)
+            ]
+            try:
+                self.inotify.add_watch(dirpath)
+            except OSError as e:
+                # Directory vanished between listing and watching
+                if e.errno not in (errno.ENOENT, errno.ENOTDIR):
+                    raise
+
+    def series_of(self, path: str) -> str:
+        """Top-level directory below root containing path ("" for files directly in root)."""
+        parts = os.path.relpath(path, self.root).split(os.sep)
+        return parts[0] if len(parts) > 1 else ""
+
+    def _changed_series(self, event: InotifyEvent) -> str | None:
+        if event.mask & IN_Q_OVERFLOW:
+            self.overflowed = True
+            return None
+        if self._excluded(event.path):
+            return None
+        if event.mask & IN_ISDIR:
+            if event.mask & (IN_CREATE | IN_MOVED_TO):
+                # Files moved in together with a directory produce no events of their own
+                self._watch_tree(event.path)
+            elif not event.mask & (IN_DELETE | IN_MOVED_FROM):
+                return None
+            return os.path.relpath(event.path, self.root).split(os.sep)[0]
+        if event.mask & IN_CREATE:
+            # Wait for IN_CLOSE_WRITE; the file is still being written
+            return None
+        if not event.path.lower().endswith(self.extensions):
+            return None
+        return self.series_of(event.path)
+
+    def batches(self, debounce: float) -> Iterator[set[str] | None]:
+        """Yield sets of changed series once no event has arrived for `debounce` seconds.
+
+        A continuous stream of events is flushed after 10 * debounce at the latest.
+        None is yielded when the kernel event queue overflowed and any series
+        may have changed.
+        """
+        while True:
+            changed: set[str] = set()
+            first_event = None
+            while True:
+                if first_event is None:
+                    timeout = None
+                else:
+                    timeout = min(debounce, first_event + debounce * 10 - time.monotonic())
+                events = self.inotify.read(max(timeout, 0) if timeout is not None else None)
+                if not events:
+                    if first_event is not None:
+                        break
+                    continue
+                if first_event is None:
+                    first_event = time.monotonic()
+                for event in events:
+                    series = self._changed_series(event)
+                    if series is not None:
+                        changed.add(series)
+                if self.overflowed:
+                    break
+            if self.overflowed:
+                self.overflowed = False
+                yield None
+            elif changed:
+                yield changed
@@ -0,0 +1,93 @@
+import os
+import time
+
+from chapter_extractor.cache import ProbeCache, file_identity
+from chapter_extractor.models import Chapter
+
+
+def _chapters(path: str) -> list[Chapter]:
+    return [
+        Chapter(start=0.0, end=90.123, duration=90.123, title="Opening", source_file=path),
+        Chapter(start=90.123, end=1440.0, duration=1440.0 - 90.123, title=None, source_file=path),
+    ]
+
+
+def test_round_trip(tmp_path):
+    cache = ProbeCache(str(tmp_path / "cache.sqlite3"))
+    identity = (100, 123456789, 42)
+    cache.put("/lib/a.mkv", identity, _chapters("/lib/a.mkv"))
+
+    hit, chapters = cache.get("/lib/a.mkv", identity)
+
+    assert hit is True
+    assert chapters == _chapters("/lib/a.mkv")
+    cache.close()
+
+
+def test_caches_no_chapters_and_unreadable(tmp_path):
+    cache = ProbeCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("/lib/empty.mkv", (1, 1, 1), [])
+    cache.put("/lib/broken.mkv", (2, 2, 2), None)
+
+    assert cache.get("/lib/empty.mkv", (1, 1, 1)) == (True, [])
+    assert cache.get("/lib/broken.mkv", (2, 2, 2)) == (True, None)
+    cache.close()
+
+
+def test_identity_change_invalidates(tmp_path):
+    cache = ProbeCache(str(tmp_path / "cache.sqlite3"))
+    cache.put("/lib/a.mkv", (100, 1, 42), [])
+
+    assert cache.get("/lib/a.mkv", (101, 1, 42))[0] is False
+    assert cache.get("/lib/a.mkv", (100, 2, 42))[0] is False
+    assert cache.get("/lib/a.mkv", (100, 1, 43))[0] is False
+    assert cache.misses == 3
+    cache.close()
+
+
+def test_persists_across_instances(tmp_path):
+    db = str(tmp_path / "cache.sqlite3")
+    cache = ProbeCache(db)
+    cache.put("/lib/a.mkv", (1, 1, 1), _chapters("/lib/a.mkv"))
+    cache.close()
+
+    reopened = ProbeCache(db)
+    assert reopened.get("/lib/a.mkv", (1, 1, 1))[0] is True
+    reopened.close()
+
+
+def test_evicts_beyond_max_entries(tmp_path):
+    cache = ProbeCache(str(tmp_path / "cache.sqlite3"), max_entries=2)
+    for i in range(4):
+        cache.put(f"/lib/{i}.mkv", (i, i, i), [])
+        time.sleep(0.001)
+
+    assert cache.evict() == 2
+    assert cache.get("/lib/0.mkv", (0, 0, 0))[0] is False
+    assert cache.get("/lib/3.mkv", (3, 3, 3))[0] is True
+    cache.close()
+
+
+def test_evicts_expired_entries(tmp_path):
+    cache = ProbeCache(str(tmp_path / "cache.sqlite3"), max_age_days=0)
+    cache.put("/lib/a.mkv", (1, 1, 1), [])
+
+    assert cache.evict() == 1
+    cache.close()
+
+
+def test_file_identity(tmp_path):
+    path = tmp_path / "a.mkv"
+    path.write_bytes(b"12345")
+    st = os.stat(path)
+
+    assert file_identity(str(path)) == (5, st.st_mtime_ns, st.st_ino)
+    assert file_identity(str(tmp_path / "missing.mkv")) is None
+
+
+def test_rows_share_title_strings():
+    from chapter_extractor.cache import chapters_from_rows
+
+    first = chapters_from_rows([[0.0, 90.0, "".join(["Open", "ing"])]], "/a.mkv")
+    second = chapters_from_rows([[0.0, 90.0, "".join(["Open", "ing"])]], "/b.mkv")
+    assert first[0].title is second[0].title
@@ -1,7 +1,10 @@
 from unittest.mock import patch, MagicMock
+import struct
 import subprocess
 
-from chapter_extractor.chapters import read_chapters
+import pytest
+
+from chapter_extractor.chapters import ProbeUnavailable, read_chapters
 
 
 SAMPLE_SIMPLE_CHAPTERS = """\
@@ -82,21 +85,33 @@ def test_read_chapters_empty_names(mock_run, mock_read_simple):
 
 
 @patch("subprocess.run")
-def test_read_chapters_mkvmerge_fails(mock_run):
+def test_read_chapters_mkvmerge_fails(mock_run, tmp_path):
     mock_run.side_effect = FileNotFoundError("mkvmerge not found")
+    mkv = tmp_path / "file.mkv"
+    mkv.write_bytes(b"not matroska")
 
-    chapters = read_chapters("/fake/file.mkv")
-    assert chapters is None
+    with pytest.raises(ProbeUnavailable):
+        read_chapters(str(mkv))
 
 
 @patch("subprocess.run")
-def test_read_chapters_corrupt_file(mock_run):
+def test_read_chapters_corrupt_file(mock_run, tmp_path):
     mock_run.return_value = MagicMock(returncode=2, stdout="", stderr="Error: file corrupt")
+    mkv = tmp_path / "file.mkv"
+    mkv.write_bytes(b"not matroska")
 
-    chapters = read_chapters("/fake/file.mkv")
+    chapters = read_chapters(str(mkv))
     assert chapters is None
 
 
+@patch("subprocess.run")
+def test_read_chapters_unreadable_file(mock_run):
+    mock_run.return_value = MagicMock(returncode=2, stdout="", stderr="Error: file not found")
+
+    with pytest.raises(ProbeUnavailable):
+        read_chapters("/fake/file.mkv")
+
+
 def test_parse_timestamp():
     from chapter_extractor.chapters import _parse_timestamp
     assert _parse_timestamp("00:00:00.000") == 0.0
@@ -111,3 +126,171 @@ def test_format_timestamp():
     assert format_timestamp(90.0) == "00:01:30.000"
     assert format_timestamp(3600.0) == "01:00:00.000"
     assert format_timestamp(90.5) == "00:01:30.500"
+
+
+def _element(element_id: int, payload: bytes) -> bytes:
+    """Encode an EBML element with an 8-byte size field."""
+    id_bytes = element_id.to_bytes((element_id.bit_length() + 7) // 8, "big")
+    return id_bytes + ((1 << 56) | len(payload)).to_bytes(8, "big") + payload
+
+
+def _uint(element_id: int, value: int) -> bytes:
+    return _element(element_id, value.to_bytes(8, "big"))
+
+
+def _atom(start_ns: int, title: str) -> bytes:
+    display = _element(0x80, _element(0x85, title.encode()))
+    return _element(0xB6, _uint(0x91, start_ns) + display)
+
+
+def _matroska(
+    chapters: list[tuple[int, str]],
+    duration_ms: float,
+    seek_head: bool = True,
+    cues_ms: list[int] | None = None,
+    clusters: int = 1,
+) -> bytes:
+    """Build a minimal Matroska file: EBML header, Segment Info, Chapters, Clusters and optional Cues.
+
+    With seek_head, a SeekHead lists Info and the Chapters and Cues present.
+    """
+    header = _element(0x1A45DFA3, _element(0x4282, b"matroska"))
+    info = _element(0x1549A966, _uint(0x2AD7B1, 1_000_000) + _element(0x4489, struct.pack(">d", duration_ms)))
+    cluster = _element(0x1F43B675, b"\x00" * 64) * clusters
+    atoms = b"".join(_atom(start, title) for start, title in chapters)
+    chapters_el = _element(0x1043A770, _element(0x45B9, atoms)) if chapters else b""
+    cues = b""
+    if cues_ms is not None:
+        cues = _element(0x1C53BB6B, b"".join(_element(0xBB, _uint(0xB3, t)) for t in reversed(cues_ms)))
+
+    def seek(element_id: int, position: int) -> bytes:
+        return _element(0x4DBB, _element(0x53AB, element_id.to_bytes(4, "big")) + _uint(0x53AC, position))
+
+    body = info + chapters_el + cluster + cues
+    if seek_head:
+        targets = [(0x1549A966, 0)]
+        if chapters:
+            targets.append((0x1043A770, len(info)))
+        if cues:
+            targets.append((0x1C53BB6B, len(info) + len(chapters_el) + len(cluster)))
+        # Seek entries have a fixed size, so the SeekHead's length doesn't depend on the positions
+        offset = len(_element(0x114D9B74, b"".join(seek(element_id, 0) for element_id, _ in targets)))
+        body = _element(0x114D9B74, b"".join(seek(element_id, offset + pos) for element_id, pos in targets)) + body
+    return header + _element(0x18538067, body)
+
+
+NATIVE_CHAPTERS = [(0, "Intro"), (90_000_000_000, "Episode"), (1_380_000_000_000, "Ending")]
+
+
+@patch("subprocess.run")
+def test_native_reader_matches_simple_format(mock_run, tmp_path):
+    path = tmp_path / "Show S01E01.mkv"
+    path.write_bytes(_matroska(NATIVE_CHAPTERS, 1_440_000.0))
+
+    chapters = read_chapters(str(path))
+
+    mock_run.assert_not_called()
+    from chapter_extractor.chapters import _parse_simple_format
+    assert chapters == _parse_simple_format(SAMPLE_SIMPLE_CHAPTERS, 1440.0, str(path))
+
+
+@patch("subprocess.run")
+def test_native_reader_without_seek_head(mock_run, tmp_path):
+    path = tmp_path / "Show S01E01.mkv"
+    path.write_bytes(_matroska(NATIVE_CHAPTERS, 1_440_000.0, seek_head=False))
+
+    chapters = read_chapters(str(path))
+
+    mock_run.assert_not_called()
+    assert [c.title for c in chapters] == ["Intro", "Episode", "Ending"]
+    assert chapters[2].end == 1440.0
+
+
+@patch("subprocess.run")
+def test_native_reader_no_chapters(mock_run, tmp_path):
+    path = tmp_path / "movie.mkv"
+    path.write_bytes(_matroska([], 1_440_000.0))
+
+    assert read_chapters(str(path)) == []
+    mock_run.assert_not_called()
+
+
+@patch("subprocess.run")
+def test_native_reader_reads_few_headers_without_chapters(mock_run, tmp_path):
+    """A chapterless file costs a handful of reads, not one per Cluster."""
+    from chapter_extractor import chapters as chapters_module
+
+    path = tmp_path / "movie.mkv"
+    for seek_head in (True, False):
+        path.write_bytes(_matroska([], 1_440_000.0, seek_head=seek_head, clusters=3000))
+        with patch.object(chapters_module, "_read_at", wraps=chapters_module._read_at) as reads:
+            assert read_chapters(str(path)) == []
+        assert reads.call_count < 10
+    mock_run.assert_not_called()
+
+
+@patch("subprocess.run")
+def test_native_reader_millisecond_rounding(mock_run, tmp_path):
+    path = tmp_path / "Show S01E01.mkv"
+    path.write_bytes(_matroska([(0, "A"), (90_123_456_789, "B")], 100_000.0))
+
+    chapters = read_chapters(str(path))
+
+    assert chapters[1].start == 90.123
+    assert chapters[0].duration == 90.123
+
+
+@patch("chapter_extractor.chapters._read_simple_chapters")
+@patch("subprocess.run")
+def test_native_reader_falls_back_to_mkvtoolnix(mock_run, mock_read_simple, tmp_path):
+    path = tmp_path / "Show S01E01.mkv"
+    path.write_bytes(b"not a matroska file")
+    mock_run.return_value = MagicMock(returncode=0, stdout=SAMPLE_MKVMERGE_JSON)
+    mock_read_simple.return_value = SAMPLE_SIMPLE_CHAPTERS
+
+    chapters = read_chapters(str(path))
+
+    mock_run.assert_called_once()
+    assert len(chapters) == 3
+
+
+@patch("subprocess.run")
+def test_native_reader_applies_filter(mock_run, tmp_path):
+    from chapter_extractor.matcher import ChapterFilter
+
+    path = tmp_path / "Show S01E01.mkv"
+    path.write_bytes(_matroska(NATIVE_CHAPTERS, 1_440_000.0))
+
+    chapters = read_chapters(str(path), ChapterFilter(duration_range=(50, 100)))
+    assert [c.title for c in chapters] == ["Intro", "Ending"]
+    chapters = read_chapters(str(path), ChapterFilter(duration_range=(50, 100), chapter_names=True))
+    assert [c.title for c in chapters] == ["Intro", "Ending"]
+    assert read_chapters(str(path), ChapterFilter(duration_range=(2000, 3000))) == []
+    mock_run.assert_not_called()
+
+
+@patch("chapter_extractor.chapters._read_simple_chapters")
+@patch("subprocess.run")
+def test_read_chapters_filter_skips_mkvextract_for_short_files(mock_run, mock_read_simple):
+    from chapter_extractor.matcher import ChapterFilter
+
+    mock_run.return_value = MagicMock(returncode=0, stdout=SAMPLE_MKVMERGE_JSON)
+    mock_read_simple.return_value = SAMPLE_SIMPLE_CHAPTERS
+
+    assert read_chapters("/fake/Show S01E01.mkv", ChapterFilter(duration_range=(1500, 1800))) == []
+    mock_read_simple.assert_not_called()
+
+    chapters = read_chapters("/fake/Show S01E01.mkv", ChapterFilter(chapter_names=True))
+    assert [c.title for c in chapters] == ["Intro", "Ending"]
+    mock_read_simple.assert_called_once()
+
+
+def test_read_keyframes(tmp_path):
+    from chapter_extractor.chapters import read_keyframes
+
+    path = tmp_path / "Show S01E01.mkv"
+    path.write_bytes(_matroska(NATIVE_CHAPTERS, 1_440_000.0, cues_ms=[0, 2_002, 89_923]))
+    assert read_keyframes(str(path)) == [0.0, 2.002, 89.923]
+
+    path.write_bytes(_matroska(NATIVE_CHAPTERS, 1_440_000.0))
+    assert read_keyframes(str(path)) is None
@@ -1,3 +1,5 @@
+import errno
+import os
 import sys
 from unittest.mock import patch
 
@@ -58,7 +60,7 @@ from unittest.mock import patch, MagicMock
 from chapter_extractor.cli import run, parse_args
 
 
-@patch("chapter_extractor.cli.extract_segment")
+@patch("chapter_extractor.extractor.extract_segment")
 @patch("chapter_extractor.cli.read_chapters")
 @patch("chapter_extractor.cli._scan_directory")
 @patch("os.path.isdir", return_value=True)
@@ -70,7 +72,7 @@ def test_pipeline_dry_run(mock_isdir, mock_scan, mock_read, mock_extract, tmp_pa
         f"/fake/Show S01E{i:02d}.mkv" for i in range(1, 11)
     ]
 
-    def make_chapters(path):
+    def make_chapters(path, keep=None):
         return [
             Chapter(start=0.0, end=90.0, duration=90.0, title="Opening",
                     source_file=path),
@@ -94,7 +96,7 @@ def test_pipeline_dry_run(mock_isdir, mock_scan, mock_read, mock_extract, tmp_pa
     mock_extract.assert_not_called()
 
 
-@patch("chapter_extractor.cli.extract_segment")
+@patch("chapter_extractor.extractor.extract_segment")
 @patch("chapter_extractor.cli.read_chapters")
 @patch("chapter_extractor.cli._scan_directory")
 @patch("os.path.isdir", return_value=True)
@@ -106,7 +108,7 @@ def test_pipeline_extract(mock_isdir, mock_scan, mock_read, mock_extract, tmp_pa
         f"/fake/Show S01E{i:02d}.mkv" for i in range(1, 11)
     ]
 
-    def make_chapters(path):
+    def make_chapters(path, keep=None):
         return [
             Chapter(start=0.0, end=90.0, duration=90.0, title="Opening",
                     source_file=path),
@@ -124,3 +126,789 @@ def test_pipeline_extract(mock_isdir, mock_scan, mock_read, mock_extract, tmp_pa
 
     assert result == 0
     assert mock_extract.call_count >= 1
+
+
+def test_parse_args_jobs():
+    args = parse_args(["/in", "/out", "--jobs", "4"])
+    assert args.jobs == 4
+    assert parse_args(["/in", "/out"]).jobs >= 1
+
+
+def test_parse_args_jobs_rejects_zero():
+    with patch("sys.stderr"):
+        try:
+            parse_args(["/in", "/out", "--jobs", "0"])
+            assert False, "Should have raised SystemExit"
+        except SystemExit:
+            pass
+
+
+@patch("chapter_extractor.cli.read_chapters")
+def test_probe_files_preserves_order(mock_read):
+    """Concurrent probing yields results in input order."""
+    import random
+    import time
+    from chapter_extractor.cli import _probe_files
+
+    paths = [f"/fake/Show S01E{i:02d}.mkv" for i in range(1, 21)]
+
+    def slow_read(path, keep=None):
+        time.sleep(random.random() / 100)
+        return [] if path.endswith("E05.mkv") else None
+
+    mock_read.side_effect = slow_read
+
+    results = list(_probe_files(paths, jobs=4))
+
+    assert [path for path, _ in results] == paths
+    assert results[4][1] == []
+    assert results[0][1] is None
+
+
+@patch("chapter_extractor.cli.read_chapters")
+def test_probe_files_uses_cache(mock_read, tmp_path):
+    """A second probe of unchanged files is served from the cache."""
+    from chapter_extractor.cache import ProbeCache
+    from chapter_extractor.cli import _probe_files
+    from chapter_extractor.models import Chapter
+
+    paths = []
+    for i in range(1, 4):
+        path = tmp_path / f"Show S01E{i:02d}.mkv"
+        path.write_bytes(b"x" * i)
+        paths.append(str(path))
+
+    def make_chapters(path, keep=None):
+        return [Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path)]
+
+    mock_read.side_effect = make_chapters
+    cache = ProbeCache(str(tmp_path / "cache.sqlite3"))
+
+    first = list(_probe_files(paths, jobs=2, cache=cache))
+    second = list(_probe_files(paths, jobs=2, cache=cache))
+
+    assert mock_read.call_count == 3
+    assert first == second
+    assert cache.hits == 3
+    cache.close()
+
+
+@patch("chapter_extractor.cli.read_chapters")
+def test_probe_files_does_not_cache_unavailable_probes(mock_read, tmp_path):
+    """A file unreadable because mkvtoolnix is missing is probed again; an unparseable one isn't."""
+    from chapter_extractor.cache import ProbeCache
+    from chapter_extractor.chapters import ProbeUnavailable
+    from chapter_extractor.cli import _probe_files
+
+    missing_tool = tmp_path / "Show S01E01.mkv"
+    corrupt = tmp_path / "Show S01E02.mkv"
+    missing_tool.write_bytes(b"x")
+    corrupt.write_bytes(b"xx")
+    paths = [str(missing_tool), str(corrupt)]
+
+    def read(path, keep=None):
+        if path == str(missing_tool):
+            raise ProbeUnavailable("mkvmerge not found")
+        return None
+
+    mock_read.side_effect = read
+    cache = ProbeCache(str(tmp_path / "cache.sqlite3"))
+
+    for jobs in (1, 2):
+        assert list(_probe_files(paths, jobs=jobs, cache=cache)) == [(paths[0], None), (paths[1], None)]
+
+    assert [call.args[0] for call in mock_read.call_args_list] == [paths[0], paths[1], paths[0]]
+    cache.close()
+
+
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_auto_discovers_duration_ranges(mock_read, tmp_path, capsys):
+    """--auto finds the intro and outro durations and leaves episode bodies alone."""
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    library.mkdir()
+    for i in range(1, 7):
+        (library / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+
+    def make_chapters(path, keep=None):
+        assert keep is None
+        n = int(path[-6:-4])
+        intro, outro, end = 90.0 + n / 10, 1350.0 + n * 5, 1440.0 + n * 5
+        return [
+            Chapter(start=0.0, end=intro, duration=intro, title="Opening", source_file=path),
+            Chapter(start=intro, end=outro, duration=outro - intro, title="Episode", source_file=path),
+            Chapter(start=outro, end=end, duration=end - outro, title="Ending", source_file=path),
+        ]
+
+    mock_read.side_effect = make_chapters
+    args = parse_args([str(library), str(tmp_path / "out"), "--auto", "--dry-run"])
+    assert run(args) == 0
+
+    out = capsys.readouterr().out
+    assert "near the start (6 chapters)" in out
+    assert "near the end (6 chapters)" in out
+    assert "Output: S01E01-S01E06_Opening.mkv" in out
+    assert "Output: S01E01-S01E06_Ending.mkv" in out
+    assert "Episode" not in out
+
+
+def test_parse_args_auto_conflicts():
+    import pytest
+
+    for extra in (["--duration-range", "80-100"], ["--stream"]):
+        with pytest.raises(SystemExit):
+            parse_args(["/in", "/out", "--auto", *extra])
+
+
+def test_parse_filter_profiles():
+    import pytest
+
+    args = parse_args([
+        "/in", "/out", "--min-occurrences", "3",
+        "--filter-profile", "intro:duration=80-100",
+        "--filter-profile", "preview:duration=20-40,names,min-occurrences=2,tolerance=5%",
+    ])
+    assert args.filter_profiles == [
+        ("intro", {"duration_range": (80.0, 100.0)}),
+        ("preview", {"duration_range": (20.0, 40.0), "chapter_names": True, "min_occurrences": 2,
+                     "tolerance_seconds": None, "tolerance_percent": 5.0}),
+    ]
+    from chapter_extractor.cli import _profiles
+    (_, intro), (_, preview) = _profiles(args)
+    assert (intro.min_occurrences, intro.chapter_names, intro.grouping.tolerance_seconds) == (3, False, 2.0)
+    assert (preview.grouping.tolerance_seconds, preview.grouping.tolerance_percent) == (None, 5.0)
+
+    for bad in (["--filter-profile", "x:speed=2"], ["--filter-profile", "../x:names"],
+                ["--filter-profile", "a:names", "--filter-profile", "a:duration=1-2"],
+                ["--filter-profile", "a:names", "--auto"]):
+        with pytest.raises(SystemExit):
+            parse_args(["/in", "/out", *bad])
+
+
+@patch("chapter_extractor.extractor.extract_segments")
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_filter_profiles_share_probes_and_extractions(mock_read, mock_extract, tmp_path, capsys):
+    """Profiles are evaluated over one probe pass and segments found by several are extracted once."""
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    library.mkdir()
+    output = tmp_path / "out"
+    for i in range(1, 6):
+        (library / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+
+    mock_read.side_effect = lambda path, keep=None: [
+        Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path),
+        Chapter(start=90.0, end=1352.0, duration=1262.0, title="Episode", source_file=path),
+        Chapter(start=1352.0, end=1440.0, duration=88.0, title="Ending", source_file=path),
+    ]
+    mock_extract.side_effect = lambda segments: [open(o, "w").write("segment") > 0 for _, o in segments]
+
+    argv = [str(library), str(output), "--filter-profile", "op:duration=89-100",
+            "--filter-profile", "ed:duration=85-89", "--filter-profile", "named:names"]
+    assert run(parse_args(argv)) == 0
+
+    assert mock_read.call_count == 5
+    [(segments,)] = [c.args for c in mock_extract.call_args_list]
+    assert sorted(os.path.relpath(o, output) for _, o in segments) == [
+        os.path.join("ed", "S01E01-S01E05_Ending.mkv"), os.path.join("op", "S01E01-S01E05_Opening.mkv"),
+    ]
+    assert _outputs(output / "named") == ["S01E01-S01E05_Ending.mkv", "S01E01-S01E05_Opening.mkv"]
+    assert (output / "named" / "S01E01-S01E05_Opening.mkv").read_text() == "segment"
+    out = capsys.readouterr().out
+    assert "Detected patterns (op):" in out and "Detected patterns (named):" in out
+    assert "Done. 4 extracted, 0 failed." in out
+
+
+@patch("chapter_extractor.representative.source_info")
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_reports_chosen_representative(mock_read, mock_info, tmp_path, capsys):
+    """--representative cheapest extracts from the smallest file and the summary says so."""
+    from chapter_extractor.models import Chapter
+    from chapter_extractor.representative import SourceInfo
+
+    library = tmp_path / "library"
+    library.mkdir()
+    for i in range(1, 6):
+        (library / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+    mock_read.side_effect = lambda path, keep=None: [
+        Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path),
+    ]
+    mock_info.side_effect = lambda path: SourceInfo(
+        size=1_000 if path.endswith("E04.mkv") else 9_000, duration=1440.0, keyframes=None,
+    )
+
+    args = parse_args([str(library), str(tmp_path / "out"), "--dry-run", "--representative", "cheapest"])
+    assert run(args) == 0
+
+    out = capsys.readouterr().out
+    assert "First occurrence: S01E01 @ 00:00:00.000 - 00:01:30.000" in out
+    assert "Extracted from: S01E04 @ 00:00:00.000 - 00:01:30.000" in out
+
+
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_pushes_filters_into_reads(mock_read, tmp_path, capsys):
+    """Without a cache, reads get the filters and files without matches are skipped."""
+    from chapter_extractor.matcher import ChapterFilter
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    library.mkdir()
+    for i in range(1, 7):
+        (library / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+
+    def make_chapters(path, keep=None):
+        if path.endswith("E06.mkv"):
+            return []
+        return [Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path)]
+
+    mock_read.side_effect = make_chapters
+    argv = [str(library), str(tmp_path / "out"), "--duration-range", "60-120", "--dry-run"]
+    assert run(parse_args(argv)) == 0
+    assert {call.args[1] for call in mock_read.call_args_list} == {ChapterFilter((60.0, 120.0))}
+    out = capsys.readouterr()
+    assert "Scanned 6 files (1 skipped: no matching chapters)" in out.out
+    assert "No chapters in" not in out.err
+
+    mock_read.reset_mock()
+    assert run(parse_args(argv + ["--cache", str(tmp_path / "cache.sqlite3")])) == 0
+    assert all(call.args[1] is None for call in mock_read.call_args_list)
+    assert "1 skipped: no chapters" in capsys.readouterr().out
+
+
+def test_series_key():
+    from chapter_extractor.cli import _series_key
+    assert _series_key("/lib/Show A/Season 1/Show A S01E01.mkv", "/lib") == "Show A"
+    assert _series_key("/lib/Show S01E01.mkv", "/lib") == ""
+
+
+@patch("chapter_extractor.extractor.extract_segment")
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_streaming(mock_read, mock_extract, tmp_path):
+    """Streaming mode groups each series directory and extracts its patterns."""
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    for series, duration in (("Show A", 90.0), ("Show B", 85.0)):
+        season = library / series / "Season 1"
+        season.mkdir(parents=True)
+        for i in range(1, 7):
+            (season / f"{series} S01E{i:02d}.mkv").touch()
+
+    def make_chapters(path, keep=None):
+        duration = 90.0 if "Show A" in path else 85.0
+        return [Chapter(start=0.0, end=duration, duration=duration, title="Opening", source_file=path)]
+
+    mock_read.side_effect = make_chapters
+    mock_extract.return_value = True
+
+    args = parse_args([str(library), str(tmp_path / "out"), "-r", "--stream", "--jobs", "2"])
+    result = run(args)
+
+    assert result == 0
+    assert mock_read.call_count == 12
+    sources = sorted(call.args[0].source_file for call in mock_extract.call_args_list)
+    assert len(sources) == 2
+    assert "Show A S01E01" in sources[0]
+    assert "Show B S01E01" in sources[1]
+    names = sorted(os.path.basename(call.args[1]) for call in mock_extract.call_args_list)
+    assert names == ["S01E01-S01E06_Opening.mkv", "S01E01-S01E06_Opening_1.mkv"]
+
+
+@patch("chapter_extractor.extractor.extract_segment")
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_streaming_no_files(mock_read, mock_extract, tmp_path):
+    args = parse_args([str(tmp_path), str(tmp_path / "out"), "--stream"])
+    assert run(args) == 1
+    mock_read.assert_not_called()
+
+
+def _outputs(directory) -> list[str]:
+    """Output files in directory, without the journal."""
+    return sorted(n for n in os.listdir(directory) if not n.startswith("."))
+
+
+@patch("chapter_extractor.extractor.extract_segment")
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_incremental_state(mock_read, mock_extract, tmp_path):
+    """A re-run after a new episode only probes that file and renames the output."""
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    library.mkdir()
+    output = tmp_path / "out"
+    for i in range(1, 6):
+        (library / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+
+    def make_chapters(path, keep=None):
+        return [Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path)]
+
+    def fake_extract(chapter, output_path):
+        open(output_path, "w").close()
+        return True
+
+    mock_read.side_effect = make_chapters
+    mock_extract.side_effect = fake_extract
+    argv = [str(library), str(output), "--state", str(tmp_path / "state.json")]
+
+    assert run(parse_args(argv)) == 0
+    assert mock_extract.call_count == 1
+    assert _outputs(output) == ["S01E01-S01E05_Opening.mkv"]
+
+    (library / "Show S01E06.mkv").write_bytes(b"x")
+    mock_read.reset_mock()
+    assert run(parse_args(argv)) == 0
+
+    assert [c.args[0] for c in mock_read.call_args_list] == [str(library / "Show S01E06.mkv")]
+    assert mock_extract.call_count == 1
+    assert _outputs(output) == ["S01E01-S01E06_Opening.mkv"]
+
+    mock_read.reset_mock()
+    assert run(parse_args(argv)) == 0
+    mock_read.assert_not_called()
+    assert mock_extract.call_count == 1
+    assert _outputs(output) == ["S01E01-S01E06_Opening.mkv"]
+
+
+@patch("chapter_extractor.extractor.extract_segment")
+@patch("chapter_extractor.extractor.extract_segments")
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_resume_skips_journaled_outputs(mock_read, mock_extract, mock_extract_one, tmp_path, capsys):
+    """--resume keeps journaled outputs under their names, deletes partial files and extracts the rest."""
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    library.mkdir()
+    output = tmp_path / "out"
+    for i in range(1, 6):
+        (library / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+
+    def make_chapters(path, keep=None):
+        return [
+            Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path),
+            Chapter(start=1300.0, end=1390.0, duration=90.0, title="Ending", source_file=path),
+        ]
+
+    def interrupted(segments):
+        # The run died while extracting the ending, leaving its partial file behind
+        for chapter, output_path in segments:
+            if chapter.title == "Opening":
+                open(output_path, "w").write("segment")
+        (output / ".S01E01-S01E05_Ending.part.mkv").write_bytes(b"partial")
+        return [chapter.title == "Opening" for chapter, _ in segments]
+
+    mock_read.side_effect = make_chapters
+    mock_extract.side_effect = interrupted
+    argv = [str(library), str(output)]
+    assert run(parse_args(argv)) == 1
+    capsys.readouterr()
+
+    mock_extract.reset_mock()
+    mock_extract_one.side_effect = lambda chapter, output_path: open(output_path, "w").close() or True
+    assert run(parse_args(argv + ["--resume"])) == 0
+
+    mock_extract.assert_not_called()
+    assert [c.args[0].title for c in mock_extract_one.call_args_list] == ["Ending"]
+    assert _outputs(output) == ["S01E01-S01E05_Ending.mkv", "S01E01-S01E05_Opening.mkv"]
+    assert not (output / ".S01E01-S01E05_Ending.part.mkv").exists()
+    stdout = capsys.readouterr().out
+    assert "Removed partial output: .S01E01-S01E05_Ending.part.mkv" in stdout
+    assert "S01E01-S01E05_Opening.mkv... OK (resumed)" in stdout
+
+
+def test_parse_watch_args():
+    from chapter_extractor.cli import parse_watch_args
+    args = parse_watch_args(["/in", "/out", "--debounce", "2", "--duration-range", "80-100"])
+    assert args.debounce == 2.0
+    assert args.recursive is True
+    assert args.duration_range == (80.0, 100.0)
+    assert args.tolerance_seconds == 2.0
+
+
+@patch("chapter_extractor.extractor.extract_segment")
+@patch("chapter_extractor.cli.read_chapters")
+def test_watch_reprocesses_only_changed_series(mock_read, mock_extract, tmp_path):
+    from chapter_extractor.cli import _run_series, _series_files, parse_watch_args
+    from chapter_extractor.models import Chapter
+    from chapter_extractor.state import RunState
+
+    library = tmp_path / "library"
+    (library / "Show A").mkdir(parents=True)
+    output = tmp_path / "out"
+    output.mkdir()
+    for i in range(1, 6):
+        (library / "Show A" / f"Show A S01E{i:02d}.mkv").write_bytes(b"x")
+
+    def make_chapters(path, keep=None):
+        return [Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path)]
+
+    def fake_extract(chapter, output_path):
+        open(output_path, "w").close()
+        return True
+
+    mock_read.side_effect = make_chapters
+    mock_extract.side_effect = fake_extract
+    args = parse_watch_args([str(library), str(output)])
+    state = RunState(None)
+
+    _run_series(args, "Show A", _series_files(str(library), "Show A"), state)
+    (library / "Show A" / "Show A S01E06.mkv").write_bytes(b"x")
+    mock_read.reset_mock()
+    _run_series(args, "Show A", _series_files(str(library), "Show A"), state)
+
+    assert mock_read.call_count == 1
+    assert mock_extract.call_count == 1
+    assert os.listdir(output) == ["S01E01-S01E06_Opening.mkv"]
+
+
+@patch("chapter_extractor.cli.Inotify", side_effect=OSError(errno.ENOSPC, "No space left on device"))
+def test_watch_reports_exhausted_inotify_watches(mock_inotify, tmp_path, capsys):
+    from chapter_extractor.cli import parse_watch_args, run_watch
+
+    assert run_watch(parse_watch_args([str(tmp_path), str(tmp_path / "out")])) == 1
+    assert "fs.inotify.max_user_watches" in capsys.readouterr().err
+
+
+@patch("chapter_extractor.cli.LibraryWatcher")
+@patch("chapter_extractor.cli.Inotify")
+@patch("chapter_extractor.extractor.extract_segment", return_value=True)
+@patch("chapter_extractor.cli.read_chapters")
+def test_watch_skips_output_dir_inside_library(mock_read, mock_extract, mock_inotify, mock_watcher, tmp_path):
+    """Outputs written below the library are neither watched nor probed as episodes."""
+    from chapter_extractor.cli import parse_watch_args, run_watch
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    (library / "Show A").mkdir(parents=True)
+    output = library / "extracted"
+    output.mkdir()
+    for i in range(1, 6):
+        (library / "Show A" / f"Show A S01E{i:02d}.mkv").write_bytes(b"x")
+    (output / "S01E01-S01E05_Opening.mkv").write_bytes(b"x")
+
+    mock_read.side_effect = lambda path, keep=None: [
+        Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path)
+    ]
+    mock_watcher.return_value.batches.side_effect = KeyboardInterrupt
+
+    assert run_watch(parse_watch_args([str(library), str(output)])) == 0
+    assert all("extracted" not in call.args[0] for call in mock_read.call_args_list)
+    assert mock_read.call_count == 5
+    assert mock_watcher.call_args.args[4] == [str(output)]
+
+
+def test_parse_args_scan_options():
+    args = parse_args(["/in", "/out", "--extensions", "MKV,.mka", "--exclude", "Samples", "--include", "*S01*"])
+    assert args.extensions == (".mkv", ".mka")
+    assert args.exclude == ["Samples"]
+    assert args.include == ["*S01*"]
+
+
+@patch("chapter_extractor.extractor.extract_segment")
+@patch("chapter_extractor.cli.read_chapters")
+@patch("chapter_extractor.cli._scan_directory")
+@patch("os.path.isdir", return_value=True)
+def test_pipeline_vectorized_matches_default(mock_isdir, mock_scan, mock_read, mock_extract, tmp_path, capsys):
+    import pytest
+    pytest.importorskip("numpy")
+    from chapter_extractor.models import Chapter
+
+    mock_scan.return_value = [f"/fake/Show S01E{i:02d}.mkv" for i in range(1, 11)]
+    mock_read.side_effect = lambda path, keep=None: [
+        Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path),
+        Chapter(start=90.0, end=1200.0, duration=1110.0, title="Episode", source_file=path),
+        Chapter(start=1200.0, end=1290.5, duration=90.5, title="Ending", source_file=path),
+    ]
+
+    argv = ["/fake/input", str(tmp_path), "--duration-range", "60-120", "--dry-run"]
+    assert run(parse_args(argv)) == 0
+    expected = capsys.readouterr().out
+    assert run(parse_args(argv + ["--vectorized"])) == 0
+    assert capsys.readouterr().out == expected
+
+
+@patch("chapter_extractor.cli.group_clusters", return_value=[])
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_streaming_honors_vectorized(mock_read, mock_group, tmp_path):
+    import pytest
+    pytest.importorskip("numpy")
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    (library / "Show").mkdir(parents=True)
+    for i in range(1, 4):
+        (library / "Show" / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+    mock_read.side_effect = lambda path, keep=None: [
+        Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path),
+    ]
+
+    run(parse_args([str(library), str(tmp_path / "out"), "-r", "--stream", "--vectorized", "--dry-run"]))
+
+    mock_group.assert_called_once()
+    assert mock_group.call_args.args[3] is True
+
+
+def test_parse_args_grouping_tolerances():
+    args = parse_args(["/in", "/out"])
+    assert args.start_window == 120.0
+    assert args.max_episode_gap == 3
+    args = parse_args(["/in", "/out", "--start-window", "30", "--max-episode-gap", "1"])
+    assert args.start_window == 30.0
+    assert args.max_episode_gap == 1
+
+
+@patch("chapter_extractor.extractor.extract_segment")
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_segment_store_links_repeated_segments(mock_read, mock_extract, tmp_path, capsys):
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    library.mkdir()
+    for i in range(1, 6):
+        (library / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+    mock_read.side_effect = lambda path, keep=None: [
+        Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path),
+    ]
+
+    def fake_extract(chapter, output_path):
+        with open(output_path, "wb") as f:
+            f.write(b"segment")
+        return True
+
+    mock_extract.side_effect = fake_extract
+    store = str(tmp_path / "segments.sqlite3")
+
+    assert run(parse_args([str(library), str(tmp_path / "out1"), "--segment-store", store])) == 0
+    assert mock_extract.call_count == 1
+    capsys.readouterr()
+
+    assert run(parse_args([str(library), str(tmp_path / "out2"), "--segment-store", store])) == 0
+    assert mock_extract.call_count == 1
+    out = capsys.readouterr().out
+    assert "OK (linked)" in out
+    assert "Segment store: 1 linked instead of extracted" in out
+    assert (tmp_path / "out2" / "S01E01-S01E05_Opening.mkv").read_bytes() == b"segment"
+
+
+@patch("chapter_extractor.cli.read_chapters")
+def test_sharded_probe_and_merge_match_single_run(mock_read, tmp_path, capsys):
+    from chapter_extractor.cli import main
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    for show in ("Show A", "Show B", "Show C", "Show D"):
+        (library / show).mkdir(parents=True)
+        for i in range(1, 7):
+            (library / show / f"{show} S01E{i:02d}.mkv").write_bytes(b"x")
+    (library / "Show B" / "Bonus.mkv").write_bytes(b"x")
+    offsets = {"Show A": 0.0, "Show B": 5.0, "Show C": 10.0, "Show D": 15.0}
+    mock_read.side_effect = lambda path, keep=None: [
+        Chapter(start=0.0, end=85.0 + offsets[os.path.basename(os.path.dirname(path))], duration=85.0
+                + offsets[os.path.basename(os.path.dirname(path))], title="Opening", source_file=path),
+    ]
+    out = str(tmp_path / "out")
+    common = [str(library), out, "-r", "--dry-run"]
+
+    assert run(parse_args(common)) == 0
+    single = capsys.readouterr().out
+
+    shard_files = []
+    for i in (1, 2, 3):
+        shard_file = str(tmp_path / f"shard{i}.json")
+        assert run(parse_args(common + ["--shard", f"{i}/3", "--shard-output", shard_file])) == 0
+        shard_files.append(shard_file)
+    capsys.readouterr()
+
+    import pytest
+    with pytest.raises(SystemExit) as exit_info:
+        main(["merge", str(library), out, *shard_files, "--dry-run"])
+    assert exit_info.value.code == 0
+    assert capsys.readouterr().out == single
+    assert mock_read.call_count == 2 * 25
+
+
+def test_parse_args_shard():
+    args = parse_args(["/in", "/out", "--shard", "2/4"])
+    assert args.shard == (2, 4)
+    assert args.shard_output == os.path.join("/out", "chapters-shard-2-of-4.json")
+    with patch("sys.stderr"):
+        for bad in ("0/4", "5/4", "x"):
+            try:
+                parse_args(["/in", "/out", "--shard", bad])
+            except SystemExit:
+                pass
+            else:
+                raise AssertionError(f"--shard {bad} accepted")
+
+
+@patch("chapter_extractor.extractor.extract_segment", return_value=True)
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_timings_and_profile(mock_read, mock_extract, tmp_path, capsys):
+    import json
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    library.mkdir()
+    for i in range(1, 6):
+        (library / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+    mock_read.side_effect = lambda path, keep=None: [
+        Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path),
+    ]
+    timings_file = tmp_path / "timings.json"
+    profile_file = tmp_path / "run.prof"
+
+    args = parse_args([
+        str(library), str(tmp_path / "out"), "--duration-range", "60-120",
+        "--timings", "--timings-json", str(timings_file), "--profile", str(profile_file),
+    ])
+    assert run(args) == 0
+
+    assert "Timings (wall" in capsys.readouterr().err
+    data = json.loads(timings_file.read_text())
+    assert {"scan", "probe", "filter", "group", "build", "extract"} <= set(data["stages"])
+    assert len(data["slowest_files"]) == 5
+    assert profile_file.stat().st_size > 0
+    assert "allocation sites" in (tmp_path / "run.prof.allocations.txt").read_text()
+
+
+@patch("chapter_extractor.extractor.extract_segments", side_effect=lambda segments: [True] * len(segments))
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_metrics_file(mock_read, mock_extract, tmp_path):
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    library.mkdir()
+    for i in range(1, 7):
+        (library / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+    (library / "Bonus.mkv").write_bytes(b"x")
+    mock_read.side_effect = lambda path, keep=None: [
+        Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path),
+        Chapter(start=90.0, end=1300.0, duration=1210.0, title="Episode", source_file=path),
+    ]
+    metrics_file = tmp_path / "chapters.prom"
+
+    args = parse_args([
+        str(library), str(tmp_path / "out"), "--min-occurrences", "5", "--metrics-file", str(metrics_file),
+    ])
+    assert run(args) == 0
+
+    label = f'library="{library}"'
+    lines = metrics_file.read_text().splitlines()
+    assert f"chapter_extractor_files_scanned{{{label}}} 7" in lines
+    assert f'chapter_extractor_files_skipped{{{label},reason="no_episode"}} 1' in lines
+    assert f"chapter_extractor_chapters_read{{{label}}} 12" in lines
+    assert f'chapter_extractor_clusters{{{label},step="duration"}} 2' in lines
+    assert f'chapter_extractor_clusters{{{label},step="min_occurrences"}} 2' in lines
+    assert f"chapter_extractor_patterns{{{label}}} 2" in lines
+    assert f'chapter_extractor_extractions{{{label},result="success"}} 2' in lines
+    assert f"chapter_extractor_run_exit_code{{{label}}} 0" in lines
+    assert any('stage="extract"' in line for line in lines)
+
+
+@patch("chapter_extractor.extractor.extract_segments", side_effect=lambda segments: [True] * len(segments))
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_ndjson_output(mock_read, mock_extract, tmp_path, capsys):
+    import json
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    (library / "Show").mkdir(parents=True)
+    for i in range(1, 6):
+        (library / "Show" / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+    (library / "Show" / "Bonus.mkv").write_bytes(b"x")
+    mock_read.side_effect = lambda path, keep=None: [
+        Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path),
+        Chapter(start=90.0, end=1300.0, duration=1210.0, title="Episode", source_file=path),
+    ]
+
+    for extra in ([], ["--stream"]):
+        args = parse_args([str(library), str(tmp_path / "out"), "-r", "--output-format", "ndjson", *extra])
+        assert run(args) == 0
+        captured = capsys.readouterr()
+        records = [json.loads(line) for line in captured.out.splitlines()]
+        types = [r["type"] for r in records]
+        assert types == ["file"] * 6 + ["pattern"] * 2 + ["extraction"] * 2 + ["summary"]
+        assert {r["path"]: r["skipped"] for r in records[:6]}[str(library / "Show" / "Bonus.mkv")] == "no episode tag"
+        assert records[6]["episode_range"] == "S01E01-S01E05"
+        assert len(records[6]["chapters"]) == 5
+        assert {r["status"] for r in records[8:10]} == {"extracted"}
+        assert records[-1]["extracted"] == 2 and records[-1]["failed"] == 0
+        assert "Detected patterns" in captured.err
+
+
+@patch("chapter_extractor.cli.read_chapters")
+def test_pipeline_ndjson_summary_on_early_exit(mock_read, tmp_path, capsys):
+    """A run that finds nothing to extract still ends with a summary record."""
+    import json
+    from chapter_extractor.models import Chapter
+
+    library = tmp_path / "library"
+    (library / "Show").mkdir(parents=True)
+    for i in range(1, 4):
+        (library / "Show" / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+    mock_read.side_effect = lambda path, keep=None: [
+        Chapter(start=0.0, end=1300.0, duration=1300.0, title="Episode", source_file=path),
+    ]
+
+    for extra in ([], ["--stream"]):
+        argv = [str(library), str(tmp_path / "out"), "-r", "--output-format", "ndjson", "--duration-range", "80-100"]
+        assert run(parse_args([*argv, *extra])) == 1
+        captured = capsys.readouterr()
+        records = [json.loads(line) for line in captured.out.splitlines()]
+        assert [r["type"] for r in records] == ["file"] * 3 + ["summary"]
+        assert records[-1]["files"] == 3 and records[-1]["patterns"] == 0
+        assert records[-1]["extracted"] is None
+        assert "No chapters match the specified filters." in captured.err
+
+
+def test_parse_serve_args():
+    from chapter_extractor.cli import parse_serve_args
+
+    args = parse_serve_args(["/run/chapters.sock", "--jobs", "4"])
+    assert args.socket == "/run/chapters.sock"
+    assert args.jobs == 4
+    assert args.per_device == 1
+    assert args.per_output_device is None
+
+
+# Modules the CLI must not import before it needs them (a tiny run pays for them otherwise)
+_LAZY_MODULES = (
+    "concurrent.futures", "ctypes", "hashlib", "json", "logging", "pathlib",
+    "queue", "socketserver", "sqlite3", "subprocess", "tempfile",
+)
+# Generous ceiling for importing chapter_extractor.cli with warm bytecode (~50ms locally)
+_STARTUP_BUDGET_US = 150_000
+
+
+def _import_times(args: list[str], pycache: str) -> dict[str, int]:
+    """Cumulative -X importtime microseconds per module of `python -m chapter_extractor args`."""
+    import subprocess
+
+    import chapter_extractor
+
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    env["PYTHONPYCACHEPREFIX"] = pycache
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(chapter_extractor.__file__))
+    command = [sys.executable, "-X", "importtime", "-m", "chapter_extractor", *args]
+    subprocess.run(command, env=env, capture_output=True)  # warm the bytecode cache
+    result = subprocess.run(command, env=env, capture_output=True, text=True)
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _self, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+def test_startup_budget(tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    for args in (["--help"], [str(library), str(tmp_path / "out"), "--dry-run"]):
+        times = _import_times(args, str(tmp_path / "pycache"))
+        assert "chapter_extractor.cli" in times
+        assert sorted(m for m in _LAZY_MODULES if m in times) == [], args
+        assert times["chapter_extractor.cli"] < _STARTUP_BUDGET_US, args
@@ -0,0 +1,53 @@
+from chapter_extractor.discovery import DurationHistogram, DurationPeak, chapter_position, merge_ranges
+from chapter_extractor.models import Chapter
+
+
+def _episode(path: str, intro: float, outro: float, length: float = 1440.0) -> list[Chapter]:
+    body_end = length - outro
+    return [
+        Chapter(start=0.0, end=intro, duration=intro, title="Opening", source_file=path),
+        Chapter(start=intro, end=body_end, duration=body_end - intro, title="Episode", source_file=path),
+        Chapter(start=body_end, end=length, duration=outro, title="Ending", source_file=path),
+    ]
+
+
+def test_chapter_position():
+    chapters = _episode("e01.mkv", 90.0, 85.0)
+    assert [chapter_position(c, 1440.0) for c in chapters] == ["start", None, "end"]
+
+
+def test_add_file_keeps_chapters_near_the_ends():
+    histogram = DurationHistogram()
+    kept = histogram.add_file(_episode("e01.mkv", 90.0, 85.0))
+    assert [c.title for c in kept] == ["Opening", "Ending"]
+    assert histogram.add_file([]) == []
+
+
+def test_peaks_find_recurring_durations():
+    histogram = DurationHistogram()
+    for i, (intro, outro) in enumerate([(89.6, 85.1), (90.2, 84.9), (90.4, 85.0), (89.9, 85.3), (90.1, 84.7)]):
+        histogram.add_file(_episode(f"e{i}.mkv", intro, outro, length=1400.0 + i * 20))
+    # A one-off cold open doesn't recur
+    histogram.add_file(_episode("special.mkv", 240.0, 85.0))
+
+    peaks = histogram.peaks(min_count=5)
+
+    assert [(p.position, p.chapters) for p in peaks] == [("start", 5), ("end", 6)]
+    assert peaks[0].low <= 89.6 and peaks[0].high >= 90.4
+    assert peaks[1].low <= 84.7 and peaks[1].high >= 85.3
+
+
+def test_peaks_below_min_count_are_dropped():
+    histogram = DurationHistogram()
+    for i in range(3):
+        histogram.add_file(_episode(f"e{i}.mkv", 90.0, 85.0))
+    assert histogram.peaks(min_count=5) == []
+
+
+def test_merge_ranges():
+    peaks = [
+        DurationPeak(84.0, 87.0, "end", 6),
+        DurationPeak(86.0, 92.0, "start", 5),
+        DurationPeak(20.0, 22.0, "end", 5),
+    ]
+    assert merge_ranges(peaks) == [(20.0, 22.0), (84.0, 92.0)]
@@ -1,3 +1,4 @@
+import os
 from unittest.mock import patch, MagicMock, call
 
 from chapter_extractor.models import Chapter, EpisodeInfo
@@ -12,12 +13,18 @@ def _ch(start: float, end: float) -> Chapter:
     )
 
 
+def _fake_mkvmerge(cmd, **kwargs):
+    with open(cmd[cmd.index("-o") + 1], "w") as f:
+        f.write("segment")
+    return MagicMock(returncode=0)
+
+
 @patch("subprocess.run")
-def test_extract_segment_basic(mock_run):
-    mock_run.return_value = MagicMock(returncode=0)
+def test_extract_segment_basic(mock_run, tmp_path):
+    mock_run.side_effect = _fake_mkvmerge
     chapter = _ch(90.0, 180.0)
 
-    result = extract_segment(chapter, "/tmp/out/S01E01-S01E12_Opening.mkv")
+    result = extract_segment(chapter, str(tmp_path / "S01E01-S01E12_Opening.mkv"))
 
     assert result is True
     mock_run.assert_called_once()
@@ -26,6 +33,36 @@ def test_extract_segment_basic(mock_run):
     assert "--split" in cmd
     assert "parts:00:01:30.000-00:03:00.000" in cmd
     assert "-o" in cmd
+    assert os.listdir(tmp_path) == ["S01E01-S01E12_Opening.mkv"]
+
+
+@patch("subprocess.run")
+def test_extract_segment_writes_partial_file_first(mock_run, tmp_path):
+    output = tmp_path / "out.mkv"
+
+    def crash(cmd, **kwargs):
+        _fake_mkvmerge(cmd)
+        assert not output.exists()
+        return MagicMock(returncode=2, stderr="Error")
+
+    mock_run.side_effect = crash
+    assert extract_segment(_ch(0.0, 90.0), str(output)) is False
+    assert os.listdir(tmp_path) == []
+
+
+def test_remove_partial_outputs(tmp_path):
+    from chapter_extractor.extractor import partial_output_path, remove_partial_outputs
+
+    for name in ("done.mkv", ".x.batch-001.mkv", ".batch-42-3-002.mkv", ".x.link-tmp", ".notes.txt"):
+        (tmp_path / name).write_text("x")
+    open(partial_output_path(str(tmp_path / "y.mkv")), "w").close()
+
+    removed = remove_partial_outputs(str(tmp_path))
+
+    assert sorted(os.path.basename(p) for p in removed) == [
+        ".batch-42-3-002.mkv", ".x.batch-001.mkv", ".x.link-tmp", ".y.part.mkv",
+    ]
+    assert sorted(os.listdir(tmp_path)) == [".notes.txt", "done.mkv"]
 
 
 @patch("subprocess.run")
@@ -46,3 +83,208 @@ def test_extract_segment_creates_output_dir(mock_run):
     with patch("os.makedirs") as mock_makedirs:
         extract_segment(chapter, "/tmp/new_dir/out.mkv")
         mock_makedirs.assert_called_once_with("/tmp/new_dir", exist_ok=True)
+
+
+import threading
+import time
+
+from chapter_extractor.extractor import DeviceScheduler, OutputDevice
+
+
+def test_scheduler_limits_jobs_per_device():
+    scheduler = DeviceScheduler(workers=4, per_device=1)
+    lock = threading.Lock()
+    active: dict[str, int] = {}
+    peak: dict[str, int] = {}
+    results = []
+
+    def job(device: str):
+        def run():
+            with lock:
+                active[device] = active.get(device, 0) + 1
+                peak[device] = max(peak.get(device, 0), active[device])
+            time.sleep(0.01)
+            with lock:
+                active[device] -= 1
+            return device
+        return run
+
+    for device in ["a", "a", "b", "b", "c", "a"]:
+        scheduler.submit(job(device), {device}, results.append)
+    scheduler.join()
+
+    assert sorted(results) == ["a", "a", "a", "b", "b", "c"]
+    assert peak == {"a": 1, "b": 1, "c": 1}
+
+
+def test_scheduler_runs_different_devices_concurrently():
+    scheduler = DeviceScheduler(workers=2, per_device=1)
+    barrier = threading.Barrier(2, timeout=5)
+    results = []
+
+    # Both jobs only finish if they run at the same time
+    for device in ["a", "b"]:
+        scheduler.submit(lambda: barrier.wait() is not None, {device}, results.append)
+    scheduler.join()
+
+    assert results == [True, True]
+
+
+def test_scheduler_job_holds_source_and_output_device():
+    scheduler = DeviceScheduler(workers=4, per_device=1)
+    order = []
+    lock = threading.Lock()
+
+    def job(name: str):
+        def run():
+            with lock:
+                order.append(("start", name))
+            time.sleep(0.02)
+            with lock:
+                order.append(("end", name))
+        return run
+
+    scheduler.submit(job("a->b"), {"a", "b"}, lambda _: None)
+    scheduler.submit(job("c->b"), {"c", "b"}, lambda _: None)
+    scheduler.join()
+
+    assert order.index(("end", "a->b")) < order.index(("start", "c->b"))
+
+
+def test_scheduler_default_output_limit_runs_distinct_sources_concurrently():
+    """With the default limits, a shared output device doesn't serialize jobs reading from different sources."""
+    scheduler = DeviceScheduler(workers=2, per_device=1)
+    barrier = threading.Barrier(2, timeout=5)
+    results = []
+
+    for source in ["a", "b"]:
+        scheduler.submit(lambda: barrier.wait() is not None, {source, OutputDevice("out")}, results.append)
+    scheduler.join()
+
+    assert results == [True, True]
+
+
+def test_scheduler_limits_jobs_per_output_device():
+    scheduler = DeviceScheduler(workers=4, per_device=1, per_output_device=1)
+    lock = threading.Lock()
+    active = peak = 0
+
+    def run():
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        time.sleep(0.01)
+        with lock:
+            active -= 1
+
+    for source in ["a", "b", "c"]:
+        scheduler.submit(run, {source, OutputDevice("out")}, lambda _: None)
+    scheduler.join()
+
+    assert peak == 1
+
+
+def test_scheduler_reraises_job_errors():
+    scheduler = DeviceScheduler(workers=1, per_device=1)
+
+    def fail():
+        raise RuntimeError("boom")
+
+    scheduler.submit(fail, {"a"}, lambda _: None)
+    try:
+        scheduler.join()
+        assert False, "Should have raised RuntimeError"
+    except RuntimeError:
+        pass
+
+
+from chapter_extractor.extractor import extract_segments
+
+
+def _fake_mkvmerge_split(cmd, **kwargs):
+    """Write one numbered file per range, like mkvmerge --split parts: with a %03d template."""
+    template = cmd[cmd.index("-o") + 1]
+    ranges = cmd[cmd.index("--split") + 1].removeprefix("parts:").split(",")
+    for i in range(len(ranges)):
+        with open(template % (i + 1) if "%" in template else template, "w") as f:
+            f.write(ranges[i])
+    return MagicMock(returncode=0)
+
+
+@patch("subprocess.run")
+def test_extract_segments_single_pass(mock_run, tmp_path):
+    mock_run.side_effect = _fake_mkvmerge_split
+    outro = _ch(1300.0, 1390.0)
+    intro = _ch(0.0, 90.0)
+    segments = [(outro, str(tmp_path / "outro.mkv")), (intro, str(tmp_path / "intro.mkv"))]
+
+    result = extract_segments(segments)
+
+    assert result == [True, True]
+    mock_run.assert_called_once()
+    cmd = mock_run.call_args[0][0]
+    assert "parts:00:00:00.000-00:01:30.000,00:21:40.000-00:23:10.000" in cmd
+    assert (tmp_path / "intro.mkv").read_text() == "00:00:00.000-00:01:30.000"
+    assert (tmp_path / "outro.mkv").read_text() == "00:21:40.000-00:23:10.000"
+    assert sorted(os.listdir(tmp_path)) == ["intro.mkv", "outro.mkv"]
+
+
+@patch("subprocess.run")
+def test_extract_segments_overlapping_ranges_use_separate_passes(mock_run, tmp_path):
+    mock_run.side_effect = _fake_mkvmerge_split
+    segments = [
+        (_ch(0.0, 90.0), str(tmp_path / "a.mkv")),
+        (_ch(60.0, 150.0), str(tmp_path / "b.mkv")),
+        (_ch(200.0, 290.0), str(tmp_path / "c.mkv")),
+    ]
+
+    result = extract_segments(segments)
+
+    assert result == [True, True, True]
+    assert mock_run.call_count == 2
+
+
+@patch("subprocess.run")
+def test_extract_segments_failure_cleans_up(mock_run, tmp_path):
+    def fail(cmd, **kwargs):
+        _fake_mkvmerge_split(cmd)
+        return MagicMock(returncode=2, stderr="Error")
+
+    mock_run.side_effect = fail
+    segments = [(_ch(0.0, 90.0), str(tmp_path / "a.mkv")), (_ch(100.0, 190.0), str(tmp_path / "b.mkv"))]
+
+    assert extract_segments(segments) == [False, False]
+    assert os.listdir(tmp_path) == []
+
+
+@patch("subprocess.run")
+def test_extract_segments_title_with_percent(mock_run, tmp_path):
+    mock_run.side_effect = _fake_mkvmerge_split
+    segments = [
+        (_ch(0.0, 90.0), str(tmp_path / "S01E01-S01E12_100% Intro.mkv")),
+        (_ch(1300.0, 1390.0), str(tmp_path / "S01E01-S01E12_100% Outro.mkv")),
+    ]
+
+    assert extract_segments(segments) == [True, True]
+    assert "%" not in os.path.basename(mock_run.call_args[0][0][2]).replace("%03d", "")
+    assert sorted(os.listdir(tmp_path)) == ["S01E01-S01E12_100% Intro.mkv", "S01E01-S01E12_100% Outro.mkv"]
+
+
+@patch("chapter_extractor.extractor.extract_segment", side_effect=OSError(28, "No space left on device"))
+def test_submit_extraction_reports_job_errors_as_failed(mock_extract, tmp_path, capsys):
+    from chapter_extractor.extractor import DeviceScheduler, submit_extraction
+    from chapter_extractor.models import ChapterPattern
+
+    chapter = _ch(0.0, 90.0)
+    pattern = ChapterPattern(
+        chapters=[chapter], avg_duration=90.0, episode_range="S01E01",
+        first_occurrence=chapter, output_name=str(tmp_path / "Opening.mkv"),
+    )
+    reports = []
+    scheduler = DeviceScheduler(workers=1, per_device=1)
+    submit_extraction(scheduler, [pattern], lambda p, ok, how: reports.append((p, ok, how)))
+    scheduler.join()
+
+    assert reports == [(pattern, False, "extracted")]
+    assert "No space left on device" in capsys.readouterr().err
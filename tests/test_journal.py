@@ -0,0 +1,61 @@
+from chapter_extractor.journal import JOURNAL_NAME, Journal
+from chapter_extractor.models import Chapter
+
+
+def _chapter(start: float = 0.0) -> Chapter:
+    return Chapter(start=start, end=start + 90.0, duration=90.0, title="Opening", source_file="/lib/S01E01.mkv")
+
+
+def _write(path, data: bytes = b"segment") -> str:
+    path.write_bytes(data)
+    return str(path)
+
+
+def test_resume_keeps_logged_outputs(tmp_path):
+    output = _write(tmp_path / "Opening.mkv")
+    journal = Journal(str(tmp_path))
+    journal.add(_chapter(), output)
+    journal.close()
+
+    resumed = Journal(str(tmp_path), resume=True)
+    assert resumed.completed(_chapter(), output)
+    assert not resumed.completed(_chapter(start=5.0), output)
+    assert resumed.outputs() == {output}
+    resumed.close()
+
+
+def test_resume_drops_changed_outputs_and_torn_lines(tmp_path):
+    output = _write(tmp_path / "Opening.mkv")
+    journal = Journal(str(tmp_path))
+    journal.add(_chapter(), output)
+    journal.close()
+    with open(tmp_path / JOURNAL_NAME, "a") as f:
+        f.write('{"source": "/lib/S01E02.mkv", "sta')
+    _write(tmp_path / "Opening.mkv", b"truncated")
+
+    resumed = Journal(str(tmp_path), resume=True)
+    assert not resumed.completed(_chapter(), output)
+    assert resumed.outputs() == set()
+    resumed.close()
+
+
+def test_fresh_run_starts_empty_journal(tmp_path):
+    first = _write(tmp_path / "Opening.mkv")
+    journal = Journal(str(tmp_path))
+    journal.add(_chapter(), first)
+    journal.close()
+
+    second = _write(tmp_path / "Ending.mkv")
+    journal = Journal(str(tmp_path))
+    assert not journal.completed(_chapter(), first)
+    journal.add(_chapter(start=1300.0), second)
+    journal.close()
+
+    resumed = Journal(str(tmp_path), resume=True)
+    assert resumed.outputs() == {second}
+    resumed.close()
+
+
+def test_nothing_written_without_add(tmp_path):
+    Journal(str(tmp_path / "out")).close()
+    assert not (tmp_path / "out").exists()
@@ -71,6 +71,21 @@ def test_filter_chapter_name_case_insensitive():
     assert len(result) == 3
 
 
+def test_chapter_filter_agrees_with_filter_chapters():
+    from chapter_extractor.matcher import ChapterFilter
+
+    chapters = [_ch(60, "Opening"), _ch(90, "Opening"), _ch(90, "Episode"), _ch(90, None), _ch(300, "STOP")]
+    for duration_range in (None, (60, 120)):
+        for chapter_names in (False, True):
+            keep = ChapterFilter(duration_range, chapter_names)
+            assert keep.active == (duration_range is not None or chapter_names)
+            expected = filter_chapters(chapters, duration_range, chapter_names)
+            assert [c for c in chapters if keep.accepts(c.duration, c.title)] == expected
+    assert ChapterFilter((60, 120)).possible(60.0)
+    assert not ChapterFilter((60, 120)).possible(59.9)
+    assert ChapterFilter(chapter_names=True).possible(1.0)
+
+
 from chapter_extractor.matcher import cluster_by_duration
 
 
@@ -237,3 +252,65 @@ def test_split_dupes_no_episode_info():
 def test_split_dupes_empty():
     result = split_duplicate_episodes([])
     assert result == []
+
+
+import random
+
+from chapter_extractor.matcher import GroupingConfig, group_chapters
+
+
+def _cascade(chapters, config):
+    clusters = cluster_by_duration(chapters, config.tolerance_seconds, config.tolerance_percent)
+    clusters = [s for c in clusters for s in split_duplicate_episodes(c, config.start_window)]
+    if config.max_episode_gap is not None:
+        clusters = [r for c in clusters for r in split_by_contiguity(c, config.max_episode_gap)]
+    return clusters
+
+
+def test_group_chapters_matches_cascade():
+    rng = random.Random(7)
+    chapters = [
+        _ch(rng.choice([89.0, 90.0, 91.5, 300.0]), rng.choice(["Opening", "Ending", None]),
+            season=rng.randint(1, 2), episode=rng.randint(1, 20), start=rng.choice([0.0, 90.0, 1200.0]))
+        for _ in range(400)
+    ]
+    for config in [GroupingConfig(), GroupingConfig(start_window=60.0, max_episode_gap=1),
+                   GroupingConfig(tolerance_seconds=None, tolerance_percent=2.0, max_episode_gap=None)]:
+        assert group_chapters(chapters, config) == _cascade(chapters, config)
+
+
+def test_group_chapters_start_window():
+    chapters = [_ch(90, None, episode=e, start=s) for e in (1, 2) for s in (0.0, 100.0)]
+    assert [len(g) for g in group_chapters(chapters, GroupingConfig(start_window=120.0))] == [4]
+    assert [len(g) for g in group_chapters(chapters, GroupingConfig(start_window=50.0))] == [2, 2]
+
+
+def test_group_chapters_max_episode_gap():
+    chapters = [_ch(90, "OP", episode=e) for e in (1, 2, 5, 6)]
+    assert [len(g) for g in group_chapters(chapters)] == [4]
+    assert [len(g) for g in group_chapters(chapters, GroupingConfig(max_episode_gap=2))] == [2, 2]
+    assert [len(g) for g in group_chapters(chapters, GroupingConfig(max_episode_gap=None))] == [4]
+
+
+def test_group_chapters_normalizes_titles():
+    """Titles differing only in case/whitespace count as the same title."""
+    chapters = [
+        _ch(90, "Opening", episode=1, start=0), _ch(90, " opening", episode=1, start=1200),
+        _ch(90, "Opening", episode=2, start=0), _ch(90, "OPENING", episode=2, start=1200),
+    ]
+    groups = group_chapters(chapters)
+    assert [[c.start for c in g] for g in groups] == [[0, 0], [1200, 1200]]
+
+
+def test_group_chapters_counts_clusters_per_step():
+    from chapter_extractor.matcher import GroupingStats
+
+    # One duration cluster; episodes 1 and 2 hold two chapters each (split by title),
+    # and the Opening run breaks at the gap between episodes 2 and 9
+    chapters = [_ch(90, t, episode=e) for e in (1, 2) for t in ("Opening", "Ending")]
+    chapters.append(_ch(90, "Opening", episode=9))
+    chapters.append(_ch(300, "Recap", episode=1))
+    stats = GroupingStats()
+    groups = group_chapters(chapters, GroupingConfig(), stats)
+    assert stats == GroupingStats(duration=2, title_split=3, episode_split=4)
+    assert len(groups) == stats.episode_split
@@ -0,0 +1,60 @@
+import os
+import time
+
+from chapter_extractor.metrics import MetricsFile, render, write_metrics
+from chapter_extractor.timing import Recorder
+
+
+def _recorder() -> Recorder:
+    recorder = Recorder()
+    recorder.count("files_scanned", 3)
+    recorder.count("files_skipped", reason="no_episode")
+    recorder.count("extractions", 2, result="success")
+    recorder.add_stage("probe", 0.02, 0.01)
+    recorder.add_stage("probe", 2.0, 0.01)
+    recorder.add_tool_call("mkvextract", 0.5)
+    return recorder
+
+
+def test_render_prometheus_text():
+    text = render(_recorder(), '/lib/"anime"', running=False, exit_code=0)
+    lines = text.splitlines()
+    assert '# TYPE chapter_extractor_files_scanned gauge' in lines
+    assert 'chapter_extractor_files_scanned{library="/lib/\\"anime\\""} 3' in lines
+    assert 'chapter_extractor_files_skipped{library="/lib/\\"anime\\"",reason="no_episode"} 1' in lines
+    assert 'chapter_extractor_run_in_progress{library="/lib/\\"anime\\""} 0' in lines
+    assert 'chapter_extractor_run_exit_code{library="/lib/\\"anime\\""} 0' in lines
+    assert '# TYPE chapter_extractor_stage_duration_seconds histogram' in lines
+    buckets = [line for line in lines if line.startswith("chapter_extractor_stage_duration_seconds_bucket")]
+    assert buckets[0].endswith('le="0.001"} 0')
+    assert any('le="0.05"} 1' in line for line in buckets)
+    assert buckets[-1].endswith('le="+Inf"} 2')
+    assert any(line.startswith("chapter_extractor_stage_duration_seconds_count") and line.endswith(" 2")
+               for line in lines)
+    assert 'chapter_extractor_subprocess_calls{library="/lib/\\"anime\\"",tool="mkvextract"} 1' in lines
+    assert text.endswith("\n")
+
+
+def test_write_metrics_replaces_atomically(tmp_path):
+    path = tmp_path / "textfile" / "chapters.prom"
+    write_metrics(str(path), "a 1\n")
+    write_metrics(str(path), "a 2\n")
+    assert path.read_text() == "a 2\n"
+    assert os.listdir(path.parent) == ["chapters.prom"]
+
+
+def test_metrics_file_writes_periodically_and_at_finish(tmp_path):
+    path = tmp_path / "chapters.prom"
+    recorder = _recorder()
+    metrics = MetricsFile(str(path), recorder, "/lib", interval=0.01)
+    metrics.start()
+    assert "chapter_extractor_run_in_progress{library=\"/lib\"} 1" in path.read_text()
+    recorder.count("patterns", 4)
+    deadline = time.monotonic() + 5
+    while "chapter_extractor_patterns" not in path.read_text() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert "chapter_extractor_patterns{library=\"/lib\"} 4" in path.read_text()
+    metrics.finish(1)
+    text = path.read_text()
+    assert "chapter_extractor_run_in_progress{library=\"/lib\"} 0" in text
+    assert "chapter_extractor_run_exit_code{library=\"/lib\"} 1" in text
@@ -74,6 +74,17 @@ def test_output_name_dedup():
         assert name == os.path.join(tmpdir, "S01E01-S01E02_Opening_1.mkv")
 
 
+def test_output_name_dedup_against_claimed():
+    """A name given to another pattern of the run is taken before its file exists."""
+    claimed: set[str] = set()
+    chapters = [_ch(1, 1, "Opening"), _ch(1, 2, "Opening")]
+    first = generate_output_name(chapters, "/tmp/out", episode_parsing=True, claimed=claimed)
+    second = generate_output_name(chapters, "/tmp/out", episode_parsing=True, claimed=claimed)
+    assert first == "/tmp/out/S01E01-S01E02_Opening.mkv"
+    assert second == "/tmp/out/S01E01-S01E02_Opening_1.mkv"
+    assert claimed == {first, second}
+
+
 def test_output_name_sanitizes_title():
     chapters = [_ch(1, 1, "Opening / Theme")]
     name = generate_output_name(chapters, "/tmp/out", episode_parsing=True)
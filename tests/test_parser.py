@@ -49,3 +49,10 @@ def test_episode_info_sorting():
     b = parse_episode("Show S01E10.mkv")
     c = parse_episode("Show S02E01.mkv")
     assert a < b < c
+
+
+def test_episode_info_is_shared():
+    a = parse_episode("Show S01E05 [1080p].mkv")
+    b = parse_episode("/other/dir/Show S01E05 (v2).mkv")
+    assert a is b
+    assert a != parse_episode("Show S01E06.mkv")
@@ -0,0 +1,114 @@
+import os
+from unittest.mock import patch
+
+from chapter_extractor.models import Chapter
+from chapter_extractor.pipeline import Pipeline, Progress, Query
+
+
+def _library(tmp_path, count=6):
+    library = tmp_path / "library"
+    library.mkdir()
+    for i in range(1, count + 1):
+        (library / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+    (library / "Bonus.mkv").write_bytes(b"x")
+    return library
+
+
+def _chapters(path):
+    return [
+        Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path),
+        Chapter(start=90.0, end=1300.0, duration=1210.0, title="Episode", source_file=path),
+    ]
+
+
+@patch("chapter_extractor.pipeline.read_chapters", side_effect=_chapters)
+def test_run_builds_patterns(mock_read, tmp_path):
+    library = _library(tmp_path)
+    events = []
+    pipeline = Pipeline(str(library), str(tmp_path / "out"), jobs=2, on_progress=events.append)
+
+    result = pipeline.run(Query(duration_range=(60, 120)))
+
+    assert [p.episode_range for p in result.patterns] == ["S01E01-S01E06"]
+    assert result.patterns[0].output_name == os.path.join(str(tmp_path / "out"), "S01E01-S01E06_Opening.mkv")
+    assert result.filtered.files == 7
+    assert result.filtered.skipped == {"no episode tag": 1}
+    assert result.filtered.chapters_read == 12
+    assert result.extractions is None
+    assert Progress("probe", 7, 7) in events
+    assert [e.stage for e in events if e.done == e.total][-1] == "build"
+
+
+@patch("chapter_extractor.pipeline.read_chapters", side_effect=_chapters)
+def test_probe_results_stay_warm(mock_read, tmp_path):
+    library = _library(tmp_path)
+    pipeline = Pipeline(str(library), str(tmp_path / "out"))
+    pipeline.run()
+    assert mock_read.call_count == 7
+
+    # Different query, unchanged files: nothing is read again
+    result = pipeline.run(Query(min_occurrences=2, episode_parsing=False))
+    assert mock_read.call_count == 7
+    assert pipeline.reused == 7
+    assert all(c.episode is None for p in result.patterns for c in p.chapters)
+
+    # A changed and a new file are read; a deleted one is forgotten
+    changed = library / "Show S01E01.mkv"
+    changed.write_bytes(b"longer")
+    (library / "Show S01E07.mkv").write_bytes(b"x")
+    (library / "Bonus.mkv").unlink()
+    pipeline.run()
+    assert sorted(os.path.basename(c.args[0]) for c in mock_read.call_args_list[7:]) == [
+        "Show S01E01.mkv", "Show S01E07.mkv",
+    ]
+    assert pipeline.cached_files == 7
+
+    pipeline.invalidate()
+    pipeline.run()
+    assert mock_read.call_count == 16
+
+
+@patch("chapter_extractor.extractor.extract_segments", side_effect=lambda segments: [True] * len(segments))
+@patch("chapter_extractor.pipeline.read_chapters", side_effect=_chapters)
+def test_run_extracts(mock_read, mock_extract, tmp_path):
+    library = _library(tmp_path)
+    pipeline = Pipeline(str(library), str(tmp_path / "out"), extract_jobs=2)
+    result = pipeline.run(extract=True)
+    assert [e.ok for e in result.extractions] == [True, True]
+    # Both patterns come from the first episode and are extracted in one run
+    assert mock_extract.call_count == 1
+
+
+@patch("chapter_extractor.extractor.extract_segments", side_effect=lambda segments: [True] * len(segments))
+@patch("chapter_extractor.extractor.extract_segment", return_value=True)
+@patch("chapter_extractor.pipeline.read_chapters", side_effect=_chapters)
+def test_extract_keeps_journaled_outputs(mock_read, mock_extract, mock_extract_many, tmp_path):
+    from chapter_extractor.journal import Journal
+
+    library = _library(tmp_path)
+    output = tmp_path / "out"
+    pipeline = Pipeline(str(library), str(output))
+    patterns = pipeline.run().patterns
+    done = patterns[0]
+    output.mkdir()
+    (output / os.path.basename(done.output_name)).write_bytes(b"segment")
+    journal = Journal(str(output))
+    journal.add(done.representative, done.output_name)
+    journal.close()
+
+    journal = Journal(str(output), resume=True)
+    extractions = pipeline.extract(patterns, journal=journal)
+    journal.close()
+
+    assert [(e.ok, e.how) for e in extractions] == [(True, "resumed"), (True, "extracted")]
+    assert mock_extract.call_count == 1
+    mock_extract_many.assert_not_called()
+
+
+def test_scan_skips_output_dir_inside_library(tmp_path):
+    library = _library(tmp_path)
+    (library / "extracted").mkdir()
+    (library / "extracted" / "S01E01-S01E06_Opening.mkv").write_bytes(b"x")
+    pipeline = Pipeline(str(library), str(library / "extracted"), recursive=True)
+
+    assert not any("extracted" in path for path in pipeline.scan())
@@ -0,0 +1,36 @@
+import io
+import json
+
+from chapter_extractor.models import Chapter, ChapterPattern, EpisodeInfo
+from chapter_extractor.report import NdjsonReporter
+
+
+def _ch(path: str, episode: int) -> Chapter:
+    return Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path,
+                   episode=EpisodeInfo(1, episode))
+
+
+def test_records_are_one_json_object_per_line():
+    stream = io.StringIO()
+    reporter = NdjsonReporter(stream)
+    chapters = [_ch("/lib/a.mkv", 1), _ch("/lib/b.mkv", 2)]
+    pattern = ChapterPattern(chapters=chapters, avg_duration=90.0, episode_range="S01E01-S01E02",
+                             first_occurrence=chapters[0], output_name="/out/S01E01-S01E02_Opening.mkv")
+    reporter.file("/lib/a.mkv", chapters[:1], None)
+    reporter.file("/lib/c.mkv", None, "unreadable")
+    reporter.pattern(1, pattern)
+    reporter.extraction(pattern, "extracted")
+    reporter.summary(files=2, patterns=1)
+
+    records = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert [r["type"] for r in records] == ["file", "file", "pattern", "extraction", "summary"]
+    assert records[0] == {
+        "type": "file", "path": "/lib/a.mkv", "episode": "S01E01", "skipped": None,
+        "chapters": [{"start": 0.0, "end": 90.0, "duration": 90.0, "title": "Opening"}],
+    }
+    assert records[1]["chapters"] == [] and records[1]["skipped"] == "unreadable"
+    assert records[2]["episode_range"] == "S01E01-S01E02"
+    assert records[2]["first_occurrence"]["source_file"] == "/lib/a.mkv"
+    assert [c["episode"] for c in records[2]["chapters"]] == ["S01E01", "S01E02"]
+    assert records[3] == {"type": "extraction", "output": "/out/S01E01-S01E02_Opening.mkv", "status": "extracted"}
+    assert records[4] == {"type": "summary", "files": 2, "patterns": 1}
@@ -0,0 +1,61 @@
+from unittest.mock import patch
+
+import pytest
+
+from chapter_extractor.models import Chapter
+from chapter_extractor.representative import RepresentativePicker, SourceInfo, keyframe_distance
+
+
+def _members(*sources: str) -> list[Chapter]:
+    return [Chapter(start=60.0, end=150.0, duration=90.0, title="Opening", source_file=s) for s in sources]
+
+
+def test_keyframe_distance():
+    chapter = Chapter(start=60.0, end=150.0, duration=90.0, title=None, source_file="a.mkv")
+    assert keyframe_distance(chapter, [0.0, 58.0, 61.5, 155.0]) == pytest.approx(1.5 + 5.0)
+
+
+@patch("chapter_extractor.representative.source_info")
+def test_first_reads_nothing(mock_info):
+    members = _members("e01.mkv", "e02.mkv")
+    assert RepresentativePicker("first").pick(members) is members[0]
+    mock_info.assert_not_called()
+
+
+@patch("chapter_extractor.representative.source_info")
+def test_best_aligned_picks_closest_keyframes(mock_info):
+    infos = {
+        "e01.mkv": SourceInfo(size=1000, duration=1440.0, keyframes=[55.0, 145.0]),
+        "e02.mkv": SourceInfo(size=1000, duration=1440.0, keyframes=[60.0, 149.5]),
+        "e03.mkv": SourceInfo(size=1000, duration=1440.0, keyframes=None),
+    }
+    mock_info.side_effect = infos.get
+    members = _members("e01.mkv", "e02.mkv", "e03.mkv")
+    assert RepresentativePicker("best-aligned").pick(members) is members[1]
+
+
+@patch("chapter_extractor.representative.source_info")
+def test_cheapest_prefers_low_bitrate_and_shared_sources(mock_info):
+    infos = {
+        "e01.mkv": SourceInfo(size=4_000_000, duration=1440.0, keyframes=None),
+        "e02.mkv": SourceInfo(size=1_000_000, duration=1440.0, keyframes=None),
+        "e03.mkv": SourceInfo(size=8_000_000, duration=1440.0, keyframes=None),
+    }
+    mock_info.side_effect = infos.get
+    picker = RepresentativePicker("cheapest")
+    assert picker.pick(_members("e01.mkv", "e02.mkv")).source_file == "e02.mkv"
+    # e03 was already read up to 150s for another pattern, so its opening costs nothing extra
+    picker.pick(_members("e03.mkv"))
+    assert picker.pick(_members("e01.mkv", "e03.mkv")).source_file == "e03.mkv"
+
+
+@patch("chapter_extractor.representative.source_info", return_value=None)
+def test_unknown_costs_fall_back_to_first(mock_info):
+    members = _members("e01.mkv", "e02.mkv")
+    assert RepresentativePicker("cheapest").pick(members) is members[0]
+    assert RepresentativePicker("best-aligned").pick(members) is members[0]
+
+
+def test_unknown_policy():
+    with pytest.raises(ValueError):
+        RepresentativePicker("random")
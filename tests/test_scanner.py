@@ -0,0 +1,94 @@
+import os
+
+from chapter_extractor.scanner import is_within, walk_library
+
+
+def _touch(root, *paths):
+    for path in paths:
+        full = root / path
+        full.parent.mkdir(parents=True, exist_ok=True)
+        full.write_bytes(b"")
+
+
+def _relative(root, results):
+    return [(os.path.relpath(d, root), [os.path.relpath(f, root) for f in files]) for d, files in results]
+
+
+def test_yields_per_directory_in_pre_order(tmp_path):
+    _touch(
+        tmp_path,
+        "b.mkv",
+        "a.mkv",
+        "Show B/S01E01.mkv",
+        "Show A/Season 2/S02E01.mkv",
+        "Show A/Season 1/S01E01.mkv",
+        "Show A/special.mkv",
+    )
+
+    result = _relative(tmp_path, walk_library(str(tmp_path)))
+
+    assert result == [
+        (".", ["a.mkv", "b.mkv"]),
+        ("Show A", ["Show A/special.mkv"]),
+        ("Show A/Season 1", ["Show A/Season 1/S01E01.mkv"]),
+        ("Show A/Season 2", ["Show A/Season 2/S02E01.mkv"]),
+        ("Show B", ["Show B/S01E01.mkv"]),
+    ]
+
+
+def test_matches_extensions_case_insensitively(tmp_path):
+    _touch(tmp_path, "a.MKV", "b.mka", "c.mk3d", "d.mp4", "e.mkv.part")
+
+    files = [f for _, fs in walk_library(str(tmp_path)) for f in fs]
+
+    assert [os.path.basename(f) for f in files] == ["a.MKV", "b.mka", "c.mk3d"]
+
+
+def test_prunes_default_excludes(tmp_path):
+    _touch(tmp_path, "Show/S01E01.mkv", "Show/Extras/bts.mkv", "@eaDir/thumb.mkv", "Show/.snapshot/S01E01.mkv")
+
+    files = [os.path.relpath(f, tmp_path) for _, fs in walk_library(str(tmp_path)) for f in fs]
+
+    assert files == ["Show/S01E01.mkv"]
+
+
+def test_include_and_exclude_globs(tmp_path):
+    _touch(tmp_path, "Show S01E01.mkv", "Show S01E01 NCOP.mkv", "Movie.mkv", "Samples/Show S01E02.mkv")
+
+    files = walk_library(str(tmp_path), include=["*s01e*"], exclude=["*ncop*", "samples"])
+
+    assert [os.path.basename(f) for _, fs in files for f in fs] == ["Show S01E01.mkv"]
+
+
+def test_non_recursive(tmp_path):
+    _touch(tmp_path, "a.mkv", "sub/b.mkv")
+
+    result = _relative(tmp_path, walk_library(str(tmp_path), recursive=False))
+
+    assert result == [(".", ["a.mkv"])]
+
+
+def test_missing_directory_is_skipped(tmp_path, capsys):
+    assert list(walk_library(str(tmp_path / "missing"))) == []
+    assert "Could not list" in capsys.readouterr().err
+
+
+def test_scan_order_key_matches_walk_order(tmp_path):
+    from chapter_extractor.scanner import scan_order_key
+
+    for rel in ["b.mkv", "a/z.mkv", "a/b/c.mkv", "a/a.mkv", "c/x.mkv", "a.mkv"]:
+        path = tmp_path / rel
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+    walked = [
+        os.path.relpath(f, tmp_path).replace(os.sep, "/")
+        for _, files in walk_library(str(tmp_path)) for f in files
+    ]
+    assert sorted(walked, key=scan_order_key) == walked
+    assert sorted(reversed(walked), key=scan_order_key) == walked
+
+
+def test_is_within():
+    assert is_within("/media/anime/extracted/a.mkv", "/media/anime")
+    assert is_within("/media/anime", "/media/anime/")
+    assert not is_within("/media/anime-extracted", "/media/anime")
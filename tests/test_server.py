@@ -0,0 +1,115 @@
+import json
+import os
+import socket
+import threading
+from unittest.mock import patch
+
+from chapter_extractor.models import Chapter
+from chapter_extractor.server import PipelineServer, PipelineService, query_from_request, serve
+
+
+def _library(tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    for i in range(1, 7):
+        (library / f"Show S01E{i:02d}.mkv").write_bytes(b"x")
+    return library
+
+
+def _chapters(path):
+    return [Chapter(start=0.0, end=90.0, duration=90.0, title="Opening", source_file=path)]
+
+
+def test_query_from_request():
+    query = query_from_request({"duration_range": [60, 120], "tolerance_percent": 5, "max_episode_gap": None})
+    assert query.duration_range == (60.0, 120.0)
+    assert query.grouping.tolerance_seconds is None
+    assert query.grouping.tolerance_percent == 5.0
+    assert query.grouping.max_episode_gap is None
+    assert query_from_request({}).grouping.tolerance_seconds == 2.0
+
+
+@patch("chapter_extractor.pipeline.read_chapters", side_effect=_chapters)
+def test_service_answers_from_memory(mock_read, tmp_path):
+    library = _library(tmp_path)
+    service = PipelineService()
+    request = {"op": "patterns", "library": str(library), "output_dir": str(tmp_path / "out")}
+
+    first = service.handle(request)
+    assert first["ok"] is True
+    assert [p["episode_range"] for p in first["patterns"]] == ["S01E01-S01E06"]
+    assert (first["probed"], first["reused"]) == (6, 0)
+
+    second = service.handle({**request, "min_occurrences": 7})
+    assert second["patterns"] == []
+    assert (second["probed"], second["reused"]) == (0, 6)
+    assert mock_read.call_count == 6
+
+    status = service.handle({"op": "status"})
+    assert status["libraries"][0]["files"] == 6
+    assert service.handle({"op": "invalidate", "library": str(library), "output_dir": str(tmp_path / "out")})["ok"]
+    assert service.handle({"op": "status"})["libraries"][0]["files"] == 0
+
+
+def test_service_errors():
+    service = PipelineService()
+    assert service.handle([]) == {"ok": False, "error": "A request must be a JSON object"}
+    assert service.handle({"op": "nope"})["error"] == "Unknown op: 'nope'"
+    assert "Missing library" in service.handle({"op": "patterns"})["error"]
+    assert "not found" in service.handle({"op": "files", "library": "/does/not/exist"})["error"]
+
+
+def test_service_requires_separate_output_dir_to_extract(tmp_path):
+    library = _library(tmp_path)
+    service = PipelineService()
+    for output_dir in (None, str(library)):
+        request = {"op": "patterns", "library": str(library), "output_dir": output_dir, "extract": True}
+        assert service.handle(request) == {
+            "ok": False, "error": "Extracting needs an output_dir other than the library",
+        }
+
+
+def test_server_refuses_to_replace_non_socket(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("keep me")
+    assert serve(str(path), PipelineService()) == 1
+    assert path.read_text() == "keep me"
+
+
+@patch("chapter_extractor.pipeline.read_chapters", side_effect=KeyError("container"))
+def test_service_reports_unexpected_errors(mock_read, tmp_path):
+    service = PipelineService()
+    response = service.handle({"op": "files", "library": str(_library(tmp_path))})
+    assert response == {"ok": False, "error": "'container'"}
+
+
+@patch("chapter_extractor.pipeline.read_chapters", side_effect=_chapters)
+def test_server_over_unix_socket(mock_read, tmp_path):
+    library = _library(tmp_path)
+    path = str(tmp_path / "chapters.sock")
+    server = PipelineServer(path, PipelineService())
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        assert os.stat(path).st_mode & 0o777 == 0o600
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(path)
+            stream = client.makefile("rwb")
+            for request in (
+                {"op": "files", "library": str(library)},
+                "not json",
+                {"op": "shutdown"},
+            ):
+                line = request if isinstance(request, str) else json.dumps(request)
+                stream.write(line.encode() + b"\n")
+                stream.flush()
+            responses = [json.loads(stream.readline()) for _ in range(3)]
+        assert len(responses[0]["files"]) == 6
+        assert responses[0]["files"][0]["skipped"] is None
+        assert responses[1]["ok"] is False and "Invalid JSON" in responses[1]["error"]
+        assert responses[2] == {"ok": True}
+        thread.join(timeout=5)
+        assert not thread.is_alive()
+    finally:
+        server.server_close()
+    assert not os.path.exists(path)
@@ -0,0 +1,43 @@
+import pytest
+
+from chapter_extractor.shard import (
+    ShardIndex,
+    ShardIndexError,
+    ShardRecord,
+    from_portable,
+    read_shard_index,
+    shard_of,
+    to_portable,
+    write_shard_index,
+)
+
+
+def test_shard_of_is_stable_and_in_range():
+    assert shard_of("Show A", 4) == shard_of("Show A", 4)
+    assert {shard_of(f"Show {i}", 3) for i in range(50)} == {1, 2, 3}
+    assert shard_of("anything", 1) == 1
+
+
+def test_index_round_trip(tmp_path):
+    index = ShardIndex(shard=2, count=3, files=[
+        ShardRecord("Show A/Show S01E01.mkv", [[0.0, 90.0, "Opening"]]),
+        ShardRecord("Show A/broken.mkv", None, "unreadable"),
+    ])
+    path = str(tmp_path / "shard.json")
+    write_shard_index(path, index)
+    assert read_shard_index(path) == index
+
+
+def test_read_rejects_bad_files(tmp_path):
+    with pytest.raises(ShardIndexError):
+        read_shard_index(str(tmp_path / "missing.json"))
+    bad = tmp_path / "bad.json"
+    bad.write_text('{"version": 99}')
+    with pytest.raises(ShardIndexError):
+        read_shard_index(str(bad))
+
+
+def test_portable_paths():
+    path = to_portable("/mnt/library/Show A/ep.mkv", "/mnt/library")
+    assert path == "Show A/ep.mkv"
+    assert from_portable(path, "/media/anime") == "/media/anime/Show A/ep.mkv"
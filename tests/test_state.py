@@ -0,0 +1,94 @@
+from chapter_extractor.models import Chapter, ChapterPattern, EpisodeInfo
+from chapter_extractor.state import RunState
+
+
+def _ch(episode: int, start: float = 0.0) -> Chapter:
+    return Chapter(
+        start=start, end=start + 90.0, duration=90.0, title="Opening",
+        source_file=f"/lib/Show S01E{episode:02d}.mkv",
+        episode=EpisodeInfo(1, episode),
+    )
+
+
+def _pattern(episodes: range, output_name: str, start: float = 0.0) -> ChapterPattern:
+    chapters = [_ch(e, start) for e in episodes]
+    return ChapterPattern(
+        chapters=chapters, avg_duration=90.0, episode_range="",
+        first_occurrence=chapters[0], output_name=output_name,
+    )
+
+
+def _state_with(tmp_path, patterns: list[ChapterPattern]) -> RunState:
+    state = RunState(str(tmp_path / "state.json"))
+    for p in patterns:
+        open(p.output_name, "w").close()
+    state.record(patterns)
+    state.save()
+    return RunState(str(tmp_path / "state.json"))
+
+
+def test_unchanged_pattern_is_kept(tmp_path):
+    old = tmp_path / "S01E01-S01E10_Opening.mkv"
+    state = _state_with(tmp_path, [_pattern(range(1, 11), str(old))])
+    current = _pattern(range(1, 11), str(tmp_path / "S01E01-S01E10_Opening_1.mkv"))
+
+    plan = state.plan([current])
+
+    assert plan.keep == [current]
+    assert current.output_name == str(old)
+    assert plan.extract == [] and plan.rename == []
+
+
+def test_grown_range_with_same_first_occurrence_is_renamed(tmp_path):
+    old = tmp_path / "S01E01-S01E10_Opening.mkv"
+    state = _state_with(tmp_path, [_pattern(range(1, 11), str(old))])
+    current = _pattern(range(1, 12), str(tmp_path / "S01E01-S01E11_Opening.mkv"))
+
+    plan = state.plan([current])
+
+    assert plan.rename == [(str(old), current)]
+    assert plan.extract == []
+
+
+def test_changed_first_occurrence_is_extracted(tmp_path):
+    old = tmp_path / "S01E01-S01E10_Opening.mkv"
+    state = _state_with(tmp_path, [_pattern(range(1, 11), str(old))])
+    current = _pattern(range(1, 11), str(tmp_path / "new.mkv"), start=5.0)
+
+    plan = state.plan([current])
+
+    assert plan.extract == [current]
+    assert state.stale_outputs() == [str(old)]
+
+
+def test_missing_output_is_extracted_again(tmp_path):
+    old = tmp_path / "S01E01-S01E10_Opening.mkv"
+    state = _state_with(tmp_path, [_pattern(range(1, 11), str(old))])
+    old.unlink()
+    state = RunState(str(tmp_path / "state.json"))
+
+    assert state.plan([_pattern(range(1, 11), str(old))]).extract
+
+
+def test_probe_results_round_trip(tmp_path):
+    state = RunState(str(tmp_path / "state.json"))
+    state.put("/lib/a.mkv", (1, 2, 3), [_ch(1)])
+    state.put("/lib/b.mkv", (4, 5, 6), None)
+    state.save()
+
+    reloaded = RunState(str(tmp_path / "state.json"))
+    hit, chapters = reloaded.get("/lib/a.mkv", (1, 2, 3))
+    assert hit is True
+    assert chapters[0].start == 0.0 and chapters[0].title == "Opening"
+    assert reloaded.get("/lib/b.mkv", (4, 5, 6)) == (True, None)
+    assert reloaded.get("/lib/a.mkv", (1, 2, 4))[0] is False
+
+
+def test_unprobed_files_are_dropped(tmp_path):
+    state = RunState(str(tmp_path / "state.json"))
+    state.put("/lib/a.mkv", (1, 2, 3), [])
+    state.save()
+
+    RunState(str(tmp_path / "state.json")).save()
+
+    assert RunState(str(tmp_path / "state.json")).get("/lib/a.mkv", (1, 2, 3))[0] is False
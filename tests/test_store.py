@@ -0,0 +1,97 @@
+import os
+
+from chapter_extractor.models import Chapter
+from chapter_extractor.store import SegmentStore
+
+
+def _chapter(source: str, start: float = 0.0, end: float = 90.0) -> Chapter:
+    return Chapter(start=start, end=end, duration=end - start, title="Opening", source_file=source)
+
+
+def _setup(tmp_path):
+    source = tmp_path / "Show S01E01.mkv"
+    source.write_bytes(b"source")
+    out_dir = tmp_path / "out"
+    out_dir.mkdir()
+    return str(source), out_dir
+
+
+def test_reuse_links_previous_output(tmp_path):
+    source, out_dir = _setup(tmp_path)
+    store = SegmentStore(str(tmp_path / "store.sqlite3"))
+    first = out_dir / "S01E01-S01E12_Opening.mkv"
+    first.write_bytes(b"segment data")
+    store.add(_chapter(source), str(first))
+
+    second = out_dir / "S01E01-S01E24_Opening.mkv"
+    assert store.reuse(_chapter(source), str(second)) is True
+    assert second.read_bytes() == b"segment data"
+    assert store.reused == 1
+    assert store.bytes_saved == len(b"segment data")
+    assert store.reuse(_chapter(source, start=1.0), str(out_dir / "other.mkv")) is False
+    store.close()
+
+
+def test_reuse_persists_across_instances(tmp_path):
+    source, out_dir = _setup(tmp_path)
+    path = str(tmp_path / "store.sqlite3")
+    store = SegmentStore(path)
+    first = out_dir / "a.mkv"
+    first.write_bytes(b"segment data")
+    store.add(_chapter(source), str(first))
+    store.close()
+
+    store = SegmentStore(path)
+    assert store.reuse(_chapter(source), str(out_dir / "b.mkv")) is True
+    store.close()
+
+
+def test_changed_source_or_output_is_not_reused(tmp_path):
+    source, out_dir = _setup(tmp_path)
+    store = SegmentStore(str(tmp_path / "store.sqlite3"))
+    first = out_dir / "a.mkv"
+    first.write_bytes(b"segment data")
+    store.add(_chapter(source), str(first))
+
+    with open(source, "ab") as f:
+        f.write(b" re-release")
+    assert store.reuse(_chapter(source), str(out_dir / "b.mkv")) is False
+
+    store.add(_chapter(source), str(first))
+    first.write_bytes(b"edited by hand")
+    assert store.reuse(_chapter(source), str(out_dir / "b.mkv")) is False
+    store.close()
+
+
+def test_add_deduplicates_identical_content(tmp_path):
+    source, out_dir = _setup(tmp_path)
+    other = tmp_path / "Show S02E01.mkv"
+    other.write_bytes(b"other source")
+    store = SegmentStore(str(tmp_path / "store.sqlite3"))
+    first = out_dir / "S01_Opening.mkv"
+    first.write_bytes(b"same intro")
+    store.add(_chapter(source), str(first))
+
+    second = out_dir / "S02_Opening.mkv"
+    second.write_bytes(b"same intro")
+    store.add(_chapter(str(other)), str(second))
+
+    assert store.deduplicated == 1
+    assert second.read_bytes() == b"same intro"
+    assert os.path.samefile(first, second) or os.stat(second).st_nlink == 1
+    store.close()
+
+
+def test_detach_breaks_hardlinks(tmp_path):
+    store = SegmentStore(str(tmp_path / "store.sqlite3"))
+    first = tmp_path / "a.mkv"
+    first.write_bytes(b"data")
+    os.link(first, tmp_path / "b.mkv")
+
+    store.detach(str(tmp_path / "b.mkv"))
+
+    assert not (tmp_path / "b.mkv").exists()
+    assert first.read_bytes() == b"data"
+    store.detach(str(tmp_path / "a.mkv"))
+    assert first.exists()
+    store.close()
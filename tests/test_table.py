@@ -0,0 +1,111 @@
+import random
+
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from chapter_extractor.matcher import (
+    GroupingConfig,
+    GroupingStats,
+    cluster_by_duration,
+    filter_chapters,
+    group_chapters,
+    split_by_contiguity,
+    split_duplicate_episodes,
+)
+from chapter_extractor.models import Chapter, EpisodeInfo
+from chapter_extractor.table import ChapterTable
+
+
+def _ch(duration: float, title: str | None = None, season: int = 1, episode: int | None = 1,
+        start: float = 0.0) -> Chapter:
+    return Chapter(
+        start=start,
+        end=start + duration,
+        duration=duration,
+        title=title,
+        source_file=f"/fake/Show S{season:02d}E{episode or 0:02d}.mkv",
+        episode=EpisodeInfo(season, episode) if episode is not None else None,
+    )
+
+
+def _random_chapters(count: int, seed: int) -> list[Chapter]:
+    rng = random.Random(seed)
+    titles = ["Opening", "OP", "Episode", "Ending", "ED", "Preview", None]
+    return [
+        _ch(
+            rng.choice([89.0, 90.0, 90.5, 95.0, 1300.0, rng.uniform(1, 600)]),
+            rng.choice(titles),
+            season=rng.randint(1, 2),
+            episode=rng.choice([rng.randint(1, 24), None]),
+            start=rng.choice([0.0, 60.0, 1200.0]),
+        )
+        for _ in range(count)
+    ]
+
+
+def test_filter_matches_list_filter():
+    chapters = _random_chapters(500, seed=1)
+    table = ChapterTable(chapters)
+    for duration_range, names in [(None, False), ((80, 100), False), (None, True), ((60, 120), True)]:
+        expected = filter_chapters(chapters, duration_range, names)
+        assert table.to_chapters(table.filter(duration_range, names)) == expected
+
+
+@pytest.mark.parametrize("tolerance", [(2.0, None), (0.0, None), (None, 5.0)])
+def test_cluster_matches_list_cluster(tolerance):
+    chapters = _random_chapters(500, seed=2)
+    table = ChapterTable(chapters)
+    expected = cluster_by_duration(chapters, *tolerance)
+    actual = [table.to_chapters(c) for c in table.cluster_by_duration(table.all(), *tolerance)]
+    assert actual == expected
+
+
+def test_split_by_contiguity_matches_list():
+    chapters = [_ch(90, season=s, episode=e) for s, e in [(1, 9), (1, 1), (2, 1), (1, 2), (1, 5), (1, 3)]]
+    table = ChapterTable(chapters)
+    expected = split_by_contiguity(chapters)
+    assert [table.to_chapters(r) for r in table.split_by_contiguity(table.all())] == expected
+
+
+def test_split_by_contiguity_without_episode_info():
+    chapters = [_ch(90, episode=1), _ch(90, episode=None)]
+    table = ChapterTable(chapters)
+    assert [table.to_chapters(r) for r in table.split_by_contiguity(table.all())] == [chapters]
+
+
+def test_split_duplicate_episodes_matches_list():
+    chapters = [
+        _ch(90, "Opening", episode=1), _ch(90, "Ending", episode=1, start=1200),
+        _ch(90, "Opening", episode=2), _ch(90, "Ending", episode=2, start=1200),
+    ]
+    table = ChapterTable(chapters)
+    expected = split_duplicate_episodes(chapters)
+    assert [table.to_chapters(s) for s in table.split_duplicate_episodes(table.all())] == expected
+    unique = table.all()[::2]
+    assert [table.to_chapters(s) for s in table.split_duplicate_episodes(unique)] == [chapters[::2]]
+
+
+def test_empty_table():
+    table = ChapterTable([])
+    assert len(table.filter((60, 120), True)) == 0
+    assert table.cluster_by_duration(table.all(), 2.0, None) == []
+    assert table.group(table.all()) == []
+
+
+def test_split_duplicate_episodes_by_start_matches_list():
+    chapters = [_ch(90, "Chapter", episode=e, start=s) for e in (1, 2) for s in (0.0, 1200.0, 60.0)]
+    table = ChapterTable(chapters)
+    expected = split_duplicate_episodes(chapters)
+    assert [table.to_chapters(s) for s in table.split_duplicate_episodes(table.all())] == expected
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_group_matches_group_chapters(seed):
+    chapters = _random_chapters(300, seed=seed)
+    table = ChapterTable(chapters)
+    for config in [GroupingConfig(), GroupingConfig(start_window=30.0, max_episode_gap=1),
+                   GroupingConfig(tolerance_seconds=None, tolerance_percent=5.0, max_episode_gap=None)]:
+        table_stats, list_stats = GroupingStats(), GroupingStats()
+        assert table.group(table.all(), config, table_stats) == group_chapters(chapters, config, list_stats)
+        assert table_stats == list_stats
@@ -0,0 +1,73 @@
+import threading
+from unittest.mock import MagicMock, patch
+
+from chapter_extractor import timing
+
+
+def test_helpers_are_noops_without_recorder():
+    timing.activate(None)
+    with timing.stage("scan"), timing.tool_call("mkvmerge -J"), timing.file_probe("/a.mkv"):
+        timing.add_bytes(read=10)
+    assert list(timing.timed_iter("probe", [1, 2])) == [1, 2]
+
+
+def test_recorder_collects_stages_tools_bytes_and_slowest_files():
+    recorder = timing.Recorder(slowest=2)
+    timing.activate(recorder)
+    try:
+        with timing.stage("scan"):
+            pass
+        with timing.stage("scan"):
+            pass
+        assert list(timing.timed_iter("probe", iter([1, 2, 3]))) == [1, 2, 3]
+        for latency in (0.1, 0.2, 0.3, 0.4):
+            recorder.add_tool_call("mkvextract", latency)
+        timing.add_bytes(read=100, written=7)
+        for path, seconds in (("/a.mkv", 0.5), ("/b.mkv", 2.0), ("/c.mkv", 1.0)):
+            recorder.add_file(path, seconds)
+    finally:
+        timing.activate(None)
+
+    data = recorder.to_dict()
+    assert data["stages"]["scan"]["calls"] == 2
+    assert data["stages"]["probe"]["calls"] == 4
+    tool = data["subprocesses"]["mkvextract"]
+    assert tool["count"] == 4
+    assert (tool["p50"], tool["p90"], tool["max"]) == (0.2, 0.4, 0.4)
+    assert (data["bytes_read"], data["bytes_written"]) == (100, 7)
+    assert recorder.slowest_files() == [("/b.mkv", 2.0), ("/c.mkv", 1.0)]
+    assert any("mkvextract" in line for line in recorder.summary_lines())
+
+
+def test_recorder_is_thread_safe():
+    recorder = timing.Recorder()
+
+    def work():
+        for _ in range(1000):
+            recorder.add_tool_call("mkvmerge -J", 0.001)
+            recorder.add_bytes(read=1)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(recorder.tools["mkvmerge -J"].latencies) == 4000
+    assert recorder.bytes_read == 4000
+
+
+@patch("subprocess.run")
+def test_read_chapters_counts_tool_calls(mock_run, tmp_path):
+    from chapter_extractor.chapters import read_chapters
+
+    mkv = tmp_path / "a.mkv"
+    mkv.write_bytes(b"not matroska")
+    mock_run.return_value = MagicMock(returncode=2, stdout="")
+    recorder = timing.Recorder()
+    timing.activate(recorder)
+    try:
+        read_chapters(str(mkv))
+    finally:
+        timing.activate(None)
+    assert len(recorder.tools["mkvmerge -J"].latencies) == 1
+    assert recorder.bytes_read > 0
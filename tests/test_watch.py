@@ -0,0 +1,79 @@
+import os
+import sys
+
+import pytest
+
+from chapter_extractor.watch import Inotify, LibraryWatcher
+
+pytestmark = pytest.mark.skipif(not sys.platform.startswith("linux"), reason="inotify is Linux-only")
+
+
+def _next_batch(watcher: LibraryWatcher):
+    return next(watcher.batches(debounce=0.05))
+
+
+def test_reports_series_of_finished_file(tmp_path):
+    (tmp_path / "Show A" / "Season 1").mkdir(parents=True)
+    with Inotify() as inotify:
+        watcher = LibraryWatcher(inotify, str(tmp_path))
+        (tmp_path / "Show A" / "Season 1" / "Show A S01E01.mkv").write_bytes(b"x")
+
+        assert _next_batch(watcher) == {"Show A"}
+
+
+def test_debounces_burst_into_one_batch(tmp_path):
+    for name in ("Show A", "Show B"):
+        (tmp_path / name).mkdir()
+    with Inotify() as inotify:
+        watcher = LibraryWatcher(inotify, str(tmp_path))
+        for i in range(1, 4):
+            (tmp_path / "Show A" / f"Show A S01E{i:02d}.mkv").write_bytes(b"x")
+        (tmp_path / "Show B" / "Show B S01E01.mkv").write_bytes(b"x")
+        (tmp_path / "Root S01E01.mkv").write_bytes(b"x")
+
+        assert _next_batch(watcher) == {"Show A", "Show B", ""}
+
+
+def test_ignores_other_extensions(tmp_path):
+    with Inotify() as inotify:
+        watcher = LibraryWatcher(inotify, str(tmp_path))
+        (tmp_path / "Show S01E01.mkv.part").write_bytes(b"x")
+        os.rename(tmp_path / "Show S01E01.mkv.part", tmp_path / "Show S01E01.mkv")
+
+        assert _next_batch(watcher) == {""}
+
+
+def test_watches_directories_moved_in(tmp_path):
+    library = tmp_path / "library"
+    library.mkdir()
+    staging = tmp_path / "staging" / "Show C"
+    (staging / "Season 1").mkdir(parents=True)
+    (staging / "Season 1" / "Show C S01E01.mkv").write_bytes(b"x")
+    with Inotify() as inotify:
+        watcher = LibraryWatcher(inotify, str(library))
+        os.rename(staging, library / "Show C")
+        assert _next_batch(watcher) == {"Show C"}
+
+        (library / "Show C" / "Season 1" / "Show C S01E02.mkv").write_bytes(b"x")
+        assert _next_batch(watcher) == {"Show C"}
+
+
+def test_ignores_excluded_directories(tmp_path):
+    (tmp_path / "Show A" / "Extras").mkdir(parents=True)
+    with Inotify() as inotify:
+        watcher = LibraryWatcher(inotify, str(tmp_path))
+        (tmp_path / "Show A" / "Extras" / "bts.mkv").write_bytes(b"x")
+        (tmp_path / "Show A" / "Show A S01E01.MKV").write_bytes(b"x")
+
+        assert _next_batch(watcher) == {"Show A"}
+
+
+def test_ignores_output_directory(tmp_path):
+    (tmp_path / "Show A").mkdir()
+    (tmp_path / "extracted").mkdir()
+    with Inotify() as inotify:
+        watcher = LibraryWatcher(inotify, str(tmp_path), ignore=[str(tmp_path / "extracted")])
+        (tmp_path / "extracted" / "S01E01-S01E05_Opening.mkv").write_bytes(b"x")
+        (tmp_path / "Show A" / "Show A S01E01.mkv").write_bytes(b"x")
+
+        assert _next_batch(watcher) == {"Show A"}